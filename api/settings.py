@@ -1,4 +1,7 @@
+import importlib.util
 import os
+import sys
+import tempfile
 from pathlib import Path
 from decouple import config, Csv
 from datetime import timedelta
@@ -10,8 +13,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Use environment variables with fallback values
 SECRET_KEY = config('SECRET_KEY', default='temporary-secret-key-change-in-production')
 DEBUG = config('DEBUG', default=False, cast=bool)
+# `manage.py test` must not write to the files under var/ that a dev server on this host uses
+TESTING = sys.argv[1:2] == ['test']
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
+    SECURE_REDIRECT_EXEMPT = [r'^health/']  # probes from the load balancer come in over plain HTTP
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
     SECURE_BROWSER_XSS_FILTER = True
@@ -48,8 +54,9 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files
+    'blogc.middleware.AsyncWhiteNoiseMiddleware',  # For static files (async-capable WhiteNoise)
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blogc.middleware.ReplicaRoutingMiddleware',  # Read replicas with read-your-writes pinning
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -73,6 +80,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api.wsgi.application'
 
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+
 if DEBUG:
     DATABASES = {
         'default': {
@@ -84,11 +95,62 @@ else:
     DATABASES = {
         'default': dj_database_url.config(
             default=config('DATABASE_URL'),
-            conn_max_age=600,
-            ssl_require=True
+            conn_max_age=0 if DB_POOL else 600,
+            conn_health_checks=True,
+            # Single-node installs may run on DATABASE_URL=sqlite:///..., which has no SSL
+            ssl_require=not config('DATABASE_URL').startswith('sqlite')
         )
     }
 
+# Optional read replicas, e.g. DATABASE_REPLICA_URLS=postgres://replica-1/db,postgres://replica-2/db
+# They become aliases replica1, replica2, ... and are used by blogc.routers.ReplicaRouter.
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+for index, url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    DATABASES[f'replica{index}'] = dj_database_url.parse(
+        url, conn_max_age=0 if DB_POOL else 600, conn_health_checks=True, ssl_require=not DEBUG
+    )
+    DATABASES[f'replica{index}']['TEST'] = {'MIRROR': 'default'}
+
+# Pooled mode (PostgreSQL + psycopg 3 only): each worker process shares a bounded
+# psycopg_pool.ConnectionPool between its threads instead of holding one persistent
+# connection per thread. With CONN_HEALTH_CHECKS on, Django has the pool check each
+# connection on checkout. Pooling requires CONN_MAX_AGE = 0, set above.
+if DB_POOL:
+    for alias, db in DATABASES.items():
+        if db['ENGINE'] == 'django.db.backends.postgresql':
+            db.setdefault('OPTIONS', {})['pool'] = {
+                'name': alias,
+                'min_size': DB_POOL_MIN_SIZE,
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+                'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+                'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+            }
+
+# SQLite profile (DEBUG and small single-node installs). WAL lets reads run alongside
+# the one writer; BEGIN IMMEDIATE takes the write lock when a transaction opens, so two
+# transactions never both read and then deadlock upgrading to write (which fails at
+# once with "database is locked"); the busy timeout makes writers queue for the lock
+# instead. synchronous=NORMAL is durable across crashes in WAL mode, only the last
+# commits can be lost on power failure. Measure with manage.py bench_sqlite_writes.
+SQLITE_OPTIONS = {
+    'init_command': ';'.join([
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f'PRAGMA mmap_size={config("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024, cast=int)}',
+        f'PRAGMA cache_size={-config("SQLITE_CACHE_KB", default=64 * 1024, cast=int)}',  # negative: KiB
+        'PRAGMA temp_store=MEMORY',
+    ]),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': config('SQLITE_BUSY_TIMEOUT', default=20, cast=float),  # seconds
+}
+if config('SQLITE_PROFILE', default=True, cast=bool):
+    for db in DATABASES.values():
+        if db['ENGINE'] == 'django.db.backends.sqlite3':
+            db['OPTIONS'] = {**SQLITE_OPTIONS, **db.get('OPTIONS', {})}
+
+DATABASE_ROUTERS = ['blogc.routers.ReplicaRouter']
+
 
 # Production detection
 IS_RENDER = config('RENDER', default=False, cast=bool)
@@ -162,6 +224,7 @@ if not DEBUG:
     ]
     SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
     SECURE_SSL_REDIRECT = True
+    SECURE_REDIRECT_EXEMPT = [r'^health/']  # probes from the load balancer come in over plain HTTP
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
     SECURE_BROWSER_XSS_FILTER = True
@@ -224,7 +287,13 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'blogc.renderers.ORJSONRenderer',
+        'blogc.renderers.MessagePackRenderer',  # Accept: application/msgpack
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'blogc.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
 }
 
@@ -292,26 +361,113 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 1209600  # 2 weeks in seconds
 
-# Cache settings (simple in-memory cache for development)
-if DEBUG:
-    CACHES = {
-        'default': {
-            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-            'LOCATION': 'unique-snowflake',
-        }
-    }
-else:
-    # For production, you might want to use Redis or Memcached
-    CACHES = {
-        'default': {
-            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-            'LOCATION': 'unique-snowflake',
-        }
+# Cache settings: one memory-mapped file shared by every worker on the host (see blogc.cache)
+# The shared mmap cache needs fcntl; without it (Windows) each process gets its own
+# LocMemCache, which ignores the LOCATION path and OPTIONS below
+CACHES = {
+    'default': {
+        'BACKEND': (
+            'blogc.cache.SharedMemoryCache' if importlib.util.find_spec('fcntl')
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        # Tests get a scratch file: they clear the cache, which would wipe a dev server's
+        # revocation stamps and replica pins
+        'LOCATION': (
+            os.path.join(tempfile.gettempdir(), 'blogc-test-cache.mmap') if TESTING
+            else config('CACHE_PATH', default=os.path.join(BASE_DIR, 'var', 'cache', 'default.mmap'))
+        ),
+        'OPTIONS': {
+            'SIZE': config('CACHE_SIZE', default=64 * 1024 * 1024, cast=int),  # bytes; a new size starts a new file
+            'SLOT_SIZE': 4096,  # largest entry (key and pickled value)
+            'WAYS': 8,
+        },
     }
+}
 
 # App-specific settings
 BLOGC_SETTINGS = {
     'MAX_POSTS_PER_PAGE': 12,
     'MAX_COMMENTS_PER_POST': 100,
     'ALLOW_ANONYMOUS_COMMENTS': False,
+    # Seconds a client reads from the primary after a write (read-your-writes)
+    'READ_YOUR_WRITES_WINDOW': config('READ_YOUR_WRITES_WINDOW', default=10, cast=int),
+    # Safe-method requests under these paths may be served from a replica
+    'REPLICA_PATH_PREFIXES': ['/api/posts/', '/api/categories/', '/api/comments/', '/api/async/'],
+    # Post views are buffered per worker and written in one batched UPDATE, on the
+    # first view after the interval (an idle worker keeps its buffer until then or exit)
+    'VIEW_COUNT_FLUSH_INTERVAL': 10,  # seconds
+    'VIEW_COUNT_MAX_BUFFER': 1000,  # distinct posts before an early flush
+    # Time-decayed trending scores (see blogc.trending)
+    'TRENDING': {
+        'HALF_LIFE_HOURS': 24,
+        'LIKE_WEIGHT': 3.0,
+        'COMMENT_WEIGHT': 5.0,
+        'VIEW_WEIGHT': 0.1,
+        'WINDOW_DAYS': 7,  # history used by `manage.py update_trending --rebuild`
+    },
+    # TF-IDF related posts (see blogc.related and `manage.py build_related_posts`)
+    'RELATED_POSTS': {
+        'TOP_K': 10,
+        'CHUNK_SIZE': 256,  # rows per sparse matrix multiply
+        'MIN_DF': 2,
+        'MAX_DF': 0.5,
+        'MAX_FEATURES': 50000,
+        'INDEX_PATH': os.path.join(BASE_DIR, 'var', 'related_index.npz'),
+    },
+    # Batch comment spam scoring (see blogc.moderation and `manage.py moderate_comments`)
+    'MODERATION': {
+        'BATCH_SIZE': 2000,
+        'THRESHOLD': 0.5,  # weighted score at or above which a comment is hidden for review
+        'REPEAT_WINDOW_HOURS': 6,
+        'BURST_WINDOW_SECONDS': 300,
+        'BURST_LIMIT': 5,
+    },
+    # Reply threads on materialized paths (see blogc.threads)
+    'COMMENT_THREADS': {
+        'MAX_DEPTH': 4,
+        'PAGE_SIZE': 50,  # comments per cursor page
+    },
+    # Live comment and like events over SSE (see blogc.events)
+    'EVENTS': {
+        # In-process only: right for a single ASGI worker. With more workers, streams
+        # miss the writes other workers handle; use a broker backed by a shared service
+        'BROKER': 'blogc.events.LocalBroker',
+        'REPLAY_SIZE': 100,
+        'REPLAY_POSTS': 1000,  # posts with replayable events; bounds a long-running worker's memory
+        'QUEUE_SIZE': 1000,
+        'HEARTBEAT_SECONDS': 15,
+        'RETRY_MS': 3000,
+    },
+    # Incremental sync feed with tombstones (see blogc.sync); run prune_sync_log daily
+    'SYNC': {
+        'BATCH_SIZE': 500,
+        'MAX_BATCH_SIZE': 2000,
+        'TOMBSTONE_DAYS': 30,  # older ?since tokens get 410 and must sync from scratch
+    },
+    # Pre-rendered, pre-compressed JSON for hot anonymous reads (see blogc.snapshots),
+    # served by AsyncWhiteNoiseMiddleware under URL
+    'SNAPSHOTS': {
+        'ENABLED': config('STATIC_SNAPSHOTS', default=True, cast=bool) and not TESTING,
+        'ROOT': os.path.join(BASE_DIR, 'var', 'snapshots'),
+        'URL': '/snapshots/',
+        'LATEST_COUNT': 5,
+        'CATEGORY_PAGES': 2,
+    },
+    # In-memory bloom filter over revoked refresh-token jtis (see blogc.revocation)
+    'TOKEN_REVOCATION': {
+        'CAPACITY': 100000,
+        'ERROR_RATE': 0.001,
+        'SYNC_INTERVAL': 30,  # seconds; fallback poll when the cache is not shared between workers
+    },
+    # Liveness/readiness probes at /health/ (see blogc.health)
+    'HEALTH': {
+        'TTL_SECONDS': 10,  # readiness results are reused this long per worker
+        'TIMEOUT_SECONDS': 3,
+        'CHECKS': ('database', 'cache', 'storage'),
+    },
+    # Image URLs built from a prefix resolved once (see blogc.media.MediaURLResolver)
+    'MEDIA': {
+        'CDN_DOMAIN': config('MEDIA_CDN_DOMAIN', default=''),
+        'SIGNED_URL_CACHE_SIZE': 10000,
+    },
 }
\ No newline at end of file
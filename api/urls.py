@@ -1,10 +1,16 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from blogc.views import LivenessView, ReadinessView
+
 # from django.conf import settings
 # from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('blogc.urls')),
+    # Load balancer and uptime probes (see blogc.health)
+    path('health/', ReadinessView.as_view(), name='health'),
+    path('health/live/', LivenessView.as_view(), name='health-live'),
+    path('health/ready/', ReadinessView.as_view(), name='health-ready'),
 ]
@@ -1,13 +1,163 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters, ShowFacets
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
 from .models import BlogCategory, BlogPost, Comment, Like, UserProfile
 
-class BlogPostAdmin(admin.ModelAdmin):
+# Changelists for the big tables are built so that no page costs more than its own
+# rows: in the default newest-first order they page by primary key (?before=<pk>)
+# instead of OFFSET, the total is an estimate rather than a COUNT(*) over the table,
+# foreign keys are raw id inputs instead of <select>s listing every user and post,
+# and searches are exact matches on indexed columns.
+BEFORE_VAR = 'before'
+COUNT_LIMIT = 10000  # counts of filtered lists stop here
+
+
+def estimated_count(queryset):
+    """
+    Rows in the queryset's table without counting them: the planner's estimate on
+    PostgreSQL, the highest id (an upper bound) elsewhere. None if unknown.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] >= 0 else None  # -1 until the table is analyzed
+    return queryset.model._base_manager.using(queryset.db).aggregate(top=Max('pk'))['top'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate > COUNT_LIMIT:
+                return estimate
+        # Exact up to COUNT_LIMIT, then the COUNT stops scanning
+        return queryset.order_by()[:COUNT_LIMIT].count()
+
+
+class KeysetChangeList(ChangeList):
+    """
+    In the admin's default ordering (newest first by pk), pages are ?before=<pk>
+    seeks on the primary key, as cheap at the millionth row as at the first.
+    Sorting by a column falls back to numbered pages.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.keyset = ORDER_VAR not in request.GET and ALL_VAR not in request.GET
+        before = request.GET.get(BEFORE_VAR)
+        if before is not None and not before.isdigit():
+            raise IncorrectLookupParameters(f'{BEFORE_VAR} must be an id')
+        self.before = int(before) if before is not None else None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        params = super().get_filters_params(params)
+        params.pop(BEFORE_VAR, None)
+        return params
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if exclude_parameters is None:
+            self.unpaged_queryset = queryset
+        if self.keyset and self.before is not None:
+            queryset = queryset.filter(pk__lt=self.before)
+        return queryset
+
+    def get_results(self, request):
+        if not self.keyset:
+            return super().get_results(request)
+        paginator = self.model_admin.get_paginator(request, self.unpaged_queryset, self.list_per_page)
+        rows = list(self.queryset[:self.list_per_page + 1])
+        self.result_list = rows[:self.list_per_page]
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.can_show_all = False
+        self.multi_page = True
+        self.paginator = paginator
+        self.older_url = (
+            self.get_query_string({BEFORE_VAR: self.result_list[-1].pk}) if len(rows) > self.list_per_page else None
+        )
+        self.newest_url = self.get_query_string(remove=[BEFORE_VAR]) if self.before is not None else None
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    change_list_template = 'admin/blogc/keyset_change_list.html'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = ShowFacets.NEVER  # facet counts are COUNT(*) per filter choice
+    ordering = ('-pk',)
+    list_per_page = 50
+    # Numeric search terms match these fields exactly (text terms use search_fields)
+    search_id_fields = ('pk',)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if term.isdigit():
+            match = Q()
+            for field in self.search_id_fields:
+                match |= Q(**{field: int(term)})
+            return queryset.filter(match), False
+        return super().get_search_results(request, queryset, term)
+
+
+@admin.register(BlogPost)
+class BlogPostAdmin(ScalableAdmin):
+    list_display = ('id', 'title', 'author', 'category', 'published', 'created_at')
+    list_filter = ('published',)
+    list_select_related = ('author', 'category')
+    raw_id_fields = ('author',)
+    search_fields = ('slug__exact', 'author__username__exact')
+    search_id_fields = ('pk', 'author_id')
+    search_help_text = 'An id, author id, slug or exact username'
+
     # This ensures the file upload works properly
     class Meta:
         model = BlogPost
 
-admin.site.register(BlogPost, BlogPostAdmin)
+
+@admin.register(Comment)
+class CommentAdmin(ScalableAdmin):
+    list_display = ('id', 'post', 'user', 'status', 'active', 'created_at')
+    list_filter = ('status', 'active')
+    list_select_related = ('post', 'user')
+    raw_id_fields = ('post', 'user', 'parent')
+    search_fields = ('user__username__exact',)
+    search_id_fields = ('pk', 'post_id', 'parent_id')
+    search_help_text = 'A comment, post or parent id, or an exact username'
+
+
+@admin.register(Like)
+class LikeAdmin(ScalableAdmin):
+    list_display = ('id', 'post', 'user', 'created_at')
+    list_select_related = ('post', 'user')
+    raw_id_fields = ('post', 'user')
+    search_fields = ('user__username__exact',)
+    search_id_fields = ('pk', 'post_id')
+    search_help_text = 'A like or post id, or an exact username'
+
+
+@admin.register(UserProfile)
+class UserProfileAdmin(ScalableAdmin):
+    list_display = ('id', 'user', 'role', 'is_blog_admin')
+    list_filter = ('role', 'is_blog_admin')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('user__username__exact',)
+    search_id_fields = ('pk', 'user_id')
+    search_help_text = 'A profile or user id, or an exact username'
+
+
 admin.site.register(BlogCategory)
-admin.site.register(Comment)
-admin.site.register(Like)
-admin.site.register(UserProfile)
@@ -0,0 +1,130 @@
+# async_views.py
+# Async (ASGI) versions of the hot public read endpoints. Responses have the same
+# shape as the DRF views in views.py, but the ORM is awaited so a single process can
+# hold many slow client connections without parking a thread on each one.
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import events, snapshots
+from .counters import view_counter
+from .models import BlogCategory, BlogPost, Comment, Like
+from .projections import apost_list_data
+from .queries import post_detail_queryset, post_list_queryset
+from .renderers import ORJSONRenderer
+from .threads import ThreadCursorPagination, thread_queryset
+from .serializers import (
+    AnnotatedBlogPostDetailSerializer, BlogCategorySerializer, CommentSerializer,
+)
+
+
+def render(data, status=200):
+    return HttpResponse(ORJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def not_found(model):
+    return render({'detail': f'No {model.__name__} matches the given query.'}, status=404)
+
+
+async def authenticate(request):
+    """Run the configured DRF authenticators off the event loop and return the user."""
+    drf_request = Request(
+        request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    return await sync_to_async(lambda: drf_request.user)()
+
+
+# ----------------- Blog Posts -----------------
+class AsyncPostListView(View):
+    async def get(self, request):
+        return render(await apost_list_data(post_list_queryset(), request))
+
+
+class AsyncLatestPostsView(View):
+    async def get(self, request):
+        qs = post_list_queryset().filter(published=True).order_by('-created_at')[:5]
+        return snapshots.add_link(render(await apost_list_data(qs, request)), 'latest')
+
+
+class AsyncPostDetailView(View):
+    async def get(self, request, pk):
+        try:
+            post = await post_detail_queryset().aget(pk=pk)
+        except BlogPost.DoesNotExist:
+            return not_found(BlogPost)
+        if view_counter.add(post.pk):
+            await sync_to_async(view_counter.try_flush)()
+        serializer = AnnotatedBlogPostDetailSerializer(post, context={'request': request})
+        return render(serializer.data)
+
+
+class AsyncPostEventsView(View):
+    """
+    Server-Sent Events for one post: `comment.created` (the comment as the comments
+    endpoint returns it) and `likes.changed` ({"post", "likes_count"}). Reconnects
+    resume after the Last-Event-ID header, or ?last_event_id= for the first connect.
+    """
+
+    async def get(self, request, pk):
+        if not await BlogPost.objects.filter(pk=pk).aexists():
+            return not_found(BlogPost)
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        subscription = events.broker.subscribe(pk, last_event_id.strip() if last_event_id else None)
+        response = StreamingHttpResponse(events.stream(subscription), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+        return response
+
+
+# ----------------- Categories -----------------
+class AsyncCategoryListView(View):
+    async def get(self, request):
+        categories = [category async for category in BlogCategory.objects.all()]
+        return snapshots.add_link(render(BlogCategorySerializer(categories, many=True).data), 'categories')
+
+
+class AsyncCategoryDetailView(View):
+    async def get(self, request, pk):
+        try:
+            category = await BlogCategory.objects.aget(pk=pk)
+        except BlogCategory.DoesNotExist:
+            return not_found(BlogCategory)
+        posts = await apost_list_data(post_list_queryset().filter(category=category), request)
+        # No snapshot Link: category-<id>-page-N snapshots are paginated, published-only and have no totals
+        return render({
+            'id': category.id,
+            'name': category.name,
+            'slug': category.slug,
+            'total_posts': len(posts),
+            'total_comments': await Comment.objects.filter(post__category=category).acount(),
+            'total_likes': await Like.objects.filter(post__category=category).acount(),
+            'posts': posts,
+        })
+
+
+# ----------------- Comments -----------------
+class AsyncCommentListView(View):
+    async def get(self, request, post_id):
+        try:
+            user = await authenticate(request)
+        except exceptions.APIException as exc:
+            return render({'detail': exc.detail}, status=exc.status_code)
+        if not (user and user.is_authenticated):
+            return render({'detail': exceptions.NotAuthenticated.default_detail}, status=401)
+
+        # Same threads and cursor pages as CommentListCreateView
+        paginator = ThreadCursorPagination()
+
+        def page():
+            return paginator.paginate_queryset(thread_queryset(post_id, request.GET), Request(request))
+
+        try:
+            comments = await sync_to_async(page)()
+        except exceptions.ValidationError as exc:
+            return render(exc.detail, status=exc.status_code)
+        except exceptions.APIException as exc:
+            return render({'detail': exc.detail}, status=exc.status_code)
+        return render(paginator.get_paginated_response(CommentSerializer(comments, many=True).data).data)
@@ -0,0 +1,68 @@
+# bulk.py
+# Set-based admin operations on posts. Whatever the number of rows, each action is
+# one UPDATE (or one cascading DELETE) inside a transaction: no model instances are
+# saved one by one, so no per-row save() or post_save signal runs.
+from django.db import transaction
+from django.utils import timezone
+
+from . import snapshots, sync
+from .counters import view_counter
+from .models import BlogPost
+
+ACTIONS = ('publish', 'unpublish', 'recategorize', 'delete')
+MAX_IDS = 10000
+
+
+def select_posts(ids=None, filters=None):
+    """Posts matched by an explicit id list and/or the filters accepted by BulkPostActionSerializer."""
+    qs = BlogPost.objects.all()
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    filters = filters or {}
+    if 'category_id' in filters:
+        qs = qs.filter(category_id=filters['category_id'])
+    if 'author_id' in filters:
+        qs = qs.filter(author_id=filters['author_id'])
+    if 'published' in filters:
+        qs = qs.filter(published=filters['published'])
+    if 'created_after' in filters:
+        qs = qs.filter(created_at__gte=filters['created_after'])
+    if 'created_before' in filters:
+        qs = qs.filter(created_at__lt=filters['created_before'])
+    if filters.get('title_contains'):
+        qs = qs.filter(title__icontains=filters['title_contains'])
+    return qs.order_by()
+
+
+def apply(action, queryset, category=None):
+    """
+    Run `action` on every post in `queryset`. Returns (matched, changed); rows
+    already in the target state are matched but not written.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f'Unknown bulk action {action!r}')
+    now = timezone.now()
+    with transaction.atomic():
+        # Any snapshot may list an affected post; bulk changes are rare, so rebuild them all
+        snapshots.schedule(full=True)
+        matched = queryset.count()
+        if action == 'delete':
+            post_ids = list(queryset.values_list('pk', flat=True))
+            # only('pk'): the collector needs primary keys, not whole rows; comments,
+            # likes, trending and related rows go in one DELETE ... WHERE post_id IN each
+            BlogPost.objects.filter(pk__in=post_ids).only('pk').delete()
+            # Views buffered for these posts must not be flushed into missing rows
+            transaction.on_commit(lambda: view_counter.discard(post_ids))
+            return matched, len(post_ids)
+        # updated_at is auto_now, which update() skips: set it so incremental jobs
+        # (related posts) pick the rows up
+        if action in ('publish', 'unpublish'):
+            values = {'published': action == 'publish'}
+        else:
+            values = {'category': category}
+        post_ids = list(queryset.exclude(**values).values_list('pk', flat=True))
+        changed = BlogPost.objects.filter(pk__in=post_ids).update(updated_at=now, **values)
+        # No post_save here either, so log the posts for the sync feed; last, since
+        # other writers wait on the log from there to the commit
+        sync.record(sync.POST, post_ids)
+    return matched, changed
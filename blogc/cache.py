@@ -0,0 +1,282 @@
+# cache.py
+# Django cache backend over a memory-mapped file, so every worker process on the
+# host shares one cache without an external service. The file is a fixed grid of
+# buckets x ways slots of SLOT_SIZE bytes; a key hashes to one bucket and lives
+# in one of its ways (set-associative, like a CPU cache). The size is fixed when
+# the file is created: a full bucket evicts its least recently used way.
+#
+# The layout is part of the file name (LOCATION default.mmap is default-<buckets>x
+# <ways>x<slot size>.mmap), so a new SIZE during a rolling deploy starts a new file:
+# a file is never resized under workers that still have it mapped, which would
+# kill them with SIGBUS. Files of old layouts can be deleted once no worker uses them.
+#
+# Each operation runs under a byte-range lock (fcntl) on its bucket, so processes
+# only contend on the same bucket and incr() is atomic across workers. Values that
+# do not fit in a slot are not cached, as with memcached's item size limit. Needs
+# fcntl, so POSIX only; settings fall back to LocMemCache elsewhere.
+#
+#   CACHES = {'default': {
+#       'BACKEND': 'blogc.cache.SharedMemoryCache',
+#       'LOCATION': '/path/to/cache.mmap',
+#       'OPTIONS': {'SIZE': 64 * 1024 * 1024, 'SLOT_SIZE': 4096, 'WAYS': 8},
+#   }}
+import hashlib
+import mmap
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+from struct import Struct
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: the settings use LocMemCache there
+    fcntl = None
+
+MAGIC = b'BLOGCCH1'
+HEADER = Struct('<8sIII')  # magic, buckets, ways, slot size
+HEADER_SIZE = mmap.PAGESIZE
+# Per slot: key hash (0 = empty), expiry (0 = never), last use (monotonic ns), key and value lengths
+SLOT = Struct('<QdQHI')
+EXPIRES = Struct('<d')  # at slot offset 8
+USED = Struct('<Q')  # at slot offset 16
+LOCK_STRIPES = 64
+
+_segments = {}
+_segments_lock = threading.Lock()
+
+
+class Segment:
+    """
+    A cache file mapped into this process. There is one per path and process:
+    fcntl locks belong to the process, and closing any descriptor of the file
+    would drop them, so threads share the mapping and serialize on stripe locks.
+    """
+
+    def __init__(self, path, buckets, ways, slot_size):
+        self.path = path
+        self.buckets = buckets
+        self.ways = ways
+        self.slot_size = slot_size
+        self.size = HEADER_SIZE + buckets * ways * slot_size
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        header = HEADER.pack(MAGIC, buckets, ways, slot_size)
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        try:
+            if os.pread(self.fd, HEADER.size, 0).strip(b'\0') == b'':
+                # New file (or one whose creator died before writing the header), so
+                # nobody can have it mapped yet; it stays sparse until slots are used
+                os.ftruncate(self.fd, self.size)
+                os.pwrite(self.fd, header, 0)
+            valid = os.pread(self.fd, HEADER.size, 0) == header and os.fstat(self.fd).st_size == self.size
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        if not valid:
+            os.close(self.fd)
+            raise ImproperlyConfigured(f'{path} is not a cache file with this layout')
+        self.mm = mmap.mmap(self.fd, self.size)
+        self.reset_locks()
+
+    def reset_locks(self):
+        self.locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    @contextmanager
+    def bucket(self, index):
+        with self.locks[index % LOCK_STRIPES]:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, index)
+            try:
+                yield HEADER_SIZE + index * self.ways * self.slot_size
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, index)
+
+    @contextmanager
+    def everything(self):
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        finally:
+            for lock in self.locks:
+                lock.release()
+
+
+def _after_fork():
+    # A lock held by another thread at fork time would never be released in the child
+    for segment in _segments.values():
+        segment.reset_locks()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def layout_path(location, buckets, ways, slot_size):
+    root, ext = os.path.splitext(location)
+    return f'{root}-{buckets}x{ways}x{slot_size}{ext}'
+
+
+def get_segment(location, buckets, ways, slot_size):
+    path = layout_path(location, buckets, ways, slot_size)
+    with _segments_lock:
+        segment = _segments.get(path)
+        if segment is None:
+            segment = _segments[path] = Segment(path, buckets, ways, slot_size)
+        return segment
+
+
+class SharedMemoryCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        if fcntl is None:
+            raise ImproperlyConfigured('SharedMemoryCache needs fcntl, which this platform does not have')
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        size = options.get('SIZE', 64 * 1024 * 1024)
+        slot_size = options.get('SLOT_SIZE', 4096)
+        ways = options.get('WAYS', 8)
+        self._segment = get_segment(location, max(1, size // (slot_size * ways)), ways, slot_size)
+
+    # ----------------- slots -----------------
+    def _hash(self, key):
+        key = key.encode()
+        digest = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+        return key, digest or 1
+
+    def _find(self, base, key, digest):
+        """(offset of the key's slot or None, offset of the slot to store a new key in)."""
+        segment = self._segment
+        mm = segment.mm
+        found = victim = None
+        victim_used = None
+        now = time.time()
+        for way in range(segment.ways):
+            offset = base + way * segment.slot_size
+            slot_hash, expires, used, key_len, _ = SLOT.unpack_from(mm, offset)
+            start = offset + SLOT.size
+            if slot_hash == digest and mm[start:start + key_len] == key:
+                found = offset
+            # Empty and expired slots go first, then the least recently used
+            rank = -1 if slot_hash == 0 or (expires and expires <= now) else used
+            if victim is None or rank < victim_used:
+                victim, victim_used = offset, rank
+        return found, victim
+
+    def _read(self, offset):
+        """The slot's value, or the missing sentinel when it has expired (the slot is freed)."""
+        mm = self._segment.mm
+        _, expires, _, key_len, value_len = SLOT.unpack_from(mm, offset)
+        if expires and expires <= time.time():
+            SLOT.pack_into(mm, offset, 0, 0, 0, 0, 0)
+            return self._missing_key
+        start = offset + SLOT.size + key_len
+        return pickle.loads(mm[start:start + value_len])
+
+    def _write(self, offset, key, digest, value, expires):
+        mm = self._segment.mm
+        data = pickle.dumps(value, self.pickle_protocol)
+        if SLOT.size + len(key) + len(data) > self._segment.slot_size:
+            return False
+        start = offset + SLOT.size
+        mm[start:start + len(key)] = key
+        mm[start + len(key):start + len(key) + len(data)] = data
+        # Header last: a slot only names the key once its payload is in place
+        SLOT.pack_into(mm, offset, digest, expires or 0, time.monotonic_ns(), len(key), len(data))
+        return True
+
+    def _store(self, key, value, timeout, version, only_new):
+        key = self.make_and_validate_key(key, version=version)
+        key, digest = self._hash(key)
+        expires = self.get_backend_timeout(timeout)
+        with self._segment.bucket(digest % self._segment.buckets) as base:
+            found, victim = self._find(base, key, digest)
+            if found is not None:
+                if only_new and self._read(found) is not self._missing_key:
+                    return False
+                if not self._write(found, key, digest, value, expires):
+                    # Too big to cache: the old value must not outlive the set
+                    SLOT.pack_into(self._segment.mm, found, 0, 0, 0, 0, 0)
+                    return False
+                return True
+            return self._write(victim, key, digest, value, expires)
+
+    # ----------------- cache API -----------------
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store(key, value, timeout, version, only_new=True)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(key, value, timeout, version, only_new=False)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        key, digest = self._hash(key)
+        with self._segment.bucket(digest % self._segment.buckets) as base:
+            found, _ = self._find(base, key, digest)
+            if found is None:
+                return default
+            value = self._read(found)
+            if value is self._missing_key:
+                return default
+            # Refresh the LRU stamp
+            USED.pack_into(self._segment.mm, found + 16, time.monotonic_ns())
+            return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        key, digest = self._hash(key)
+        with self._segment.bucket(digest % self._segment.buckets) as base:
+            found, _ = self._find(base, key, digest)
+            if found is None or self._read(found) is self._missing_key:
+                return False
+            expires = self.get_backend_timeout(timeout)
+            EXPIRES.pack_into(self._segment.mm, found + 8, expires or 0)
+            return True
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        key, digest = self._hash(key)
+        with self._segment.bucket(digest % self._segment.buckets) as base:
+            found, _ = self._find(base, key, digest)
+            if found is None:
+                return False
+            live = self._read(found) is not self._missing_key
+            SLOT.pack_into(self._segment.mm, found, 0, 0, 0, 0, 0)
+            return live
+
+    def incr(self, key, delta=1, version=None):
+        """Atomic across processes: the read and the write happen under one bucket lock."""
+        validated = self.make_and_validate_key(key, version=version)
+        encoded, digest = self._hash(validated)
+        with self._segment.bucket(digest % self._segment.buckets) as base:
+            found, _ = self._find(base, encoded, digest)
+            value = self._missing_key if found is None else self._read(found)
+            if value is self._missing_key:
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            expires, = EXPIRES.unpack_from(self._segment.mm, found + 8)
+            if not self._write(found, encoded, digest, value, expires):
+                SLOT.pack_into(self._segment.mm, found, 0, 0, 0, 0, 0)
+            return value
+
+    def clear(self):
+        segment = self._segment
+        with segment.everything():
+            for offset in range(HEADER_SIZE, segment.size, segment.slot_size):
+                SLOT.pack_into(segment.mm, offset, 0, 0, 0, 0, 0)
+
+    def stats(self):
+        """Slots in use (expired included) and total, for benchmarks and monitoring."""
+        segment = self._segment
+        used = sum(
+            1 for offset in range(HEADER_SIZE, segment.size, segment.slot_size)
+            if SLOT.unpack_from(segment.mm, offset)[0]
+        )
+        return {'used': used, 'slots': segment.buckets * segment.ways, 'slot_size': segment.slot_size}
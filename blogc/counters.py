@@ -0,0 +1,107 @@
+# counters.py
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import BigIntegerField, Case, F, Value, When
+
+from . import trending
+from .models import BlogPost
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Per-worker write-behind buffer for post views. Reads only bump an in-memory
+    counter; at most once per flush interval (or when the buffer gets large) the
+    totals are written with a single
+        UPDATE blogc_blogpost SET views = views + CASE id WHEN .. THEN .. END WHERE id IN (..)
+    Flushes ride on incoming views: there is no timer, so a worker that gets no
+    more views holds its buffer until the next one arrives or the process exits
+    (atexit flushes it). Views buffered in a worker that dies without flushing are
+    lost, which is acceptable for analytics.
+    """
+
+    def __init__(self, interval=10, max_buffer=1000):
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            interval=settings.BLOGC_SETTINGS.get('VIEW_COUNT_FLUSH_INTERVAL', 10),
+            max_buffer=settings.BLOGC_SETTINGS.get('VIEW_COUNT_MAX_BUFFER', 1000),
+        )
+
+    def add(self, post_id, count=1):
+        """Buffer a view; returns True when a flush is due. Never touches the DB."""
+        with self._lock:
+            self._pending[post_id] += count
+            return (
+                len(self._pending) >= self.max_buffer
+                or time.monotonic() - self._last_flush >= self.interval
+            )
+
+    def record(self, post_id):
+        if self.add(post_id):
+            self.try_flush()
+
+    def try_flush(self):
+        """flush() for request paths: a failure is logged and the counts stay buffered."""
+        try:
+            self.flush()
+        except Exception:
+            # The read that triggered the flush still succeeds
+            logger.exception('Flushing buffered post views failed')
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def discard(self, post_ids):
+        """Forget buffered views for posts that were deleted."""
+        with self._lock:
+            for post_id in post_ids:
+                self._pending.pop(post_id, None)
+
+    def flush(self):
+        """Write buffered views in one UPDATE; returns the number of posts touched."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        try:
+            BlogPost.objects.filter(pk__in=pending.keys()).update(
+                views=F('views') + Case(
+                    *[When(pk=post_id, then=Value(count)) for post_id, count in pending.items()],
+                    default=Value(0),
+                    output_field=BigIntegerField(),
+                )
+            )
+        except Exception:
+            # Put the counts back so the next flush retries them
+            with self._lock:
+                self._pending.update(pending)
+            raise
+        view_weight = trending.get_options()['VIEW_WEIGHT']
+        trending.bump({post_id: count * view_weight for post_id, count in pending.items()})
+        return len(pending)
+
+
+view_counter = ViewCounter.from_settings()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        pass
@@ -0,0 +1,25 @@
+# db.py
+from django.db import connections
+
+
+def pool_stats():
+    """
+    Connection pool metrics for this worker process, keyed by database alias.
+    Aliases without a pool (SQLite, or DB_POOL off) report {'pooled': False}.
+    """
+    stats = {}
+    for alias in connections:
+        wrapper = connections[alias]
+        if not wrapper.settings_dict.get('OPTIONS', {}).get('pool'):
+            stats[alias] = {'pooled': False}
+            continue
+        # Read the pool registry directly: the `pool` property would open a pool
+        # for an alias this worker has not used yet.
+        pool = getattr(wrapper, '_connection_pools', {}).get(alias)
+        if pool is None:
+            stats[alias] = {'pooled': True, 'open': False}
+            continue
+        # get_stats() includes pool_min/pool_max/pool_size/pool_available,
+        # requests_waiting, requests_num, requests_wait_ms, connections_errors, ...
+        stats[alias] = {'pooled': True, 'open': True, 'name': pool.name, **pool.get_stats()}
+    return stats
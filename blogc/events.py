@@ -0,0 +1,230 @@
+# events.py
+# Live post updates over Server-Sent Events. Writes (CommentListCreateView,
+# ToggleLikeView) publish to a broker once their transaction commits; each open
+# /api/async/posts/<id>/events/ stream is a broker subscription for one post.
+#
+# The broker is chosen by BLOGC_SETTINGS['EVENTS']['BROKER']. LocalBroker fans out
+# inside one process, so it is for a single ASGI worker only: with several, a
+# stream only hears about writes that the same worker handled. A broker backed by
+# a shared service only has to implement publish() and subscribe(). Each post keeps
+# its last REPLAY_SIZE events so a reconnecting EventSource (Last-Event-ID) gets
+# what it missed; when that is no longer possible it is sent a `resync` event and
+# should refetch the post. Only the REPLAY_POSTS most recently active posts keep
+# their events, so a long-running worker's memory stays bounded.
+#
+# Event ids are "<broker epoch>-<sequence>". The epoch is new for every broker
+# instance, so an id from before a restart or from another worker is recognised as
+# foreign and answered with `resync`, rather than replaying an unrelated backlog.
+import asyncio
+import itertools
+import secrets
+import threading
+from collections import OrderedDict, deque
+
+import orjson
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Like
+
+COMMENT_CREATED = 'comment.created'
+LIKES_CHANGED = 'likes.changed'
+RESYNC = 'resync'
+
+
+def get_options():
+    options = {
+        'BROKER': 'blogc.events.LocalBroker',
+        'REPLAY_SIZE': 100,  # events kept per post for Last-Event-ID resume
+        'REPLAY_POSTS': 1000,  # posts whose events are kept; the least recently active go first
+        'QUEUE_SIZE': 1000,  # events a slow client may fall behind before it is cut off
+        'HEARTBEAT_SECONDS': 15,
+        'RETRY_MS': 3000,  # reconnect delay suggested to EventSource
+    }
+    options.update(settings.BLOGC_SETTINGS.get('EVENTS', {}))
+    return options
+
+
+class Event:
+    __slots__ = ('id', 'post_id', 'type', 'data')
+
+    def __init__(self, id, post_id, type, data):
+        self.id = id
+        self.post_id = post_id
+        self.type = type
+        self.data = data
+
+    def encode(self):
+        lines = [] if self.id is None else [f'id: {self.id}']
+        lines += [f'event: {self.type}', f'data: {orjson.dumps(self.data).decode()}']
+        return '\n'.join(lines) + '\n\n'
+
+
+class Subscription:
+    """One stream's view of a post: `backlog` to replay, then live events from get()."""
+
+    def __init__(self, broker, post_id, queue_size):
+        self.broker = broker
+        self.post_id = post_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(queue_size)
+        self.backlog = []
+        self.resync = False  # the missed events can't be replayed
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Called from whichever thread published; the queue belongs to the stream's loop
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind: end the stream with a resync rather than buffer without bound
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """The next event, or None if none arrived within `timeout` seconds."""
+        if self.overflowed:
+            return Event(None, self.post_id, RESYNC, {'post': self.post_id})
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """
+    In-process fan-out; thread-safe, so sync views can publish into async streams.
+    Single worker only: other processes' writes never reach its subscribers.
+    """
+
+    def __init__(self, replay_size=100, queue_size=1000, replay_posts=1000):
+        self.replay_size = replay_size
+        self.replay_posts = replay_posts
+        self.queue_size = queue_size
+        self.epoch = secrets.token_hex(4)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._history = OrderedDict()  # post id -> deque of recent events, least recently active first
+        self._evicted = {}  # post id -> id of the newest event no longer replayable
+        self._forgotten = 0  # newest event of any post whose history was dropped
+        self._subscribers = {}  # post id -> set of Subscription
+
+    @classmethod
+    def from_settings(cls, options):
+        return cls(
+            replay_size=options['REPLAY_SIZE'], queue_size=options['QUEUE_SIZE'], replay_posts=options['REPLAY_POSTS']
+        )
+
+    def publish(self, post_id, type, data):
+        with self._lock:
+            sequence = self._last_id = next(self._ids)
+            event = Event(f'{self.epoch}-{sequence}', post_id, type, data)
+            history = self._history.get(post_id)
+            if history is None:
+                history = self._history[post_id] = deque(maxlen=self.replay_size)
+                if self._forgotten:
+                    # The post may be one whose history was dropped: don't resume across the gap
+                    self._evicted[post_id] = self._forgotten
+                if len(self._history) > self.replay_posts:
+                    self._forget_oldest()
+            else:
+                self._history.move_to_end(post_id)
+            if len(history) == history.maxlen:
+                self._evicted[post_id] = self._sequence(history[0].id)
+            history.append(event)
+            subscribers = list(self._subscribers.get(post_id, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return event
+
+    def _forget_oldest(self):
+        post_id, history = self._history.popitem(last=False)
+        self._evicted.pop(post_id, None)
+        self._forgotten = max(self._forgotten, self._sequence(history[-1].id))
+
+    def _sequence(self, event_id):
+        """The sequence number of one of our event ids; None for anything else."""
+        epoch, _, sequence = event_id.partition('-')
+        return int(sequence) if epoch == self.epoch and sequence.isdigit() else None
+
+    def subscribe(self, post_id, last_event_id=None):
+        """Must be called from the event loop the stream runs on."""
+        subscription = Subscription(self, post_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(post_id, set()).add(subscription)
+            if last_event_id:
+                last = self._sequence(last_event_id)
+                history = self._history.get(post_id, ())
+                # Ids from another broker (a restart, another worker), from the future
+                # or older than the replay buffer (or than a dropped history) can't be resumed
+                evicted = self._evicted.get(post_id, 0) if history else self._forgotten
+                if last is None or last > self._last_id or last < evicted:
+                    subscription.resync = True
+                else:
+                    subscription.backlog = [e for e in history if self._sequence(e.id) > last]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.post_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.post_id]
+
+    def subscriber_count(self, post_id=None):
+        with self._lock:
+            if post_id is not None:
+                return len(self._subscribers.get(post_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+options = get_options()
+broker = import_string(options['BROKER']).from_settings(options)
+
+
+# ----------------- publishing from writes -----------------
+def publish_on_commit(post_id, type, data):
+    # Listeners must never see a write that is rolled back
+    transaction.on_commit(lambda: broker.publish(post_id, type, data))
+
+
+def comment_created(comment, data):
+    publish_on_commit(comment.post_id, COMMENT_CREATED, data)
+
+
+def likes_changed(post_id):
+    def publish():
+        count = Like.objects.filter(post_id=post_id).count()
+        broker.publish(post_id, LIKES_CHANGED, {'post': post_id, 'likes_count': count})
+
+    transaction.on_commit(publish)
+
+
+# ----------------- streaming -----------------
+async def stream(subscription, heartbeat=None, retry=None):
+    """The SSE body for a subscription; unsubscribes when the client goes away."""
+    heartbeat = heartbeat or options['HEARTBEAT_SECONDS']
+    try:
+        yield f'retry: {retry or options["RETRY_MS"]}\n\n'
+        if subscription.resync:
+            yield Event(None, subscription.post_id, RESYNC, {'post': subscription.post_id}).encode()
+        for event in subscription.backlog:
+            yield event.encode()
+        while True:
+            event = await subscription.get(heartbeat)
+            if event is None:
+                yield ': keepalive\n\n'
+                continue
+            yield event.encode()
+            if event.type == RESYNC:
+                return
+    finally:
+        subscription.close()
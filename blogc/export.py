@@ -0,0 +1,121 @@
+# export.py
+# Bulk exports for analytics. Rows come off a server-side cursor (.iterator()) as
+# flat tuples and are written as JSON lines or CSV through a streaming gzip
+# compressor, so memory use is flat whatever the table size. `since` limits an
+# export to rows created or changed at or after that time; the caller should keep
+# the export's start time and pass it as the next `since`.
+import csv
+import io
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import BlogPost, Comment, Like
+
+FORMATS = ('jsonl', 'csv')
+CHUNK_SIZE = 2000  # rows fetched per round trip
+FLUSH_BYTES = 64 * 1024  # uncompressed bytes buffered before compressing
+
+# name -> (queryset, exported fields, field used by `since`)
+EXPORTS = {
+    'posts': (
+        lambda: BlogPost.objects.all(),
+        ('id', 'title', 'slug', 'author_id', 'category_id', 'published', 'views',
+         'image', 'created_at', 'updated_at', 'content'),
+        'updated_at',
+    ),
+    'comments': (
+        lambda: Comment.objects.all(),
+        ('id', 'post_id', 'user_id', 'parent_id', 'active', 'status', 'created_at', 'body'),
+        'created_at',
+    ),
+    'likes': (
+        lambda: Like.objects.all(),
+        ('id', 'post_id', 'user_id', 'created_at'),
+        'created_at',
+    ),
+    # No password hashes or e-mail addresses
+    'users': (
+        lambda: User.objects.all(),
+        ('id', 'username', 'first_name', 'last_name', 'is_active', 'date_joined',
+         'profile__role', 'profile__is_blog_admin'),
+        'date_joined',
+    ),
+}
+
+
+def column_names(name):
+    return [field.replace('profile__', '') for field in EXPORTS[name][1]]
+
+
+def rows(name, since=None):
+    queryset, fields, since_field = EXPORTS[name]
+    qs = queryset()
+    if since is not None:
+        qs = qs.filter(**{f'{since_field}__gte': since})
+    # Primary key order keeps the export stable and lets the database walk the pk index
+    return qs.order_by('pk').values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def encode(name, fmt, since=None):
+    """Yield the export as text chunks of about FLUSH_BYTES."""
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format {fmt!r}')
+    columns = column_names(name)
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        write = writer.writerow
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+        def write(row):
+            buffer.write(encoder.encode(dict(zip(columns, row))))
+            buffer.write('\n')
+
+    for row in rows(name, since):
+        write(row)
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream(name, fmt='jsonl', since=None, compress=True):
+    """Yield the export as bytes, gzip-compressed unless `compress` is False."""
+    if not compress:
+        for chunk in encode(name, fmt, since):
+            yield chunk.encode()
+        return
+    # wbits=31: gzip container, so the output is a regular .gz file
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in encode(name, fmt, since):
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def astream(name, fmt='jsonl', since=None, compress=True):
+    """
+    stream() for ASGI responses. Django drains a sync iterator into a list before
+    sending it under ASGI; this pulls one chunk at a time from a worker thread
+    instead, so memory stays flat there too.
+    """
+    chunks = stream(name, fmt, since, compress)
+    # Thread-sensitive: every chunk is read on the thread that owns the cursor
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def filename(name, fmt, compress=True):
+    return f'{name}.{fmt}' + ('.gz' if compress else '')
@@ -0,0 +1,124 @@
+# health.py
+# Liveness and readiness for load balancers and uptime monitors.
+#   /health/live/   the process is up and serving; touches nothing
+#   /health/ready/  (and /health/) the database, cache and media storage answer
+# Readiness results are cached per process for TTL_SECONDS, so monitors polling
+# every few seconds cost one round of checks per worker per TTL. Checks run in
+# parallel on a small long-lived thread pool, each abandoned after
+# TIMEOUT_SECONDS; the storage check is one HEAD on the bucket through the media
+# storage's own (reused) client. The response has a fixed shape and size.
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .media import media_storage
+
+CACHE_PROBE_KEY = 'health:probe'
+MAX_ERROR_LENGTH = 200
+
+
+def get_options():
+    options = {
+        'TTL_SECONDS': 10,
+        'TIMEOUT_SECONDS': 3,
+        'CHECKS': ('database', 'cache', 'storage'),
+    }
+    options.update(settings.BLOGC_SETTINGS.get('HEALTH', {}))
+    return options
+
+
+# ----------------- checks -----------------
+def check_database():
+    for alias in connections:
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        finally:
+            # This thread outlives requests: drop the connection if it went bad or stale
+            connection.close_if_unusable_or_obsolete()
+
+
+def check_cache():
+    token = uuid.uuid4().hex
+    cache.set(CACHE_PROBE_KEY, token, 60)
+    if cache.get(CACHE_PROBE_KEY) != token:
+        raise RuntimeError('the cache did not return the value just written')
+
+
+def check_storage():
+    bucket = getattr(media_storage, 'bucket_name', None)
+    if bucket and hasattr(media_storage, 'connection'):
+        # HEAD, not a listing: one cheap request, on the storage's thread-local client
+        media_storage.connection.meta.client.head_bucket(Bucket=bucket)
+    elif not os.path.isdir(media_storage.location):
+        raise RuntimeError(f'media directory {media_storage.location} is missing')
+
+
+CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+    'storage': check_storage,
+}
+
+
+# ----------------- running -----------------
+class HealthMonitor:
+    def __init__(self, checks=None, options=None):
+        self.checks = checks or CHECKS
+        self.options = options or get_options()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.checks), thread_name_prefix='health')
+        self._lock = threading.Lock()
+        self._report = None
+        self._expires = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._report = None
+            self._expires = 0.0
+
+    def report(self):
+        """The latest readiness report, re-running the checks once it is TTL_SECONDS old."""
+        with self._lock:
+            # Concurrent requests wait here and share one round of checks
+            if self._report is None or time.monotonic() >= self._expires:
+                self._report = self.run()
+                self._expires = time.monotonic() + self.options['TTL_SECONDS']
+            return self._report
+
+    def run(self):
+        started = time.monotonic()
+        names = [name for name in self.options['CHECKS'] if name in self.checks]
+        futures = {name: self._executor.submit(self._timed, self.checks[name]) for name in names}
+        wait(futures.values(), timeout=self.options['TIMEOUT_SECONDS'])
+        results = {}
+        for name, future in futures.items():
+            if future.done():
+                results[name] = future.result()
+            else:
+                results[name] = {'ok': False, 'ms': None, 'error': f'timed out after {self.options["TIMEOUT_SECONDS"]}s'}
+        return {
+            'status': 'ok' if all(result['ok'] for result in results.values()) else 'fail',
+            'checks': results,
+            'checked_at': time.time(),
+            'duration_ms': round((time.monotonic() - started) * 1000, 1),
+        }
+
+    @staticmethod
+    def _timed(check):
+        started = time.monotonic()
+        try:
+            check()
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'[:MAX_ERROR_LENGTH]
+            return {'ok': False, 'ms': round((time.monotonic() - started) * 1000, 1), 'error': error}
+        return {'ok': True, 'ms': round((time.monotonic() - started) * 1000, 1)}
+
+
+monitor = HealthMonitor()
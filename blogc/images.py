@@ -0,0 +1,25 @@
+# images.py
+# Image work done in import_posts' process pool. This module must not import Django
+# (or anything that does): under the spawn and forkserver start methods (macOS,
+# Windows, Python 3.14's default) every worker imports it from scratch, without
+# django.setup(), and a model import there fails with AppRegistryNotReady.
+import io
+import os
+
+SAVE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+def process_image(path, max_size, quality):
+    """Decode, orient and shrink one image; returns (file name, encoded bytes). Runs in a worker."""
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as image:
+        fmt = image.format if image.format in SAVE_FORMATS else 'JPEG'
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size))
+        if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        out = io.BytesIO()
+        image.save(out, fmt, quality=quality, optimize=True)
+    name = f'{os.path.splitext(os.path.basename(path))[0]}.{SAVE_FORMATS[fmt]}'
+    return name, out.getvalue()
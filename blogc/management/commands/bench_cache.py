@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from blogc.cache import SharedMemoryCache
+
+
+def worker(make_cache, seed, options, start, results):
+    """Read-mostly traffic over a shared key space, plus one hot counter every 10th op."""
+    cache = make_cache()
+    rng = random.Random(seed)
+    keys = [f'bench:{i}' for i in range(options['keys'])]
+    payload = 'x' * options['value_size']
+    hits = gets = incrs = 0
+    start.wait()
+    started = time.perf_counter()
+    for i in range(options['ops']):
+        key = keys[min(int(rng.paretovariate(1.2)) - 1, len(keys) - 1)]
+        if i % 10 == 0:
+            cache.incr('bench:counter')
+            incrs += 1
+        elif rng.random() < 0.9:
+            gets += 1
+            if cache.get(key) is None:
+                cache.set(key, payload, 300)
+            else:
+                hits += 1
+        else:
+            cache.set(key, payload, 300)
+    results.put((time.perf_counter() - started, hits, gets, incrs))
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the same read-mostly workload from several processes against SharedMemoryCache, '
+        "Django's FileBasedCache (the other single-host shared option) and LocMemCache (one cache "
+        'per process). Reports throughput, hit rate and whether a shared counter lost increments.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--ops', type=int, default=20000, help='Operations per process')
+        parser.add_argument('--keys', type=int, default=2000)
+        parser.add_argument('--value-size', type=int, default=512)
+
+    def handle(self, *args, **options):
+        tmp = tempfile.TemporaryDirectory()
+        backends = {
+            'shared memory': lambda: SharedMemoryCache(os.path.join(tmp.name, 'bench.mmap'), {}),
+            'file based': lambda: FileBasedCache(os.path.join(tmp.name, 'files'), {'OPTIONS': {'MAX_ENTRIES': 100000}}),
+            'locmem': lambda: LocMemCache('bench', {'OPTIONS': {'MAX_ENTRIES': 100000}}),
+        }
+        ctx = multiprocessing.get_context('fork')
+        processes = options['processes']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{processes} processes x {options["ops"]} ops, {options["keys"]} keys, {options["value_size"]} B values'
+        ))
+        with tmp:
+            for name, make_cache in backends.items():
+                cache = make_cache()
+                cache.clear()
+                cache.set('bench:counter', 0, None)
+                start, results = ctx.Barrier(processes + 1), ctx.Queue()
+                workers = [
+                    ctx.Process(target=worker, args=(make_cache, seed, options, start, results))
+                    for seed in range(processes)
+                ]
+                for process in workers:
+                    process.start()
+                start.wait()
+                rows = [results.get() for _ in workers]
+                for process in workers:
+                    process.join()
+                elapsed = max(row[0] for row in rows)
+                hits, gets, incrs = (sum(row[i] for row in rows) for i in (1, 2, 3))
+                counter = cache.get('bench:counter')
+                self.stdout.write(
+                    f'  {name:<14} {processes * options["ops"] / elapsed:10,.0f} ops/s'
+                    f'  hit rate {hits / max(gets, 1):6.1%}'
+                    f'  counter {counter}/{incrs}'
+                )
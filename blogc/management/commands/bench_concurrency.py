@@ -0,0 +1,89 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer running servers with concurrent (optionally slow-reading) clients and report '
+        'throughput and latency. Start the servers first, e.g.\n'
+        '  gunicorn api.wsgi -w 2 --threads 4 -b :8000\n'
+        '  uvicorn api.asgi:application --workers 2 --port 8001\n'
+        'then compare /api/posts/latest/ on :8000 with /api/async/posts/latest/ on :8001.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Full URLs to benchmark, one run per URL')
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--slow-client', type=float, default=0.0,
+                            help='Seconds each client waits before reading the response body')
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        for url in options['urls']:
+            result = asyncio.run(self.run(url, options))
+            self.report(url, result)
+
+    async def run(self, url, options):
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise CommandError('Only plain http:// URLs are supported')
+        host, port = parts.hostname, parts.port or 80
+        target = parts.path + (f'?{parts.query}' if parts.query else '')
+        request = (
+            f'GET {target or "/"} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+            f'Accept: application/json\r\nConnection: close\r\n\r\n'
+        ).encode()
+
+        queue = asyncio.Queue()
+        for _ in range(options['requests']):
+            queue.put_nowait(None)
+        latencies, errors = [], []
+
+        async def fetch():
+            started = time.perf_counter()
+            reader, writer = await asyncio.open_connection(host, port)
+            try:
+                writer.write(request)
+                await writer.drain()
+                status_line = await reader.readline()
+                if options['slow_client']:
+                    await asyncio.sleep(options['slow_client'])
+                await reader.read()
+            finally:
+                writer.close()
+            status = int(status_line.split()[1]) if status_line else 0
+            if status != 200:
+                raise RuntimeError(f'HTTP {status}')
+            return time.perf_counter() - started
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                try:
+                    latencies.append(await asyncio.wait_for(fetch(), options['timeout']))
+                except Exception as e:
+                    errors.append(e)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+        return latencies, errors, time.perf_counter() - started
+
+    def report(self, url, result):
+        latencies, errors, elapsed = result
+        self.stdout.write(self.style.MIGRATE_HEADING(url))
+        done = len(latencies)
+        self.stdout.write(f'  completed {done}, errors {len(errors)}, {elapsed:.2f}s, {done / elapsed:.1f} req/s')
+        if latencies:
+            latencies.sort()
+            pick = lambda q: latencies[min(done - 1, int(q * done))] * 1000
+            self.stdout.write(
+                f'  latency ms: mean {statistics.mean(latencies) * 1000:.1f}'
+                f'  p50 {pick(0.50):.1f}  p95 {pick(0.95):.1f}  p99 {pick(0.99):.1f}'
+            )
+        if errors:
+            self.stdout.write(f'  first error: {errors[0]!r}')
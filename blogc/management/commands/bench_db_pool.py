@@ -0,0 +1,104 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blogc.db import pool_stats
+from blogc.models import BlogPost
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate concurrent request threads against the database and report throughput, '
+        'latency, server-side connection count and pool metrics. Run once with DB_POOL=False '
+        'and once with DB_POOL=True to compare persistent and pooled connections.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per thread')
+        parser.add_argument('--queries', type=int, default=3, help='Queries per request')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        latencies, errors = [], []
+        peak = {'connections': 0}
+        lock = threading.Lock()
+
+        def request_loop():
+            db = connections[alias]
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                try:
+                    for _ in range(options['queries']):
+                        list(BlogPost.objects.using(alias).values_list('id', flat=True)[:20])
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                except Exception as e:
+                    with lock:
+                        errors.append(e)
+                finally:
+                    # What Django does at the end of every request: return the connection
+                    # to the pool (CONN_MAX_AGE = 0) or keep it open for this thread.
+                    db.close_if_unusable_or_obsolete()
+            db.close()
+
+        def sample_connections():
+            for count in self.server_connections(alias):
+                peak['connections'] = max(peak['connections'], count)
+                if done.wait(0.1):
+                    break
+
+        done = threading.Event()
+        sampler = threading.Thread(target=sample_connections, daemon=True)
+        sampler.start()
+        started = time.perf_counter()
+        threads = [threading.Thread(target=request_loop) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        sampler.join()
+
+        settings_dict = connections[alias].settings_dict
+        pooled = bool(settings_dict.get('OPTIONS', {}).get('pool'))
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{alias} ({settings_dict["ENGINE"].rsplit(".", 1)[-1]}, '
+            f'{"pooled" if pooled else "CONN_MAX_AGE=%s" % settings_dict["CONN_MAX_AGE"]})'
+        ))
+        total = len(latencies)
+        self.stdout.write(f'  requests {total}, errors {len(errors)}, {elapsed:.2f}s, {total / elapsed:.1f} req/s')
+        if latencies:
+            latencies.sort()
+            self.stdout.write(
+                f'  latency ms: mean {statistics.mean(latencies) * 1000:.2f}'
+                f'  p95 {latencies[int(0.95 * (total - 1))] * 1000:.2f}'
+                f'  p99 {latencies[int(0.99 * (total - 1))] * 1000:.2f}'
+            )
+        if peak['connections']:
+            self.stdout.write(f'  peak server connections: {peak["connections"]}')
+        if errors:
+            self.stdout.write(f'  first error: {errors[0]!r}')
+        self.stdout.write(f'  pool: {pool_stats().get(alias)}')
+
+    @staticmethod
+    def server_connections(alias):
+        """Yield the server-side connection count (PostgreSQL only) until the caller stops."""
+        if connections[alias].vendor != 'postgresql':
+            return
+        import psycopg
+
+        # A dedicated, unpooled connection so sampling doesn't skew the pool
+        params = connections[alias].get_connection_params()
+        params.pop('cursor_factory', None)
+        params.pop('context', None)
+        with psycopg.connect(**params, autocommit=True) as conn:
+            while True:
+                yield conn.execute(
+                    'SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()'
+                ).fetchone()[0]
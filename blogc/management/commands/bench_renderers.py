@@ -0,0 +1,49 @@
+import gzip
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from blogc.queries import post_detail_queryset, post_list_queryset
+from blogc.renderers import MessagePackRenderer, ORJSONRenderer
+from blogc.serializers import AnnotatedBlogPostDetailSerializer, AnnotatedBlogPostListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare rendering time and payload size of the stdlib JSONRenderer, ORJSONRenderer '
+        'and MessagePackRenderer on post list and post detail payloads (run seed_data first).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=500, help='Posts in the list payload')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        posts = list(post_list_queryset().order_by('-id')[:options['posts']])
+        if not posts:
+            raise CommandError('No posts; run `manage.py seed_data` first')
+        detail = post_detail_queryset().order_by('-comments_count').first()
+        # Serialize once: only rendering is measured
+        payloads = {
+            f'list ({len(posts)} posts)': AnnotatedBlogPostListSerializer(posts, many=True).data,
+            f'detail ({len(detail.active_comments)} comments)': AnnotatedBlogPostDetailSerializer(detail).data,
+        }
+        renderers = {'json (stdlib)': JSONRenderer(), 'orjson': ORJSONRenderer(), 'msgpack': MessagePackRenderer()}
+
+        for label, data in payloads.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            baseline = None
+            for name, renderer in renderers.items():
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    body = renderer.render(data)
+                    timings.append(time.perf_counter() - started)
+                median = statistics.median(timings) * 1000
+                baseline = baseline or median
+                self.stdout.write(
+                    f'  {name:<14} {median:8.3f} ms  x{baseline / median:5.1f}'
+                    f'  {len(body) / 1024:9.1f} KiB  gzip {len(gzip.compress(body, 6)) / 1024:8.1f} KiB'
+                )
@@ -0,0 +1,44 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blogc.projections import post_list_data
+from blogc.queries import post_list_queryset
+from blogc.serializers import AnnotatedBlogPostListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare building a post list response with AnnotatedBlogPostListSerializer against '
+        'the values_list() projection in blogc.projections, query included (run seed_data first).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=3000, help='Posts in the list')
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        qs = post_list_queryset().order_by('-id')[:options['posts']]
+        count = qs.count()
+        if not count:
+            raise CommandError('No posts; run `manage.py seed_data` first')
+        paths = {
+            'serializer': lambda: AnnotatedBlogPostListSerializer(qs.all(), many=True).data,
+            'projection': lambda: post_list_data(qs.all()),
+        }
+        results = {name: build() for name, build in paths.items()}
+        if results['projection'] != results['serializer']:
+            raise CommandError('Projection output differs from the serializer')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'list ({count} posts)'))
+        baseline = None
+        for name, build in paths.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                build()
+                timings.append(time.perf_counter() - started)
+            median = statistics.median(timings) * 1000
+            baseline = baseline or median
+            self.stdout.write(f'  {name:<12} {median:9.1f} ms  x{baseline / median:5.1f}  {median / count * 1000:7.1f} us/post')
@@ -0,0 +1,146 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = """
+CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT NOT NULL);
+CREATE TABLE post_like (
+    id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, user_id INTEGER NOT NULL, created_at REAL NOT NULL,
+    UNIQUE (post_id, user_id)
+);
+CREATE TABLE comment (
+    id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, user_id INTEGER NOT NULL, body TEXT NOT NULL,
+    path TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX comment_post_path ON comment (post_id, path);
+"""
+
+
+def connect(path, options):
+    """A connection set up the way Django's SQLite backend would with these OPTIONS."""
+    kwargs = {'timeout': options['timeout']} if 'timeout' in options else {}
+    connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False, **kwargs)
+    for command in options.get('init_command', '').split(';'):
+        if command.strip():
+            connection.execute(command)
+    return connection
+
+
+def toggle_like(cursor, rng, options):
+    post_id, user_id = rng.randrange(options['posts']) + 1, rng.randrange(options['users']) + 1
+    row = cursor.execute('SELECT id FROM post_like WHERE post_id = ? AND user_id = ?', (post_id, user_id)).fetchone()
+    if row:
+        cursor.execute('DELETE FROM post_like WHERE id = ?', row)
+    else:
+        cursor.execute(
+            'INSERT INTO post_like (post_id, user_id, created_at) VALUES (?, ?, ?)', (post_id, user_id, time.time())
+        )
+
+
+def post_comment(cursor, rng, options):
+    # Like Comment.save(): INSERT, then write the thread path that needs the new id
+    post_id = rng.randrange(options['posts']) + 1
+    cursor.execute(
+        'INSERT INTO comment (post_id, user_id, body) VALUES (?, ?, ?)',
+        (post_id, rng.randrange(options['users']) + 1, 'x' * 200),
+    )
+    cursor.execute("UPDATE comment SET path = printf('%010d', id) WHERE id = ?", (cursor.lastrowid,))
+
+
+def writer(path, options, profile, deadline, seed, results):
+    connection = connect(path, profile)
+    begin = f'BEGIN {profile.get("transaction_mode") or ""}'.strip()
+    rng = random.Random(seed)
+    latencies, failures = [], 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        cursor = connection.cursor()
+        try:
+            cursor.execute(begin)
+            (toggle_like if rng.random() < 0.7 else post_comment)(cursor, rng, options)
+            cursor.execute('COMMIT')
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:  # database is locked
+            failures += 1
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+    connection.close()
+    results.append((latencies, failures))
+
+
+def reader(path, profile, deadline, results):
+    connection = connect(path, profile)
+    reads = 0
+    while time.perf_counter() < deadline:
+        try:
+            connection.execute(
+                'SELECT p.id, (SELECT COUNT(*) FROM post_like l WHERE l.post_id = p.id) FROM post p LIMIT 20'
+            ).fetchall()
+            reads += 1
+        except sqlite3.OperationalError:
+            pass
+    connection.close()
+    results.append(reads)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent write transactions (like toggles, comment posts) and readers from '
+        'several threads against a scratch SQLite file: once with SQLite defaults (rollback '
+        'journal, deferred BEGIN) and once with settings.SQLITE_OPTIONS. Reports commits/s, '
+        '"database is locked" failures and write latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Writer threads')
+        parser.add_argument('--readers', type=int, default=2, help='Reader threads')
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=50)
+        parser.add_argument('--users', type=int, default=500)
+
+    def handle(self, *args, **options):
+        profiles = {
+            'defaults': {},
+            'SQLITE_OPTIONS': settings.SQLITE_OPTIONS,
+        }
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{options["threads"]} writers + {options["readers"]} readers for {options["seconds"]:g}s'
+        ))
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, profile in profiles.items():
+                path = os.path.join(tmp, f'{len(os.listdir(tmp))}.sqlite3')
+                setup = connect(path, profile)
+                setup.executescript(SCHEMA)
+                setup.executemany('INSERT INTO post (title) VALUES (?)', [(f'Post {i}',) for i in range(options['posts'])])
+                setup.close()
+
+                writes, reads = [], []
+                deadline = time.perf_counter() + options['seconds']
+                threads = [
+                    threading.Thread(target=writer, args=(path, options, profile, deadline, seed, writes))
+                    for seed in range(options['threads'])
+                ] + [
+                    threading.Thread(target=reader, args=(path, profile, deadline, reads))
+                    for _ in range(options['readers'])
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+                latencies = sorted(latency for thread_latencies, _ in writes for latency in thread_latencies)
+                failures = sum(failed for _, failed in writes)
+                p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+                median = statistics.median(latencies) * 1000 if latencies else 0
+                self.stdout.write(
+                    f'  {name:<15} {len(latencies) / options["seconds"]:8,.0f} commits/s'
+                    f'  {failures:6} locked  p50 {median:6.2f} ms  p99 {p99:7.2f} ms'
+                    f'  {sum(reads) / options["seconds"]:8,.0f} reads/s'
+                )
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blogc import related
+
+
+class Command(BaseCommand):
+    help = 'Compute TF-IDF related posts. Full rebuild by default, --incremental to only re-score new or edited posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true')
+        parser.add_argument('--top-k', type=int)
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        job_options = related.get_options()
+        if options['top_k']:
+            job_options['TOP_K'] = options['top_k']
+        if options['chunk_size']:
+            job_options['CHUNK_SIZE'] = options['chunk_size']
+
+        started = time.monotonic()
+        if options['incremental']:
+            posts, links = related.update(job_options)
+            label = 'Re-scored'
+        else:
+            posts, links = related.rebuild(job_options)
+            label = 'Indexed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{label} {posts} posts, wrote {links} related links in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blogc.revocation import revocation_store
+
+
+class Command(BaseCommand):
+    help = 'Delete revoked refresh tokens that have expired and make workers rebuild their filters'
+
+    def handle(self, *args, **kwargs):
+        deleted = revocation_store.compact()
+        self.stdout.write(self.style.SUCCESS(f'Removed {deleted} expired revoked tokens'))
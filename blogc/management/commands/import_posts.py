@@ -0,0 +1,163 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from blogc import snapshots, sync
+from blogc.images import process_image
+from blogc.media import media_storage
+from blogc.models import BlogCategory, BlogPost
+
+
+class Command(BaseCommand):
+    help = (
+        'Import posts from a JSON-lines file, one object per line with title, content, '
+        'author (username or e-mail), category (name or slug) and optionally image (path '
+        'relative to --images), published, created_at and slug. Images are resized in a '
+        'worker pool and uploaded concurrently; rows are inserted with bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--images', default='.', help='Directory image paths are relative to')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--executor', choices=('process', 'thread'), default='process',
+                            help='Pool used to decode and resize images')
+        parser.add_argument('--upload-threads', type=int, default=8)
+        parser.add_argument('--max-size', type=int, default=1600, help='Longest image side in pixels')
+        parser.add_argument('--quality', type=int, default=85)
+        parser.add_argument('--default-author', help='Username used when a row names an unknown author')
+        parser.add_argument('--create-categories', action='store_true')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['path']):
+            raise CommandError(f'No such file: {options["path"]}')
+        self.options = options
+        started = time.monotonic()
+        self.load_maps()
+
+        pool_class = ProcessPoolExecutor if options['executor'] == 'process' else ThreadPoolExecutor
+        imported = skipped = 0
+        with pool_class(max_workers=options['workers']) as self.image_pool, \
+                ThreadPoolExecutor(max_workers=options['upload_threads']) as self.upload_pool, \
+                open(options['path'], encoding='utf-8') as fh:
+            lines = (line for line in fh if line.strip())
+            while True:
+                batch = list(islice(lines, options['batch_size']))
+                if not batch:
+                    break
+                done, bad = self.import_batch([json.loads(line) for line in batch])
+                imported += done
+                skipped += bad
+                self.stdout.write(f'  {imported} imported, {skipped} skipped')
+        # bulk_create sends no post_save, so refresh the static snapshots and log the
+        # new posts for the sync feed once at the end
+        snapshots.schedule(full=True)
+        sync.backfill()
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} posts ({skipped} skipped) in {time.monotonic() - started:.1f}s'
+        ))
+
+    # ----------------- lookups, resolved once -----------------
+    def load_maps(self):
+        self.categories = {}
+        for pk, name, slug in BlogCategory.objects.values_list('id', 'name', 'slug'):
+            self.categories[name.lower()] = pk
+            self.categories[slug] = pk
+        self.authors = {}
+        for pk, username, email in User.objects.values_list('id', 'username', 'email').iterator(chunk_size=5000):
+            self.authors[username] = pk
+            if email:
+                self.authors.setdefault(email.lower(), pk)
+        default = self.options['default_author']
+        self.default_author = None
+        if default:
+            if default not in self.authors:
+                raise CommandError(f'Unknown --default-author {default}')
+            self.default_author = self.authors[default]
+        # Every slug in use, plus the next suffix to try per base slug
+        self.slugs = set(BlogPost.objects.values_list('slug', flat=True).iterator(chunk_size=5000))
+        self.next_suffix = {}
+
+    def unique_slug(self, text):
+        base = slugify(text)[:240] or 'post'
+        n = self.next_suffix.get(base, 0)
+        slug = base if n == 0 else f'{base}-{n}'
+        while slug in self.slugs:
+            n += 1
+            slug = f'{base}-{n}'
+        self.next_suffix[base] = n + 1
+        self.slugs.add(slug)
+        return slug
+
+    def resolve_categories(self, rows):
+        names = {str(row['category']).strip() for row in rows if row.get('category')}
+        missing = {name for name in names if name.lower() not in self.categories and name not in self.categories}
+        if missing and self.options['create_categories']:
+            BlogCategory.objects.bulk_create(
+                [BlogCategory(name=name, slug=slugify(name)) for name in missing], ignore_conflicts=True
+            )
+            for pk, name, slug in BlogCategory.objects.filter(name__in=missing).values_list('id', 'name', 'slug'):
+                self.categories[name.lower()] = pk
+                self.categories[slug] = pk
+
+    # ----------------- batches -----------------
+    def import_batch(self, rows):
+        self.resolve_categories(rows)
+        posts, image_jobs, skipped = [], [], 0
+        for row in rows:
+            author = str(row.get('author', ''))
+            author_id = self.authors.get(author, self.authors.get(author.lower(), self.default_author))
+            if author_id is None or not row.get('title'):
+                skipped += 1
+                self.stderr.write(f'Skipping {row.get("title")!r}: unknown author {author!r} or no title')
+                continue
+            category = str(row.get('category') or '').strip()
+            created_at = parse_datetime(row['created_at']) if row.get('created_at') else None
+            if created_at is not None and timezone.is_naive(created_at):
+                created_at = timezone.make_aware(created_at)
+            posts.append(BlogPost(
+                title=row['title'],
+                slug=self.unique_slug(row.get('slug') or row['title']),
+                content=row.get('content', ''),
+                author_id=author_id,
+                category_id=self.categories.get(category.lower(), self.categories.get(category)),
+                published=row.get('published', True),
+                created_at=created_at or timezone.now(),
+            ))
+            if row.get('image'):
+                image_jobs.append((posts[-1], os.path.join(self.options['images'], row['image'])))
+
+        # Decode/resize in the worker pool, upload each result as soon as it is ready
+        options = self.options
+        resized = [
+            (post, path, self.image_pool.submit(process_image, path, options['max_size'], options['quality']))
+            for post, path in image_jobs
+        ]
+        uploads = []
+        for post, path, future in resized:
+            try:
+                name, data = future.result()
+            except Exception as e:
+                self.stderr.write(f'Image {path} skipped: {e}')
+                continue
+            uploads.append((post, self.upload_pool.submit(media_storage.save, f'post_images/{name}', ContentFile(data))))
+        for post, future in uploads:
+            try:
+                post.image = future.result()
+            except Exception as e:
+                self.stderr.write(f'Upload for {post.slug} failed: {e}')
+
+        with transaction.atomic():
+            BlogPost.objects.bulk_create(posts, batch_size=options['batch_size'])
+        return len(posts), skipped
@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ImportRow = namedtuple('ImportRow', 'self_us cumulative_us depth module')
+
+# Mirrors what a worker does on boot: configure Django, load the URLconf and build the app
+STARTUP_SCRIPT = """
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+from django.core.{kind} import get_{kind}_application
+get_{kind}_application()
+"""
+
+
+def parse_importtime(stderr):
+    """Parse `python -X importtime` output into ImportRow tuples."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append(ImportRow(int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Profile process start-up imports with `python -X importtime` and report the slowest modules'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25)
+        parser.add_argument('--sort', choices=['self', 'cumulative'], default='cumulative')
+        parser.add_argument('--asgi', action='store_true', help='Profile the ASGI application instead of WSGI')
+        parser.add_argument('--module', help='Profile importing this module instead of a full app start-up')
+        parser.add_argument('--raw', help='Also write the raw importtime output to this file')
+
+    def handle(self, *args, **options):
+        if options['module']:
+            script = f'import {options["module"]}'
+        else:
+            script = STARTUP_SCRIPT.format(kind='asgi' if options['asgi'] else 'wsgi')
+
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'api.settings'))
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode:
+            raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr else 'import failed')
+        if options['raw']:
+            with open(options['raw'], 'w') as fh:
+                fh.write(proc.stderr)
+
+        rows = parse_importtime(proc.stderr)
+        total = sum(row.self_us for row in rows)
+        key = (lambda r: r.self_us) if options['sort'] == 'self' else (lambda r: r.cumulative_us)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{len(rows)} modules imported in {total / 1000:.1f} ms (sum of self time)'
+        ))
+        self.stdout.write(f'{"self ms":>9} {"cumul ms":>9}  module')
+        for row in sorted(rows, key=key, reverse=True)[:options['top']]:
+            self.stdout.write(f'{row.self_us / 1000:9.1f} {row.cumulative_us / 1000:9.1f}  {row.module}')
+
+        # Top-level packages by cumulative time, the usual lazy-import candidates
+        packages = {}
+        for row in rows:
+            if row.depth == 0:
+                package = row.module.split('.')[0]
+                packages[package] = packages.get(package, 0) + row.cumulative_us
+        self.stdout.write(self.style.MIGRATE_HEADING('By top-level package'))
+        for package, cumulative in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['top']]:
+            self.stdout.write(f'{cumulative / 1000:9.1f} ms  {package}')
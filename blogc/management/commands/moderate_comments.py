@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blogc import moderation
+
+
+class Command(BaseCommand):
+    help = (
+        'Score new comments for spam in batches and hide the flagged ones for review '
+        'in the admin moderation queue (api/admin/comments/moderation/).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Defaults to MODERATION["BATCH_SIZE"]')
+        parser.add_argument('--threshold', type=float, help='Defaults to MODERATION["THRESHOLD"]')
+
+    def handle(self, *args, **options):
+        settings = moderation.get_options()
+        if options['batch_size']:
+            settings['BATCH_SIZE'] = options['batch_size']
+        if options['threshold'] is not None:
+            settings['THRESHOLD'] = options['threshold']
+        started = time.perf_counter()
+        scored, flagged = moderation.score_all(settings)
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {scored} comments, flagged {flagged} in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blogc import sync
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete sync log rows that no client needs any more: changes superseded by a later '
+        'change to the same object, and tombstones older than SYNC["TOMBSTONE_DAYS"].'
+    )
+
+    def handle(self, *args, **kwargs):
+        removed = sync.prune()
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} sync log rows'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from blogc.snapshots import publisher
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-render every static JSON snapshot (latest posts, categories, category pages) '
+        'and, with --prune, delete superseded files. Run periodically to refresh counts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true')
+
+    def handle(self, *args, **options):
+        manifest = publisher.publish()
+        self.stdout.write(self.style.SUCCESS(f'Published {len(manifest)} snapshots to {publisher.root}'))
+        if options['prune']:
+            self.stdout.write(f'Pruned {publisher.prune()} superseded files')
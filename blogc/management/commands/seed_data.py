@@ -0,0 +1,229 @@
+import io
+import os
+import random
+import time
+import uuid
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from blogc import sync
+from blogc.models import BlogCategory, BlogPost, Comment, Like, UserProfile
+from blogc.threads import fill_root_paths
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat duis aute irure "
+    "in reprehenderit voluptate velit esse cillum fugiat nulla pariatur excepteur sint "
+    "occaecat cupidatat non proident sunt culpa qui officia deserunt mollit anim id est laborum"
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Generate large volumes of synthetic users, posts, comments and likes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--likes', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--words', type=int, default=200,
+                            help='Average number of words in a post body')
+        parser.add_argument('--comment-words', type=int, default=25)
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Zipf exponent for post popularity (0 = uniform)')
+        parser.add_argument('--images', type=int, default=0,
+                            help='Number of placeholder images to write to local media and reuse')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread created_at over this many past days')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.window = options['days'] * 86400
+        run = uuid.uuid4().hex[:8]
+        started = time.monotonic()
+
+        if not BlogCategory.objects.exists():
+            call_command('seed_categories', stdout=io.StringIO())
+        category_ids = list(BlogCategory.objects.values_list('id', flat=True))
+
+        user_ids = self.create_users(run, options['users'])
+        images = self.create_images(run, options['images'])
+        post_ids = self.create_posts(run, options['posts'], user_ids, category_ids, images, options['words'])
+
+        # Rank posts in a random order so popularity is not correlated with age
+        ranked = post_ids[:]
+        self.rng.shuffle(ranked)
+        weights = [1.0 / (rank ** options['skew']) for rank in range(1, len(ranked) + 1)]
+
+        self.create_comments(options['comments'], ranked, weights, user_ids, options['comment_words'])
+        self.create_likes(options['likes'], ranked, weights, user_ids)
+        # bulk_create sends no post_save, so log the seeded rows for the sync feed here
+        sync.backfill()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded run {run} in {time.monotonic() - started:.1f}s'
+        ))
+
+    # ----------------- helpers -----------------
+    def random_time(self):
+        return self.now - timedelta(seconds=self.rng.randrange(max(self.window, 1)))
+
+    def lorem(self, average):
+        count = max(1, int(self.rng.gauss(average, average / 4)))
+        words = self.rng.choices(WORDS, k=count)
+        words[0] = words[0].capitalize()
+        return ' '.join(words) + '.'
+
+    def bulk_insert(self, model, objs, **kwargs):
+        with transaction.atomic():
+            model.objects.bulk_create(objs, batch_size=self.batch_size, **kwargs)
+
+    def batched(self, total, label, make):
+        done = 0
+        while done < total:
+            size = min(self.batch_size, total - done)
+            make(done, size)
+            done += size
+            self.stdout.write(f'{label}: {done}/{total}', ending='\r')
+        if total:
+            self.stdout.write('')
+
+    # ----------------- generators -----------------
+    def create_users(self, run, total):
+        # Hashing is deliberately slow, so every generated user shares one hash
+        password = make_password('password')
+
+        def make(offset, size):
+            users = [
+                User(
+                    username=f'seed-{run}-{offset + i}',
+                    email=f'seed-{run}-{offset + i}@example.com',
+                    password=password,
+                    date_joined=self.random_time(),
+                )
+                for i in range(size)
+            ]
+            self.bulk_insert(User, users)
+
+        self.batched(total, 'users', make)
+        user_ids = list(
+            User.objects.filter(username__startswith=f'seed-{run}-').values_list('id', flat=True)
+        )
+        # bulk_create skips post_save, so create the profiles the signal would have
+        for start in range(0, len(user_ids), self.batch_size):
+            self.bulk_insert(UserProfile, [
+                UserProfile(user_id=user_id, role='user', is_blog_admin=False)
+                for user_id in user_ids[start:start + self.batch_size]
+            ])
+        if not user_ids:
+            user_ids = list(User.objects.values_list('id', flat=True))
+        if not user_ids:
+            raise CommandError('No users available, pass --users')
+        return user_ids
+
+    def create_images(self, run, total):
+        if not total:
+            return []
+        from PIL import Image
+
+        storage = FileSystemStorage(location=getattr(settings, 'MEDIA_ROOT', None) or os.path.join(settings.BASE_DIR, 'media'))
+        names = []
+        for i in range(total):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', (640, 360), color).save(buffer, format='PNG')
+            names.append(storage.save(f'post_images/seed-{run}-{i}.png', buffer))
+        self.stdout.write(f'images: {len(names)} placeholders in {storage.location}')
+        return names
+
+    def create_posts(self, run, total, user_ids, category_ids, images, words):
+        def make(offset, size):
+            posts = []
+            for i in range(offset, offset + size):
+                created = self.random_time()
+                title = self.lorem(6).rstrip('.')
+                posts.append(BlogPost(
+                    title=title,
+                    slug=f'seed-{run}-{i}',
+                    author_id=self.rng.choice(user_ids),
+                    category_id=self.rng.choice(category_ids),
+                    content=self.lorem(words),
+                    image=self.rng.choice(images) if images else None,
+                    published=self.rng.random() > 0.05,
+                    created_at=created,
+                ))
+            self.bulk_insert(BlogPost, posts)
+
+        self.batched(total, 'posts', make)
+        seeded = BlogPost.objects.filter(slug__startswith=f'seed-{run}-')
+        # updated_at is auto_now, which bulk_create overwrites: backdate it in one UPDATE
+        seeded.update(updated_at=F('created_at'))
+        post_ids = list(seeded.values_list('id', flat=True))
+        if not post_ids:
+            post_ids = list(BlogPost.objects.values_list('id', flat=True))
+        return post_ids
+
+    def create_comments(self, total, ranked, weights, user_ids, words):
+        if not ranked:
+            return
+        cum_weights = list(accumulate(weights))
+
+        def make(offset, size):
+            post_ids = self.rng.choices(ranked, cum_weights=cum_weights, k=size)
+            self.bulk_insert(Comment, [
+                Comment(
+                    post_id=post_id,
+                    user_id=self.rng.choice(user_ids),
+                    body=self.lorem(words),
+                    created_at=self.random_time(),
+                )
+                for post_id in post_ids
+            ])
+
+        self.batched(total, 'comments', make)
+        # bulk_create skips Comment.save(), which is what fills in thread paths
+        fill_root_paths()
+
+    def create_likes(self, total, ranked, weights, user_ids):
+        if not ranked:
+            return
+        # A post can be liked at most once per user, so share the total out by
+        # popularity weight and draw distinct users per post.
+        total = min(total, len(ranked) * len(user_ids))
+        scale = total / sum(weights)
+        pending = []
+        created = 0
+        carry = 0.0
+        for post_id, weight in zip(ranked, weights):
+            # Carry the fractional part forward so the long tail still gets likes
+            carry += weight * scale
+            count = min(len(user_ids), int(carry))
+            carry -= count
+            if not count:
+                continue
+            for user_id in self.rng.sample(user_ids, count):
+                pending.append(Like(post_id=post_id, user_id=user_id, created_at=self.random_time()))
+            if len(pending) >= self.batch_size:
+                self.bulk_insert(Like, pending, ignore_conflicts=True)
+                created += len(pending)
+                pending = []
+                self.stdout.write(f'likes: {created}/{total}', ending='\r')
+        if pending:
+            self.bulk_insert(Like, pending, ignore_conflicts=True)
+            created += len(pending)
+        self.stdout.write(f'likes: {created}/{total}')
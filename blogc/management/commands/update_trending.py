@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blogc import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Periodic trending maintenance: prune rows that have decayed away, or with --rebuild '
+        'recompute every score from recent likes and comments (e.g. after seed_data).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = trending.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt trending scores for {count} posts'))
+        else:
+            count = trending.prune()
+            self.stdout.write(self.style.SUCCESS(f'Pruned {count} decayed trending rows'))
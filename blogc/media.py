@@ -0,0 +1,115 @@
+# media.py
+import logging
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils.encoding import filepath_to_uri
+from django.utils.functional import LazyObject
+
+logger = logging.getLogger(__name__)
+
+
+class LazyMediaStorage(LazyObject):
+    """
+    Defers building MediaStorage (and importing boto3/botocore/s3transfer) until
+    the storage is first used, e.g. to save an upload or build an image URL.
+
+    Pass the instance (not a callable) to FileField: the callable path runs an
+    isinstance() check that would force the import at model load. Migrations
+    still deconstruct it as MediaStorage(), so no schema change is produced.
+    """
+    def _setup(self):
+        from .storage_backends import MediaStorage
+        self._wrapped = MediaStorage()
+
+    def __bool__(self):
+        # FileField.__init__ does `storage or default_storage`; answer without setting up
+        return True
+
+
+media_storage = LazyMediaStorage()
+
+
+def get_options():
+    options = {
+        # Host serving the media keys (e.g. a CloudFront distribution in front of the
+        # bucket); replaces the storage's host in unsigned URLs
+        'CDN_DOMAIN': '',
+        'SIGNED_URL_CACHE_SIZE': 10000,
+    }
+    options.update(settings.BLOGC_SETTINGS.get('MEDIA', {}))
+    return options
+
+
+class MediaURLResolver:
+    """
+    Image URLs without a storage call per row. Unsigned URLs are the same prefix
+    plus the quoted key, so the prefix is asked of the storage once and keys are
+    joined onto it. With querystring auth on, each URL is signed by the storage
+    and reused until half its lifetime has passed.
+    """
+    PROBE = 'url-prefix-probe'
+
+    def __init__(self, storage=media_storage, options=None):
+        self.storage = storage
+        self.options = options or get_options()
+        self._prefix = None
+        self._signed = {}
+
+    def reset(self):
+        self._prefix = None
+        self._signed.clear()
+
+    @property
+    def prefix(self):
+        # Worked out on first use so that importing this module leaves boto3 unloaded
+        if self._prefix is None:
+            if getattr(self.storage, 'querystring_auth', False):
+                self._prefix = ''  # signed URLs share no prefix
+            else:
+                url = self.storage.url(self.PROBE)
+                prefix = url[:-len(self.PROBE)] if url.endswith(self.PROBE) else ''
+                if prefix and self.options['CDN_DOMAIN']:
+                    prefix = urlsplit(prefix)._replace(scheme='https', netloc=self.options['CDN_DOMAIN']).geturl()
+                self._prefix = prefix
+        return self._prefix
+
+    def url(self, name):
+        prefix = self.prefix
+        if prefix:
+            return prefix + filepath_to_uri(name)
+        return self._signed_url(name)
+
+    def _signed_url(self, name):
+        now = time.monotonic()
+        cached = self._signed.get(name)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        url = self.storage.url(name)
+        if len(self._signed) >= self.options['SIGNED_URL_CACHE_SIZE']:
+            self._signed.clear()
+        ttl = getattr(self.storage, 'querystring_expire', 3600)
+        self._signed[name] = (url, now + ttl / 2)
+        return url
+
+
+resolver = MediaURLResolver()
+
+
+def media_url(name, request=None):
+    """
+    Absolute URL of a stored media file, as the API returns it; None for no file.
+    Without a request, a storage that serves from this host gives the URL under the
+    resolver's own prefix (e.g. /media/...), relative to the site.
+    """
+    if not name:
+        return None
+    try:
+        url = resolver.url(name)
+    except Exception:
+        logger.exception('Building the media URL for %s failed', name)
+        return None
+    if request is not None and not url.startswith(('http://', 'https://')):
+        return request.build_absolute_uri(url)
+    return url
@@ -0,0 +1,153 @@
+# middleware.py
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.responders import MissingFileError
+
+from . import snapshots
+from .routers import pick_replica, read_from
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware is sync-only, which makes Django run the whole request
+    chain through a thread under ASGI. This variant is async-capable: non-static
+    requests pass straight through and only static file hits touch a thread.
+
+    It also serves the JSON snapshots written at runtime by blogc.snapshots,
+    which WhiteNoise's startup scan can't know about: they are looked up on
+    first request and, being content-addressed, cached as immutable.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        static_file = self.find_static(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        path = request.path_info
+        if self.autorefresh or (path not in self.files and snapshots.is_snapshot_url(path)):
+            static_file = await sync_to_async(self.find_static)(path)
+        else:
+            static_file = self.files.get(path)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+    def find_static(self, url):
+        static_file = self.find_file(url) if self.autorefresh else self.files.get(url)
+        if static_file is None and snapshots.is_snapshot_url(url):
+            static_file = self.find_snapshot(url)
+        return static_file
+
+    def find_snapshot(self, url):
+        path = os.path.join(snapshots.publisher.root, url.rsplit('/', 1)[-1])
+        try:
+            static_file = self.get_static_file(path, url)
+        except MissingFileError:
+            return None
+        if snapshots.is_immutable(url):
+            self.files[url] = static_file
+        return static_file
+
+    def immutable_file_test(self, path, url):
+        return snapshots.is_immutable(url) or super().immutable_file_test(path, url)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe-method requests to the post, category and comment endpoints read
+    from a replica. A successful write pins that client to the primary for
+    READ_YOUR_WRITES_WINDOW seconds, so they always see their own changes:
+    browsers through a cookie, token clients through a cache entry keyed by user.
+    """
+    sync_capable = True
+    async_capable = True
+    pin_cookie = 'blogc_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.window = settings.BLOGC_SETTINGS.get('READ_YOUR_WRITES_WINDOW', 10)
+        self.prefixes = tuple(settings.BLOGC_SETTINGS.get('REPLICA_PATH_PREFIXES', ()))
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.routable(request):
+            return self.get_response(request)
+        alias = self.read_alias(request)
+        with read_from(alias):
+            response = self.get_response(request)
+        self.maybe_pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not self.routable(request):
+            return await self.get_response(request)
+        alias = await sync_to_async(self.read_alias)(request)
+        with read_from(alias):
+            response = await self.get_response(request)
+        await sync_to_async(self.maybe_pin)(request, response)
+        return response
+
+    def routable(self, request):
+        return request.path_info.startswith(self.prefixes)
+
+    def read_alias(self, request):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        if request.COOKIES.get(self.pin_cookie):
+            return None
+        key = self.pin_key(request)
+        if key and cache.get(key):
+            return None
+        return pick_replica()
+
+    def maybe_pin(self, request, response):
+        if request.method in ('GET', 'HEAD', 'OPTIONS') or not (200 <= response.status_code < 300):
+            return
+        if not self.window:
+            return
+        key = self.pin_key(request)
+        if key:
+            cache.set(key, 1, self.window)
+        response.set_cookie(
+            self.pin_cookie, '1', max_age=self.window, httponly=True,
+            secure=request.is_secure(), samesite='Lax',
+        )
+
+    @staticmethod
+    def pin_key(request):
+        """Identify the client without a DB hit: JWT claim first, then the session user id."""
+        user_id = None
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if header.startswith('Bearer '):
+            try:
+                token = AccessToken(header.split(' ', 1)[1])
+                user_id = token.get(jwt_settings.USER_ID_CLAIM)
+            except TokenError:
+                pass
+        if user_id is None and hasattr(request, 'session'):
+            user_id = request.session.get(SESSION_KEY)
+        return f'blogc:primary-pin:{user_id}' if user_id is not None else None
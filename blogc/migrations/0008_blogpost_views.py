@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogc', '0007_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='views',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
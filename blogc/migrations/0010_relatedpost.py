@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogc', '0009_trendingscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='blogc.blogpost')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='linked_from', to='blogc.blogpost')),
+            ],
+            options={
+                'ordering': ['post', 'rank'],
+                'indexes': [models.Index(fields=['post', 'rank'], name='blogc_relat_post_id_b668dd_idx')],
+                'unique_together': {('post', 'related')},
+            },
+        ),
+    ]
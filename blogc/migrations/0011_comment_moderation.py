@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogc', '0010_relatedpost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='spam_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        # Comments that predate moderation are treated as approved; new ones start as 'new'
+        migrations.AddField(
+            model_name='comment',
+            name='status',
+            field=models.CharField(choices=[('new', 'New'), ('approved', 'Approved'), ('flagged', 'Flagged'), ('rejected', 'Rejected')], default='approved', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='status',
+            field=models.CharField(choices=[('new', 'New'), ('approved', 'Approved'), ('flagged', 'Flagged'), ('rejected', 'Rejected')], default='new', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['status', 'created_at'], name='blogc_comme_status_0d0b2e_idx'),
+        ),
+    ]
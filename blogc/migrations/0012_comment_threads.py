@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, LPad
+
+
+def fill_root_paths(apps, schema_editor):
+    # Every existing comment is a thread root: its path is its own zero-padded id
+    Comment = apps.get_model('blogc', 'Comment')
+    Comment.objects.filter(path='').update(path=LPad(Cast('id', CharField()), 10, Value('0')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogc', '0011_comment_moderation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='blogc.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='blogc_comme_post_id_aae02f_idx'),
+        ),
+        migrations.RunPython(fill_root_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def log_existing_rows(apps, schema_editor):
+    # One live row per existing post, visible comment and like, so the first sync
+    # (no ?since) can page through everything from the log
+    SyncChange = apps.get_model('blogc', 'SyncChange')
+    sources = (
+        ('post', apps.get_model('blogc', 'BlogPost').objects.all()),
+        ('comment', apps.get_model('blogc', 'Comment').objects.filter(active=True)),
+        ('like', apps.get_model('blogc', 'Like').objects.all()),
+    )
+    for kind, queryset in sources:
+        ids = queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=2000)
+        SyncChange.objects.bulk_create((SyncChange(kind=kind, object_id=pk) for pk in ids), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogc', '0012_comment_threads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('comment', 'Comment'), ('like', 'Like')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'object_id'], name='blogc_syncc_kind_e056a1_idx')],
+            },
+        ),
+        migrations.RunPython(log_existing_rows, migrations.RunPython.noop),
+    ]
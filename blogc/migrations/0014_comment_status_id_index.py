@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogc', '0013_sync_changes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['status', '-id'], name='blogc_comme_status_34a43d_idx'),
+        ),
+    ]
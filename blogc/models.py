@@ -1,9 +1,9 @@
 # models.py - FIXED
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.text import slugify  # Add this import
-from .storage_backends import MediaStorage
+from .media import media_storage
 
 # Extended profile to include blog admin flag and role
 class UserProfile(models.Model):
@@ -34,8 +34,9 @@ class BlogPost(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     category = models.ForeignKey(BlogCategory, on_delete=models.SET_NULL, null=True, related_name='posts')
     content = models.TextField()
-    image = models.ImageField(upload_to='post_images/', storage=MediaStorage(), null=True, blank=True)
+    image = models.ImageField(upload_to='post_images/', storage=media_storage, null=True, blank=True)
     published = models.BooleanField(default=True)
+    views = models.PositiveBigIntegerField(default=0)  # flushed in batches by counters.view_counter
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -57,15 +58,59 @@ class BlogPost(models.Model):
                 counter += 1
         super().save(*args, **kwargs)
 
+# Digits per level of Comment.path: each level is a zero-padded comment id
+PATH_SEGMENT = 10
+
+
+def path_segment(pk):
+    return str(pk).zfill(PATH_SEGMENT)
+
+
 class Comment(models.Model):
+    STATUS_CHOICES = [
+        ('new', 'New'),  # not scored by the spam filter yet
+        ('approved', 'Approved'),
+        ('flagged', 'Flagged'),  # hidden until an admin approves or rejects it
+        ('rejected', 'Rejected'),
+    ]
+
     post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     body = models.TextField(default="Default body text")
     active = models.BooleanField(default=True)  # for soft delete
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='new')
+    spam_score = models.FloatField(null=True, blank=True)  # set by moderation.score_pending
     created_at = models.DateTimeField(default=timezone.now)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
+    # Materialized path: the ids of the ancestors and then this comment, so ordering by
+    # path lists threads depth-first in display order and a subtree is one range scan
+    # (see blogc.threads). Filled in on first save.
+    path = models.CharField(max_length=255, blank=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['post', 'path']),
+            models.Index(fields=['status', '-id']),  # admin changelist filtered by status, newest first
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.parent_id is not None:
+            self.depth = self.parent.depth + 1
+        # The INSERT and the path UPDATE after it commit together or not at all
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Comment, instance=self)):
+            super().save(*args, **kwargs)
+
+    def _save_table(self, raw=False, cls=None, force_insert=False, force_update=False, using=None, update_fields=None):
+        updated = super()._save_table(raw, cls, force_insert, force_update, using, update_fields)
+        if not self.path:
+            # The path ends with our own id, so it can only be written after the INSERT;
+            # doing it here, before post_save is sent, means receivers never see it empty
+            self.path = (self.parent.path if self.parent_id else '') + path_segment(self.pk)
+            Comment._base_manager.using(using).filter(pk=self.pk).update(path=self.path)
+        return updated
 
     def __str__(self):
         return f'Comment by {self.user.username} on {self.post.title}'
@@ -80,4 +125,64 @@ class Like(models.Model):
         unique_together = ('post', 'user')
 
     def __str__(self):
-        return f'{self.user.username} likes {self.post.title}'
\ No newline at end of file
+        return f'{self.user.username} likes {self.post.title}'
+
+class RevokedToken(models.Model):
+    # Refresh tokens that were rotated or revoked, keyed by their jti claim.
+    # Rows are only needed until the token would have expired anyway.
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class TrendingScore(models.Model):
+    # Time-decayed activity score kept in log space (see trending.py), so ordering
+    # by `score` is the current trending order without any periodic re-scaling.
+    post = models.OneToOneField(BlogPost, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    score = models.FloatField(db_index=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.3f}'
+
+
+class RelatedPost(models.Model):
+    # Precomputed "related posts" (TF-IDF cosine neighbours), written by build_related_posts
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='linked_from')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['post', 'rank']
+        unique_together = ('post', 'related')
+        indexes = [models.Index(fields=['post', 'rank'])]
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id} ({self.score:.3f})'
+
+
+class SyncChange(models.Model):
+    # Append-only log behind the sync feed (see blogc.sync). Every write to a post,
+    # comment or like appends a row, so the id is a monotonic change token; deletions
+    # stay as rows with deleted=True (tombstones) until prune_sync_log removes them.
+    KIND_CHOICES = [
+        ('post', 'Post'),
+        ('comment', 'Comment'),
+        ('like', 'Like'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['kind', 'object_id'])]
+
+    def __str__(self):
+        return f'{self.id}: {self.kind} {self.object_id}{" deleted" if self.deleted else ""}'
@@ -0,0 +1,173 @@
+# moderation.py
+# Batch spam scoring for comments. New comments are visible straight away; a
+# periodic job (manage.py moderate_comments) scores them a batch at a time with
+# numpy over three signals and hides the suspicious ones with a single UPDATE:
+#   repetition   - the same normalised body posted again recently (or one word spammed)
+#   link density - links per word
+#   burst rate   - comments by the same user within BURST_WINDOW_SECONDS
+# Flagged comments wait in the admin moderation queue to be approved or rejected.
+import hashlib
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+
+from . import sync, trending
+from .models import Comment
+
+WORD_RE = re.compile(r'\w+')
+LINK_RE = re.compile(r'(?:https?://|www\.)\S+|\b[\w-]+\.(?:com|net|org|ru|xyz|top|info|biz)\b', re.I)
+
+
+def get_options():
+    options = {
+        'BATCH_SIZE': 2000,
+        'THRESHOLD': 0.5,
+        'REPETITION_WEIGHT': 0.4,
+        'LINK_WEIGHT': 0.35,
+        'BURST_WEIGHT': 0.25,
+        'REPEAT_WINDOW_HOURS': 6,
+        'REPEAT_LIMIT': 3,  # copies of one body that count as fully repetitive
+        'MAX_LINK_DENSITY': 0.2,  # links per word that count as fully link-dense
+        'BURST_WINDOW_SECONDS': 300,
+        'BURST_LIMIT': 5,  # comments per window that count as a full burst
+    }
+    options.update(settings.BLOGC_SETTINGS.get('MODERATION', {}))
+    return options
+
+
+def _fingerprint(body):
+    normalized = ' '.join(WORD_RE.findall(body.lower()))
+    return int.from_bytes(hashlib.blake2b(normalized.encode(), digest_size=8).digest(), 'little', signed=True)
+
+
+def _text_features(body):
+    words = WORD_RE.findall(body.lower())
+    self_repeat = 1 - len(set(words)) / len(words) if len(words) >= 8 else 0.0
+    return len(words), len(LINK_RE.findall(body)), self_repeat
+
+
+def score(batch, history=(), options=None):
+    """
+    Spam scores in [0, 1] for `batch`, a list of (user_id, body, created_at).
+    `history` holds already-moderated comments from just before the batch, so
+    repeats and bursts that straddle two batches are still seen.
+    """
+    import numpy as np
+
+    options = options or get_options()
+    rows = list(batch) + list(history)
+    n = len(batch)
+    if not n:
+        return np.zeros(0)
+    users = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    times = np.fromiter((r[2].timestamp() for r in rows), dtype=np.float64, count=len(rows))
+    prints = np.fromiter((_fingerprint(r[1]) for r in rows), dtype=np.int64, count=len(rows))
+    words, links, self_repeat = np.array([_text_features(r[1]) for r in batch], dtype=np.float64).reshape(-1, 3).T
+
+    rel = times - times.min()
+
+    # Repetition: copies of the same body within REPEAT_WINDOW_HOURS either side, across
+    # batch + history; same combined-key trick as for bursts below, keyed by body
+    repeat_window = options['REPEAT_WINDOW_HOURS'] * 3600
+    _, bodies = np.unique(prints, return_inverse=True)
+    key = bodies.ravel() * (rel.max() + repeat_window + 1) + rel
+    sorted_key = np.sort(key)
+    copies = (
+        np.searchsorted(sorted_key, key[:n] + repeat_window, side='right')
+        - np.searchsorted(sorted_key, key[:n] - repeat_window, side='left') - 1
+    )
+    repetition = np.maximum(np.clip(copies / options['REPEAT_LIMIT'], 0, 1), self_repeat)
+
+    link_density = np.clip(links / np.maximum(words, 1) / options['MAX_LINK_DENSITY'], 0, 1)
+
+    # Burst: order by (user, time) and count each user's comments in the trailing window
+    # with one searchsorted over a combined key (users are spaced further apart than any window)
+    window = options['BURST_WINDOW_SECONDS']
+    key = users * (rel.max() + window + 1) + rel
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+    in_window = np.arange(len(rows)) - np.searchsorted(sorted_key, sorted_key - window, side='left') + 1
+    burst_count = np.empty(len(rows))
+    burst_count[order] = in_window
+    burst = np.clip((burst_count[:n] - 1) / max(options['BURST_LIMIT'] - 1, 1), 0, 1)
+
+    weights = np.array([options['REPETITION_WEIGHT'], options['LINK_WEIGHT'], options['BURST_WEIGHT']])
+    return (weights @ np.vstack([repetition, link_density, burst])) / weights.sum()
+
+
+def score_pending(options=None):
+    """Score the oldest batch of new comments; returns (scored, flagged)."""
+    options = options or get_options()
+    batch = list(
+        Comment.objects.filter(status='new')
+        .order_by('created_at', 'id')
+        .values_list('id', 'user_id', 'body', 'created_at', 'post_id', 'active')[:options['BATCH_SIZE']]
+    )
+    if not batch:
+        return 0, 0
+    since = batch[0][3] - timedelta(
+        seconds=max(options['BURST_WINDOW_SECONDS'], options['REPEAT_WINDOW_HOURS'] * 3600)
+    )
+    history = (
+        Comment.objects.filter(created_at__gte=since, created_at__lte=batch[-1][3])
+        .exclude(status='new')
+        .values_list('user_id', 'body', 'created_at')
+    )
+    scores = score([row[1:4] for row in batch], history.iterator(chunk_size=2000), options)
+    flagged_rows = [row for row, s in zip(batch, scores) if s >= options['THRESHOLD']]
+    flagged = [row[0] for row in flagged_rows]
+    ids = [row[0] for row in batch]
+
+    # One UPDATE for the batch. status='new' skips rows an admin reviewed meanwhile.
+    with transaction.atomic():
+        updated = Comment.objects.filter(pk__in=ids, status='new').update(
+            spam_score=Case(
+                *[When(pk=pk, then=Value(round(float(s), 4))) for pk, s in zip(ids, scores)],
+                output_field=FloatField(),
+            ),
+            status=Case(When(pk__in=flagged, then=Value('flagged')), default=Value('approved')),
+            active=Case(When(pk__in=flagged, then=Value(False)), default=F('active')),
+        )
+        if updated < len(ids):
+            # Only what this UPDATE flagged (its row locks keep reviews out until the commit)
+            # is hidden now: the sync log and trending must not touch rows a review decided
+            still_flagged = set(Comment.objects.filter(pk__in=flagged, status='flagged').values_list('pk', flat=True))
+            flagged_rows = [row for row in flagged_rows if row[0] in still_flagged]
+            flagged = [row[0] for row in flagged_rows]
+        comment_weight = trending.get_options()['COMMENT_WEIGHT']
+        trending.unbump((row[4], comment_weight, row[3]) for row in flagged_rows if row[5])
+        sync.record(sync.COMMENT, flagged, deleted=True)  # last: see sync.record
+    return len(ids), len(flagged)
+
+
+def score_all(options=None):
+    scored = flagged = 0
+    while True:
+        batch_scored, batch_flagged = score_pending(options)
+        if not batch_scored:
+            return scored, flagged
+        scored += batch_scored
+        flagged += batch_flagged
+
+
+def review(ids, decision):
+    """Approve (show) or reject (hide) a set of comments in one UPDATE."""
+    if decision not in ('approve', 'reject'):
+        raise ValueError(f'Unknown moderation decision {decision!r}')
+    approve = decision == 'approve'
+    comments = Comment.objects.filter(pk__in=ids)
+    with transaction.atomic():
+        # Comments that become visible start counting towards trending, hidden ones stop
+        changed = list(comments.exclude(active=approve).values_list('post_id', 'created_at'))
+        updated = comments.update(status='approved' if approve else 'rejected', active=approve)
+        comment_weight = trending.get_options()['COMMENT_WEIGHT']
+        events = [(post_id, comment_weight, created_at) for post_id, created_at in changed]
+        if approve:
+            trending.bump_events(events)
+        else:
+            trending.unbump(events)
+        sync.record_queryset(sync.COMMENT, comments, deleted=not approve)  # last: see sync.record
+        return updated
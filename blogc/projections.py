@@ -0,0 +1,142 @@
+# projections.py
+# Read-only fast path for post listings. Instead of building BlogPost/User/Profile/
+# Category instances and running the nested serializer machinery per row, pull one
+# flat tuple per post with values_list() and assemble the BlogPostListSerializer
+# response shape with plain dict literals. Parity with the serializer is covered by
+# tests; keep the two in step when fields change.
+#
+# With ?include=author,category the listed relations are sideloaded instead: posts
+# carry the related id and each distinct object is sent once, in an `authors` /
+# `categories` map keyed by id, fetched with one IN query per relation.
+from django.contrib.auth.models import User
+from rest_framework import serializers
+
+from .media import media_url
+from .models import BlogCategory
+
+POST_FIELDS = (
+    'id', 'title', 'slug', 'published', 'created_at', 'likes_count', 'comments_count',
+    'views', 'content', 'image', 'author_id', 'category_id',
+)
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name', 'email', 'profile__role', 'profile__is_blog_admin')
+CATEGORY_FIELDS = ('name', 'slug')
+POST_LIST_FIELDS = (
+    POST_FIELDS
+    + tuple(f'author__{field}' for field in AUTHOR_FIELDS)
+    + tuple(f'category__{field}' for field in CATEGORY_FIELDS)
+)
+
+# Relations ?include= can sideload
+INCLUDES = ('author', 'category')
+
+
+def _author(pk, username, first_name, last_name, email, role, is_blog_admin):
+    return {
+        'id': pk,
+        'username': username,
+        'first_name': first_name,
+        'last_name': last_name,
+        'email': email,
+        # Users without a profile row serialize as plain users
+        'role': role if role is not None else 'user',
+        'is_blog_admin': bool(is_blog_admin),
+    }
+
+
+def _category(pk, name, slug):
+    if pk is None:
+        return None
+    return {'id': pk, 'name': name, 'title': name, 'slug': slug}
+
+
+def _post(row, author, category, datetime, request):
+    pk, title, slug, published, created_at, likes_count, comments_count, views, content, image = row[:10]
+    return {
+        'id': pk,
+        'title': title,
+        'slug': slug,
+        'author': author,
+        'category': category,
+        'published': published,
+        'created_at': datetime(created_at),
+        'likes_count': likes_count,
+        'comments_count': comments_count,
+        'views': views,
+        'content': content,
+        'image': media_url(image, request),
+    }
+
+
+def _embedded(row, datetime, request):
+    return _post(row, _author(row[10], *row[12:18]), _category(row[11], *row[18:20]), datetime, request)
+
+
+def post_list_data(queryset, request=None):
+    """
+    Same list of dicts as BlogPostListSerializer(queryset, many=True).data.
+    `queryset` must carry likes_count/comments_count (queries.with_counts); it may be sliced.
+    """
+    # Bound once per response: honours DATETIME_FORMAT and the active time zone like the serializer
+    datetime = serializers.DateTimeField().to_representation
+    return [_embedded(row, datetime, request) for row in queryset.values_list(*POST_LIST_FIELDS)]
+
+
+async def apost_list_data(queryset, request=None):
+    """post_list_data() for async views."""
+    datetime = serializers.DateTimeField().to_representation
+    return [_embedded(row, datetime, request) async for row in queryset.values_list(*POST_LIST_FIELDS)]
+
+
+# ----------------- sideloading -----------------
+def parse_include(value):
+    """The set of relations named by an ?include= value; raises ValidationError on unknown names."""
+    include = {name.strip() for name in (value or '').split(',') if name.strip()}
+    unknown = include.difference(INCLUDES)
+    if unknown:
+        raise serializers.ValidationError({
+            'include': [f'Unknown value(s) {", ".join(sorted(unknown))}; expected {", ".join(INCLUDES)}.']
+        })
+    return include
+
+
+def normalized_post_list_data(queryset, include, request=None):
+    """
+    {'results': posts, 'authors': {id: author}, 'categories': {id: category}}, where
+    posts are post_list_data() items whose `include`d relations are replaced by ids,
+    and only the maps for `include`d relations are present. Map keys are strings so
+    JSON and MessagePack clients see the same thing.
+    """
+    fields = POST_FIELDS
+    if 'author' not in include:
+        fields += tuple(f'author__{field}' for field in AUTHOR_FIELDS)
+    if 'category' not in include:
+        fields += tuple(f'category__{field}' for field in CATEGORY_FIELDS)
+    datetime = serializers.DateTimeField().to_representation
+    results = []
+    author_ids, category_ids = set(), set()
+    for row in queryset.values_list(*fields):
+        joined = row[len(POST_FIELDS):]
+        if 'author' in include:
+            author = row[10]
+            author_ids.add(author)
+        else:
+            author, joined = _author(row[10], *joined[:len(AUTHOR_FIELDS)]), joined[len(AUTHOR_FIELDS):]
+        if 'category' in include:
+            category = row[11]
+            if category is not None:
+                category_ids.add(category)
+        else:
+            category = _category(row[11], *joined)
+        results.append(_post(row, author, category, datetime, request))
+
+    data = {'results': results}
+    if 'author' in include:
+        users = User.objects.filter(pk__in=author_ids).values_list('id', *AUTHOR_FIELDS) if author_ids else ()
+        data['authors'] = {str(user[0]): _author(*user) for user in users}
+    if 'category' in include:
+        categories = (
+            BlogCategory.objects.filter(pk__in=category_ids).values_list('id', *CATEGORY_FIELDS)
+            if category_ids else ()
+        )
+        data['categories'] = {str(category[0]): _category(*category) for category in categories}
+    return data
@@ -0,0 +1,51 @@
+# queries.py
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import BlogPost, Comment, Like
+
+
+def _count_subquery(model, **filters):
+    # Correlated COUNT(*) per post; avoids the row explosion of joining likes and comments together
+    qs = (
+        model.objects.filter(post=OuterRef('pk'), **filters)
+        .order_by()
+        .values('post')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(qs, output_field=IntegerField()), 0)
+
+
+def with_counts(queryset):
+    """Annotate posts with likes_count and comments_count in the same query."""
+    return queryset.annotate(
+        likes_count=_count_subquery(Like),
+        comments_count=_count_subquery(Comment),
+    )
+
+
+def post_list_queryset():
+    return with_counts(
+        BlogPost.objects.select_related('author__profile', 'category')
+    )
+
+
+def post_detail_queryset():
+    return with_counts(
+        BlogPost.objects.select_related('author__profile', 'category')
+    ).prefetch_related(
+        Prefetch(
+            'comments',
+            queryset=Comment.objects.filter(active=True).select_related('user__profile').order_by('path'),
+            to_attr='active_comments',
+        )
+    )
+
+
+def comment_list_queryset(post_id):
+    return (
+        Comment.objects.filter(post__id=post_id, active=True)
+        .select_related('user__profile')
+        .order_by('path')  # threads in display order (see blogc.threads)
+    )
@@ -0,0 +1,258 @@
+# related.py
+# TF-IDF "related posts". The batch job (manage.py build_related_posts) vectorizes
+# published posts into a sparse matrix, finds each post's top-k cosine neighbours with
+# chunked sparse matrix multiplies and writes them to RelatedPost. The matrix and
+# vocabulary are saved so an incremental run only vectorizes new or edited posts.
+# numpy/scipy are imported inside the functions: serving never needs them.
+import math
+import os
+import re
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import BlogPost, RelatedPost
+
+TOKEN_RE = re.compile(r'[a-z0-9]{2,}')
+STOP_WORDS = frozenset(
+    'the and for are but not you all any can had her was one our out has his how its may new now '
+    'old see two way who did get him let put say she too use that with have this will your from '
+    'they been more when what were than them then into just like some time very also only over '
+    'such here there their which would about could other these after where while should'.split()
+)
+TITLE_WEIGHT = 3  # title terms count this many times over body terms
+
+
+def get_options():
+    options = {
+        'TOP_K': 10,
+        'CHUNK_SIZE': 256,
+        'MIN_DF': 2,
+        'MAX_DF': 0.5,
+        'MAX_FEATURES': 50000,
+        'INDEX_PATH': os.path.join(settings.BASE_DIR, 'var', 'related_index.npz'),
+    }
+    options.update(settings.BLOGC_SETTINGS.get('RELATED_POSTS', {}))
+    return options
+
+
+def tokenize(title, content):
+    counts = Counter(t for t in TOKEN_RE.findall(content.lower()) if t not in STOP_WORDS)
+    for token in TOKEN_RE.findall(title.lower()):
+        if token not in STOP_WORDS:
+            counts[token] += TITLE_WEIGHT
+    return counts
+
+
+def _post_rows(queryset):
+    return queryset.filter(published=True).values_list('id', 'title', 'content').iterator(chunk_size=2000)
+
+
+# ----------------- vectorizing -----------------
+def _vectorize(docs, vocabulary, idf):
+    """Sublinear-TF x IDF rows, L2-normalised, as a CSR matrix (unknown terms are dropped)."""
+    import numpy as np
+    from scipy import sparse
+
+    indptr, indices, data = [0], [], []
+    for counts in docs:
+        for term, count in counts.items():
+            column = vocabulary.get(term)
+            if column is not None:
+                indices.append(column)
+                data.append(1.0 + math.log(count))
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(docs), len(vocabulary)),
+    )
+    matrix = matrix.multiply(idf.reshape(1, -1)).tocsr()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags((1.0 / norms).astype(np.float32)) @ matrix
+
+
+def build_index(options):
+    import numpy as np
+
+    started = timezone.now()
+    post_ids, docs = [], []
+    df = Counter()
+    for post_id, title, content in _post_rows(BlogPost.objects.all()):
+        counts = tokenize(title, content)
+        post_ids.append(post_id)
+        docs.append(counts)
+        df.update(counts.keys())
+
+    n_docs = len(docs)
+    max_df = options['MAX_DF'] * n_docs if n_docs >= 10 else n_docs
+    terms = [t for t, n in df.items() if options['MIN_DF'] <= n <= max_df] or list(df)
+    terms = sorted(terms, key=lambda t: -df[t])[:options['MAX_FEATURES']]
+    vocabulary = {term: i for i, term in enumerate(terms)}
+    idf = np.array([math.log((1 + n_docs) / (1 + df[t])) + 1 for t in terms], dtype=np.float32)
+    return {
+        'post_ids': np.asarray(post_ids, dtype=np.int64),
+        'matrix': _vectorize(docs, vocabulary, idf),
+        'terms': terms,
+        'idf': idf,
+        'built_at': started,
+    }
+
+
+def save_index(index, path):
+    import numpy as np
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    matrix = index['matrix']
+    with open(path, 'wb') as fh:
+        np.savez_compressed(
+            fh,
+            post_ids=index['post_ids'], idf=index['idf'], terms=np.asarray(index['terms'], dtype=str),
+            data=matrix.data, indices=matrix.indices, indptr=matrix.indptr, shape=np.asarray(matrix.shape),
+            built_at=np.asarray(index['built_at'].timestamp()),
+        )
+
+
+def load_index(path):
+    import numpy as np
+    from scipy import sparse
+
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as f:
+        return {
+            'post_ids': f['post_ids'],
+            'matrix': sparse.csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape'])),
+            'terms': [str(term) for term in f['terms']],
+            'idf': f['idf'],
+            'built_at': datetime.fromtimestamp(float(f['built_at']), tz=dt_timezone.utc),
+        }
+
+
+# ----------------- scoring -----------------
+def top_k(queries, matrix, query_ids, post_ids, k, chunk_size):
+    """
+    Yield (post_id, [(related_id, score), ...]) for each query row, comparing
+    `chunk_size` rows at a time against the whole matrix with one sparse product.
+    """
+    import numpy as np
+
+    position = {int(pid): i for i, pid in enumerate(post_ids)}
+    matrix_t = matrix.T.tocsr()
+    for start in range(0, queries.shape[0], chunk_size):
+        sims = (queries[start:start + chunk_size] @ matrix_t).toarray()
+        for offset, row in enumerate(sims):
+            post_id = int(query_ids[start + offset])
+            own = position.get(post_id)
+            if own is not None:
+                row[own] = 0.0
+            count = min(k, np.count_nonzero(row > 0))
+            if not count:
+                yield post_id, []
+                continue
+            best = np.argpartition(-row, count - 1)[:count]
+            best = best[np.argsort(-row[best])]
+            yield post_id, [(int(post_ids[i]), float(row[i])) for i in best]
+
+
+def write_links(results, batch_size=5000):
+    """Replace the stored neighbours for every post in `results`."""
+    written = 0
+    with transaction.atomic():
+        pending_ids, rows = [], []
+
+        def flush():
+            RelatedPost.objects.filter(post_id__in=pending_ids).delete()
+            RelatedPost.objects.bulk_create(rows, batch_size=batch_size)
+
+        for post_id, neighbours in results:
+            pending_ids.append(post_id)
+            rows.extend(
+                RelatedPost(post_id=post_id, related_id=related_id, score=score, rank=rank)
+                for rank, (related_id, score) in enumerate(neighbours, start=1)
+            )
+            if len(rows) >= batch_size:
+                flush()
+                written += len(rows)
+                pending_ids, rows = [], []
+        flush()
+        written += len(rows)
+    return written
+
+
+# ----------------- jobs -----------------
+def rebuild(options=None):
+    options = options or get_options()
+    index = build_index(options)
+    results = list(top_k(
+        index['matrix'], index['matrix'], index['post_ids'], index['post_ids'],
+        options['TOP_K'], options['CHUNK_SIZE'],
+    ))
+    # Swap the whole table in one transaction so readers never see it half-written
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        written = write_links(results)
+    save_index(index, options['INDEX_PATH'])
+    return len(index['post_ids']), written
+
+
+def update(options=None):
+    """
+    Incremental run: vectorize only posts created or edited since the saved index
+    (against its vocabulary), re-score them, and re-score existing posts whose
+    stored neighbour lists one of the changed posts would now break into.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    options = options or get_options()
+    index = load_index(options['INDEX_PATH'])
+    if index is None:
+        return rebuild(options)
+
+    started = timezone.now()
+    vocabulary = {term: i for i, term in enumerate(index['terms'])}
+    changed_ids, docs = [], []
+    for post_id, title, content in _post_rows(BlogPost.objects.filter(updated_at__gte=index['built_at'])):
+        changed_ids.append(post_id)
+        docs.append(tokenize(title, content))
+    live = set(BlogPost.objects.filter(published=True).values_list('id', flat=True))
+
+    # Drop deleted/unpublished and changed rows from the matrix, then append the new vectors
+    changed_set = set(changed_ids)
+    keep = np.array([int(pid) in live and int(pid) not in changed_set for pid in index['post_ids']], dtype=bool)
+    changed = _vectorize(docs, vocabulary, index['idf'])
+    matrix = sparse.vstack([index['matrix'][keep], changed]).tocsr()
+    post_ids = np.concatenate([index['post_ids'][keep], np.asarray(changed_ids, dtype=np.int64)])
+
+    written = 0
+    if changed_ids:
+        k, chunk = options['TOP_K'], options['CHUNK_SIZE']
+        results = list(top_k(changed, matrix, changed_ids, post_ids, k, chunk))
+
+        # Existing posts whose list is short, or whose k-th score a changed post now beats
+        floor = {
+            row['post_id']: (row['n'], row['low'])
+            for row in RelatedPost.objects.values('post_id').annotate(n=Count('id'), low=Min('score'))
+        }
+        affected = set()
+        matrix_t = matrix.T.tocsr()
+        for start in range(0, changed.shape[0], chunk):
+            sims = (changed[start:start + chunk] @ matrix_t).tocoo()
+            for column, score in zip(sims.col, sims.data):
+                related_id = int(post_ids[column])
+                n, low = floor.get(related_id, (0, 0.0))
+                if related_id not in changed_set and (n < k or score > low):
+                    affected.add(related_id)
+        if affected:
+            rows = [i for i, pid in enumerate(post_ids) if int(pid) in affected]
+            results += list(top_k(matrix[rows], matrix, post_ids[rows], post_ids, k, chunk))
+        written = write_links(results)
+
+    index.update(matrix=matrix, post_ids=post_ids, built_at=started)
+    save_index(index, options['INDEX_PATH'])
+    return len(changed_ids), written
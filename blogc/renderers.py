@@ -0,0 +1,64 @@
+# renderers.py
+# Faster drop-ins for DRF's stdlib-json renderer and parser, plus MessagePack.
+# orjson writes datetimes, UUIDs and dict/list subclasses (ReturnDict, OrderedDict)
+# itself; anything else (Decimal, lazy translation strings, querysets, ...) goes
+# through DRF's JSONEncoder.default, so the output matches JSONRenderer's. The one
+# difference is raw datetime objects keeping their microseconds; serializer fields
+# have already turned datetimes into strings.
+import msgpack
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_fallback = JSONEncoder().default
+
+# JSON is a superset of JavaScript only once these two are escaped (JSONRenderer does the same)
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer on orjson: same media type and format, several times faster."""
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = self.options
+        # orjson only pretty-prints with two spaces; any ?indent / Accept indent gets that
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=_fallback, option=options)
+        if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b'\\u2028').replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
+
+
+class ORJSONParser(BaseParser):
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        # orjson only reads UTF-8, which is what JSON bodies are (RFC 8259)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    application/msgpack, chosen with `Accept: application/msgpack` (or ?format=msgpack).
+    Timezone-aware datetimes use MessagePack's native timestamp type.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_fallback, use_bin_type=True, datetime=True)
@@ -0,0 +1,185 @@
+# revocation.py
+# Refresh-token revocation without a DB hit on the common (not revoked) path.
+#
+# Every worker keeps an in-memory bloom filter of revoked jtis. A miss means the
+# token is definitely not revoked; a hit is confirmed against the RevokedToken
+# table (bloom filters have false positives, never false negatives). Workers learn
+# about revocations made elsewhere through a version stamp in the cache: when it
+# moves, they pull only the rows revoked since their last sync. Compaction deletes
+# expired rows and bumps a generation stamp, which makes workers rebuild.
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import RevokedToken
+
+VERSION_KEY = 'blogc:revocation:version'
+GENERATION_KEY = 'blogc:revocation:generation'
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Kirsch-Mitzenmacher double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationStore:
+    def __init__(self, capacity=100_000, error_rate=0.001, sync_interval=30):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Fallback poll for caches that are not shared between workers (LocMemCache)
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._stamp = None
+        self._watermark = None
+        self._synced_at = 0.0
+
+    @classmethod
+    def from_settings(cls):
+        options = settings.BLOGC_SETTINGS.get('TOKEN_REVOCATION', {})
+        return cls(
+            capacity=options.get('CAPACITY', 100_000),
+            error_rate=options.get('ERROR_RATE', 0.001),
+            sync_interval=options.get('SYNC_INTERVAL', 30),
+        )
+
+    # ----------------- public API -----------------
+    def is_revoked(self, jti):
+        if jti not in self.sync():
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, jti, expires_at):
+        """Record a revocation. Returns False if the jti was already revoked."""
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        bloom = self.sync()
+        with self._lock:
+            bloom.add(jti)
+        self._bump(VERSION_KEY)
+        return True
+
+    def compact(self, now=None):
+        """Delete rows for tokens that have expired; returns the number removed."""
+        deleted, _ = RevokedToken.objects.filter(expires_at__lt=now or timezone.now()).delete()
+        if deleted:
+            self._bump(GENERATION_KEY)
+            self.reset()
+        return deleted
+
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+            self._stamp = None
+
+    # ----------------- syncing -----------------
+    def _bump(self, key):
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+    def _read_stamp(self):
+        stamps = cache.get_many([GENERATION_KEY, VERSION_KEY])
+        return stamps.get(GENERATION_KEY, 0), stamps.get(VERSION_KEY, 0)
+
+    def sync(self):
+        """
+        Bring the filter up to date and return it. Callers use the returned filter,
+        not self._bloom, which reset() may clear from another thread at any time.
+        """
+        stamp = self._read_stamp()
+        now = time.monotonic()
+        bloom = self._bloom
+        if bloom is not None and stamp == self._stamp and now - self._synced_at < self.sync_interval:
+            return bloom
+        with self._lock:
+            if self._bloom is None or stamp[0] != (self._stamp or (None,))[0]:
+                self._rebuild()
+            else:
+                self._catch_up()
+            self._stamp = stamp
+            self._synced_at = now
+            return self._bloom
+
+    def _rebuild(self):
+        rows = list(
+            RevokedToken.objects.filter(expires_at__gte=timezone.now()).values_list('jti', 'revoked_at')
+        )
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+        watermark = None
+        for jti, revoked_at in rows:
+            bloom.add(jti)
+            watermark = revoked_at if watermark is None else max(watermark, revoked_at)
+        self._bloom = bloom
+        self._watermark = watermark
+
+    def _catch_up(self):
+        qs = RevokedToken.objects.all()
+        if self._watermark is not None:
+            # Small overlap guards against rows committed slightly out of timestamp order
+            qs = qs.filter(revoked_at__gte=self._watermark - timedelta(seconds=5))
+        for jti, revoked_at in qs.values_list('jti', 'revoked_at'):
+            self._bloom.add(jti)
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+        if self._bloom.count > 2 * self._bloom.capacity:
+            # Past its sizing the false-positive rate climbs; start over bigger
+            self._rebuild()
+
+
+revocation_store = RevocationStore.from_settings()
+
+
+class RevocableRefreshToken(RefreshToken):
+    """
+    RefreshToken that honours BLACKLIST_AFTER_ROTATION through revocation_store
+    instead of the token_blacklist app (no OutstandingToken row per login).
+    """
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if revocation_store.is_revoked(self.payload[jwt_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        expires_at = datetime.fromtimestamp(self.payload['exp'], tz=dt_timezone.utc)
+        if not revocation_store.revoke(self.payload[jwt_settings.JTI_CLAIM], expires_at):
+            # Two concurrent refreshes of the same token: only one may rotate it
+            raise TokenError(_('Token is blacklisted'))
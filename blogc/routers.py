@@ -0,0 +1,55 @@
+# routers.py
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Alias of the replica the current request may read from, or None for the primary.
+# A ContextVar (not a thread-local) so it follows the request into async views.
+_read_alias = ContextVar('blogc_read_alias', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def pick_replica():
+    replicas = replica_aliases()
+    return random.choice(replicas) if replicas else None
+
+
+@contextmanager
+def read_from(alias):
+    """Route blogc reads inside the block to `alias` (None means the primary)."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Sends blogc reads to the replica chosen for the current request (see
+    ReplicaRoutingMiddleware) and everything else, including all writes, to default.
+    """
+    route_app_labels = {'blogc'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in self.route_app_labels:
+            return _read_alias.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so objects from any of them may be related
+        pool = {'default', *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -3,8 +3,12 @@ from django.contrib.auth.models import User, Group
 from django.utils.text import slugify
 from rest_framework.validators import UniqueValidator
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 
+from .media import media_url
 from .models import BlogCategory, BlogPost, Comment, Like, UserProfile
+from .revocation import RevocableRefreshToken
+from . import bulk
 # from .utils import SendMail
 
 
@@ -126,6 +130,14 @@ class LoginSerializer(serializers.Serializer):
         return data
 
 
+# -------------------
+# Token Refresh Serializer
+# -------------------
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    # Rotated refresh tokens are revoked, and revoked ones are rejected
+    token_class = RevocableRefreshToken
+
+
 # -------------------
 # Category Serializer
 # -------------------
@@ -147,33 +159,13 @@ class BlogPostListSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
 
     def get_image(self, obj):
-        if obj.image:
-            try:
-                # Get the URL from the storage
-                url = obj.image.url
-                # Ensure we have a complete URL
-                if not url.startswith(('http://', 'https://')):
-                    # If URL is relative, try to build absolute URL
-                    request = self.context.get('request')
-                    if request:
-                        url = request.build_absolute_uri(url)
-                    else:
-                        clean_url = url.lstrip('/')
-                        url = f'https://blogbackc.s3.eu-north-1.amazonaws.com/media/{clean_url}'
-                
-                return url
-                
-            except Exception as e:
-                # Log the error for debugging
-                print(f"Error getting image URL for object {obj.id}: {e}")
-                return None
-        return None
+        return media_url(obj.image.name, self.context.get('request'))
 
     class Meta:
         model = BlogPost
         fields = (
             "id", "title", "slug", "author", "category", "published",
-            "created_at", "likes_count", "comments_count", "content", "image"
+            "created_at", "likes_count", "comments_count", "views", "content", "image"
         )
 
 
@@ -185,24 +177,7 @@ class BlogPostDetailSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
 
     def get_image(self, obj):
-        if obj.image:
-            try:
-                # Get the URL from the storage
-                url = obj.image.url             
-                # Ensure we have a complete URL
-                if not url.startswith(('http://', 'https://')):
-                    request = self.context.get('request')
-                    if request:
-                        url = request.build_absolute_uri(url)
-                    else:
-                        clean_url = url.lstrip('/')
-                        url = f'https://blogbackc.s3.eu-north-1.amazonaws.com/media/{clean_url}'
-                
-                return url
-            except Exception as e:
-                print(f"Error getting image URL for object {obj.id}: {e}")
-                return None
-        return None
+        return media_url(obj.image.name, self.context.get('request'))
     def get_comments(self, obj):
         qs = obj.comments.filter(active=True)
         return CommentSerializer(qs, many=True).data
@@ -212,9 +187,23 @@ class BlogPostDetailSerializer(serializers.ModelSerializer):
         model = BlogPost
         fields = (
             "id", "title", "slug", "author", "category", "content", "image",
-            "published", "created_at", "updated_at", "likes_count", "comments"
+            "published", "created_at", "updated_at", "likes_count", "views", "comments"
         )
 
+class AnnotatedBlogPostListSerializer(BlogPostListSerializer):
+    """Same shape as BlogPostListSerializer, but reads counts from queries.with_counts annotations."""
+    likes_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
+
+
+class AnnotatedBlogPostDetailSerializer(BlogPostDetailSerializer):
+    """Same shape as BlogPostDetailSerializer, using annotations and the prefetched active_comments."""
+    likes_count = serializers.IntegerField(read_only=True)
+
+    def get_comments(self, obj):
+        return CommentSerializer(obj.active_comments, many=True).data
+
+
 class BlogCategoryDetailSerializer(serializers.ModelSerializer):
     posts = BlogPostListSerializer(many=True, read_only=True)
     total_posts = serializers.IntegerField(source="posts.count", read_only=True)
@@ -253,8 +242,14 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
-        fields = ("id", "post", "user", "body", "created_at")
-        read_only_fields = ("id", "user", "post", "created_at")
+        fields = ("id", "post", "user", "body", "created_at", "parent", "depth")
+        read_only_fields = ("id", "user", "post", "created_at", "depth")
+
+    def validate_parent(self, value):
+        # path/depth are fixed at insert, so a comment can't be moved to another parent
+        if self.instance is not None and value != self.instance.parent:
+            raise serializers.ValidationError("A comment's parent can't be changed.")
+        return value
 
 
 # -------------------
@@ -267,3 +262,51 @@ class LikeSerializer(serializers.ModelSerializer):
         model = Like
         fields = ("id", "post", "user", "created_at")
         read_only_fields = ("id", "user", "created_at")
+
+
+# -------------------
+# Bulk admin operations
+# -------------------
+class BulkPostFilterSerializer(serializers.Serializer):
+    category_id = serializers.IntegerField(required=False, allow_null=True)
+    author_id = serializers.IntegerField(required=False)
+    published = serializers.BooleanField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    title_contains = serializers.CharField(required=False, allow_blank=False)
+
+
+class BulkPostActionSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=bulk.ACTIONS)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=bulk.MAX_IDS
+    )
+    filter = BulkPostFilterSerializer(required=False)
+    category_id = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if 'ids' not in attrs and not attrs.get('filter'):
+            # An empty filter would match every post
+            raise serializers.ValidationError("Provide 'ids' or a non-empty 'filter'.")
+        if attrs['action'] == 'recategorize':
+            category = BlogCategory.objects.filter(pk=attrs.get('category_id')).first()
+            if category is None:
+                raise serializers.ValidationError({'category_id': 'Category does not exist.'})
+            attrs['category'] = category
+        return attrs
+
+
+# -------------------
+# Comment moderation
+# -------------------
+class ModerationCommentSerializer(CommentSerializer):
+    class Meta(CommentSerializer.Meta):
+        fields = ("id", "post", "user", "body", "created_at", "status", "spam_score", "active")
+        read_only_fields = fields
+
+
+class ModerationDecisionSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=("approve", "reject"))
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=bulk.MAX_IDS
+    )
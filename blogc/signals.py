@@ -1,8 +1,10 @@
 # signals.py
-from django.db.models.signals import post_save
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import BlogCategory, BlogPost, UserProfile, Like, Comment
+from . import snapshots, sync, trending
 
 @receiver(post_save, sender=User)
 def ensure_user_profile(sender, instance, created, **kwargs):
@@ -20,3 +22,68 @@ def ensure_user_profile(sender, instance, created, **kwargs):
                 "role": "user",
                 "is_blog_admin": False,
             })
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=Comment)
+def bump_trending_score(sender, instance, created, **kwargs):
+    # Keep the materialized trending table current as activity comes in. Hidden
+    # comments don't count (moderation takes flagged ones back out, see trending.unbump)
+    if created and (sender is Like or instance.active):
+        options = trending.get_options()
+        weight = options['LIKE_WEIGHT'] if sender is Like else options['COMMENT_WEIGHT']
+        trending.bump({instance.post_id: weight}, at=instance.created_at)
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def publish_post_snapshots(sender, instance, **kwargs):
+    # Re-render the static snapshots this post appears in once the write is committed.
+    # Cascading deletes load posts with only('pk'): don't fetch the category per row.
+    category_id = None if 'category_id' in instance.get_deferred_fields() else instance.category_id
+    snapshots.schedule(names={'latest'}, post_ids=[instance.pk], category_ids=[category_id] if category_id else [])
+
+
+@receiver(post_save, sender=BlogCategory)
+@receiver(post_delete, sender=BlogCategory)
+def publish_category_snapshots(sender, instance, **kwargs):
+    snapshots.schedule(names={'categories'}, category_ids=[instance.pk])
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Like)
+def log_sync_change(sender, instance, **kwargs):
+    # Hidden comments sync as deleted
+    kind = {BlogPost: sync.POST, Comment: sync.COMMENT, Like: sync.LIKE}[sender]
+    sync.record(kind, [instance.pk], deleted=sender is Comment and not instance.active)
+
+
+@receiver(post_delete, sender=BlogPost)
+def log_sync_post_delete(sender, instance, **kwargs):
+    sync.record(sync.POST, [instance.pk], deleted=True)
+
+
+def deleted_with_post(origin):
+    """Whether a delete signal comes from the cascade of deleting posts."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is BlogPost
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Like)
+def log_sync_delete(sender, instance, origin=None, **kwargs):
+    # Every other delete path (the API, the admin, a user's account going with
+    # their comments and likes, replies cascading from a comment, the shell) leaves
+    # a tombstone. Rows that go with their post don't: clients drop those along
+    # with the post, and its trending row is gone too.
+    if deleted_with_post(origin):
+        return
+    options = trending.get_options()
+    if sender is Like:
+        sync.record(sync.LIKE, [instance.pk], deleted=True)
+        trending.unbump([(instance.post_id, options['LIKE_WEIGHT'], instance.created_at)])
+    else:
+        sync.record(sync.COMMENT, [instance.pk], deleted=True)
+        if instance.active:
+            trending.unbump([(instance.post_id, options['COMMENT_WEIGHT'], instance.created_at)])
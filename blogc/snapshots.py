@@ -0,0 +1,307 @@
+# snapshots.py
+# Pre-rendered JSON for the hottest anonymous reads, so a homepage load need not
+# touch Python or the database:
+#   latest                  - posts/latest/
+#   categories              - categories/
+#   category-<id>-page-<n>  - the first CATEGORY_PAGES pages of each category's published posts
+# Every snapshot is written once under a content hash (latest.3f9a2c1b.json) next to
+# .gz (and .br, when the brotli package is installed) variants, and served by
+# AsyncWhiteNoiseMiddleware as immutable. manifest.json maps names to the current
+# URLs and is the only file served with a short max-age. Post and category saves
+# re-render just the snapshots they can appear in; counts (likes, comments) are
+# refreshed by the periodic `manage.py publish_snapshots`.
+import contextlib
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from rest_framework.settings import api_settings
+
+from .models import BlogCategory
+from .projections import post_list_data
+from .queries import post_list_queryset
+from .renderers import ORJSONRenderer
+
+try:
+    import brotli
+except ImportError:  # optional: gzip variants are always written
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: publishes are only serialized within a process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+STATE = '.state.json'  # post ids per snapshot, for incremental renders; not served
+LOCK = '.lock'  # held while the manifest and state are read, updated and written back
+
+
+def get_options():
+    options = {
+        'ENABLED': True,
+        'ROOT': os.path.join(settings.BASE_DIR, 'var', 'snapshots'),
+        'URL': '/snapshots/',
+        'LATEST_COUNT': 5,
+        'CATEGORY_PAGES': 2,
+        'KEEP_SECONDS': 86400,  # superseded files stay for clients holding an old manifest
+    }
+    options.update(settings.BLOGC_SETTINGS.get('SNAPSHOTS', {}))
+    return options
+
+
+# ----------------- rendering -----------------
+def _posts(qs):
+    posts = post_list_data(qs)
+    return posts, [post['id'] for post in posts]
+
+
+def render_latest(options):
+    count = options['LATEST_COUNT']
+    return _posts(post_list_queryset().filter(published=True).order_by('-created_at')[:count])
+
+
+def render_categories(options):
+    from .serializers import BlogCategorySerializer
+
+    return BlogCategorySerializer(BlogCategory.objects.all(), many=True).data, []
+
+
+def render_category_pages(category, options):
+    """Yield (name, payload, post_ids) for the category's first pages, last page first."""
+    qs = post_list_queryset().filter(category=category, published=True).order_by('-created_at', '-id')
+    count = qs.count()
+    size = api_settings.PAGE_SIZE
+    pages = max(1, min(options['CATEGORY_PAGES'], -(-count // size)))
+    for page in range(pages, 0, -1):
+        results, ids = _posts(qs[(page - 1) * size:page * size])
+        yield f'category-{category.id}-page-{page}', {
+            'id': category.id,
+            'name': category.name,
+            'slug': category.slug,
+            'count': count,
+            'page': page,
+            'results': results,
+        }, ids
+
+
+class Publisher:
+    def __init__(self, options=None):
+        self._lock = threading.Lock()
+        self.configure(options)
+
+    def configure(self, options=None):
+        self.options = options or get_options()
+        self.root = self.options['ROOT']
+
+    # ----------------- files -----------------
+    def _read(self, name, default):
+        try:
+            with open(os.path.join(self.root, name), encoding='utf-8') as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return default
+
+    def _write_atomic(self, name, data):
+        path = os.path.join(self.root, name)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+
+    def _store(self, name, payload):
+        """Write a snapshot (and compressed variants) under its content hash; returns its URL."""
+        body = ORJSONRenderer().render(payload)
+        filename = f'{name}.{hashlib.sha256(body).hexdigest()[:12]}.json'
+        if not os.path.exists(os.path.join(self.root, filename)):
+            # Variants first: the server only looks for them once the plain file exists
+            self._write_atomic(filename + '.gz', gzip.compress(body, 9, mtime=0))
+            if brotli is not None:
+                self._write_atomic(filename + '.br', brotli.compress(body))
+            self._write_atomic(filename, body)
+        return self.options['URL'] + filename
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        Exclusive access to the manifest and state across threads and worker
+        processes: each publish rewrites both from what it read, so two at once
+        would drop each other's entries.
+        """
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, LOCK), 'a') as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    # ----------------- publishing -----------------
+    def publish(self, names=None, category_ids=None, post_ids=()):
+        """
+        Re-render snapshots. With no arguments everything is rebuilt; otherwise
+        `names` ('latest', 'categories'), the pages of `category_ids` and every
+        snapshot that currently lists one of `post_ids`.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        full = names is None and category_ids is None and not post_ids
+        with self._locked():
+            manifest = {} if full else self._read(MANIFEST, {})
+            state = {} if full else self._read(STATE, {})
+            names = {'latest', 'categories'} if full else set(names or ())
+            category_ids = set(category_ids or ())
+            post_ids = set(post_ids)
+            for name, ids in state.items():
+                if post_ids.intersection(ids):
+                    if name.startswith('category-'):
+                        category_ids.add(int(name.split('-')[1]))
+                    else:
+                        names.add(name)
+
+            renderers = {'latest': render_latest, 'categories': render_categories}
+            for name in names & renderers.keys():
+                payload, ids = renderers[name](self.options)
+                manifest[name] = self._store(name, payload)
+                state[name] = ids
+
+            categories = BlogCategory.objects.all()
+            if not full:
+                categories = categories.filter(pk__in=category_ids)
+            for category_id in category_ids - set(categories.values_list('pk', flat=True)):
+                self._drop(manifest, state, f'category-{category_id}-')
+            for category in categories:
+                self._drop(manifest, state, f'category-{category.id}-')
+                next_url = None  # pages come last first, so each can link to the next
+                for name, payload, ids in render_category_pages(category, self.options):
+                    payload['next'] = next_url
+                    manifest[name] = next_url = self._store(name, payload)
+                    state[name] = ids
+
+            self._write_atomic(STATE, json.dumps(state).encode())
+            self._write_atomic(MANIFEST, json.dumps(manifest, sort_keys=True).encode())
+        return manifest
+
+    @staticmethod
+    def _drop(manifest, state, prefix):
+        for name in [name for name in manifest if name.startswith(prefix)]:
+            manifest.pop(name)
+            state.pop(name, None)
+
+    def prune(self, now=None):
+        """Delete superseded snapshot files older than KEEP_SECONDS."""
+        now = now or time.time()
+        live = {url.rsplit('/', 1)[-1] for url in self._read(MANIFEST, {}).values()}
+        removed = 0
+        for entry in os.scandir(self.root):
+            base = entry.name.removesuffix('.gz').removesuffix('.br')
+            if entry.name in (MANIFEST, STATE) or base in live or not base.endswith('.json'):
+                continue
+            if now - entry.stat().st_mtime > self.options['KEEP_SECONDS']:
+                os.remove(entry.path)
+                removed += 1
+        return removed
+
+
+publisher = Publisher()
+
+
+@receiver(setting_changed)
+def _reconfigure(setting, **kwargs):
+    # override_settings(BLOGC_SETTINGS=...) in tests
+    if setting == 'BLOGC_SETTINGS':
+        publisher.configure()
+        _manifest.update(mtime=None, urls={})
+
+
+# ----------------- lookups for the API -----------------
+_manifest = {'mtime': None, 'urls': {}}
+
+
+def snapshot_url(name):
+    """Current URL of a snapshot, re-reading the manifest only when it changes on disk."""
+    options = publisher.options
+    if not options['ENABLED']:
+        return None
+    try:
+        mtime = os.stat(os.path.join(publisher.root, MANIFEST)).st_mtime_ns
+    except OSError:
+        return None
+    if mtime != _manifest['mtime']:
+        _manifest['urls'] = publisher._read(MANIFEST, {})
+        _manifest['mtime'] = mtime
+    return _manifest['urls'].get(name)
+
+
+def add_link(response, name):
+    """Point clients at the static copy of a response: Link: <url>; rel="alternate"."""
+    url = snapshot_url(name)
+    if url:
+        response['Link'] = f'<{url}>; rel="alternate"; type="application/json"'
+    return response
+
+
+# ----------------- change hooks -----------------
+_pending = threading.local()
+
+
+def schedule(names=(), post_ids=(), category_ids=(), full=False):
+    """
+    Queue a re-render for when the current transaction commits. Changes made in
+    one transaction (e.g. a cascade of post_delete signals) are merged into a
+    single publish; changes from a rolled-back transaction just ride along with
+    the next one.
+    """
+    if not publisher.options['ENABLED']:
+        return
+    pending = getattr(_pending, 'changes', None)
+    if pending is None:
+        pending = _pending.changes = {'names': set(), 'post_ids': set(), 'category_ids': set(), 'full': False}
+    pending['names'].update(names)
+    pending['post_ids'].update(post_ids)
+    pending['category_ids'].update(category_ids)
+    pending['full'] = pending['full'] or full
+    # The first callback to run publishes everything queued; the rest find nothing left
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    pending = _pending.__dict__.pop('changes', None)
+    if not pending:
+        return
+    # A failed render must not fail the write that triggered it; the next change
+    # or `manage.py publish_snapshots` catches up
+    try:
+        if pending['full']:
+            publisher.publish()
+        else:
+            publisher.publish(
+                names=pending['names'], category_ids=pending['category_ids'], post_ids=pending['post_ids']
+            )
+    except Exception:
+        logger.exception('Publishing snapshots failed')
+
+
+# Files are only ever replaced under a new name, so everything but the manifest is immutable
+def is_snapshot_url(url):
+    if not publisher.options['ENABLED'] or not url.startswith(publisher.options['URL']):
+        return False
+    name = url[len(publisher.options['URL']):]
+    # Only the snapshots themselves; not the state file, temp files or subdirectories
+    return '/' not in name and not name.startswith('.') and name.endswith('.json')
+
+
+def is_immutable(url):
+    return is_snapshot_url(url) and not url.endswith('/' + MANIFEST)
@@ -0,0 +1,218 @@
+# sync.py
+# Incremental sync for offline-first clients: GET /api/sync/?since=<token> returns
+# the posts, comments and likes that changed after the token, plus the ids of
+# those that were deleted, in batches of at most BATCH_SIZE log rows.
+#
+# Writes append to the SyncChange log (signals.py for saves and deletes, and
+# explicitly, as the transaction's last statement, wherever rows change without a
+# signal: bulk updates, moderation), so a batch is one range scan on its primary
+# key followed by one query per kind for the current rows. The log only says *what*
+# changed; every object is read in its current state, and one that is gone or hidden
+# by then is reported as deleted. Deleting a post cascades to its comments and likes
+# without logging them: clients drop those along with the post.
+#
+# A token is "<last log id>-<unix time>". Log ids must become visible in id order,
+# or a reader could move its token past a lower id that commits later and skip it
+# for good. SQLite has one writer at a time; on PostgreSQL record() takes a
+# transaction-scoped advisory lock before allocating ids, so the next transaction
+# gets its ids only once this one has committed or rolled back. prune_sync_log
+# drops tombstones after TOMBSTONE_DAYS; tokens older than that get 410 and the
+# client starts over without ?since.
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import BlogPost, Comment, Like, SyncChange
+from .projections import post_list_data
+from .queries import post_list_queryset
+from .serializers import CommentSerializer
+
+POST, COMMENT, LIKE = 'post', 'comment', 'like'
+TOKEN = re.compile(r'^(\d+)-(\d+)$')
+LOCK_KEY = 0x626C6F6763  # pg_advisory_xact_lock key serializing log writes
+
+
+def get_options():
+    options = {
+        'BATCH_SIZE': 500,  # log rows per response
+        'MAX_BATCH_SIZE': 2000,  # upper bound for ?limit=
+        'TOMBSTONE_DAYS': 30,
+    }
+    options.update(settings.BLOGC_SETTINGS.get('SYNC', {}))
+    return options
+
+
+class TokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'This sync token is too old; sync again without ?since.'
+    default_code = 'sync_token_expired'
+
+
+# ----------------- recording -----------------
+def _lock_log(connection):
+    # Held until the transaction ends, so log ids are handed out in commit order
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOCK_KEY])
+
+
+def record(kind, ids, deleted=False):
+    """
+    Append a change for each of `ids`; call inside the transaction that made it,
+    as late as possible: other writers wait for its commit from here on.
+    """
+    if not ids:
+        return
+    now = timezone.now()
+    using = router.db_for_write(SyncChange)
+    with transaction.atomic(using=using):
+        _lock_log(connections[using])
+        SyncChange.objects.using(using).bulk_create([
+            SyncChange(kind=kind, object_id=pk, deleted=deleted, changed_at=now) for pk in ids
+        ])
+
+
+def record_queryset(kind, queryset, deleted=False):
+    """record() for every row of `queryset`, as one INSERT ... SELECT."""
+    connection = connections[queryset.db]
+    sql, params = queryset.order_by().values(changed_id=F('pk')).query.sql_with_params()
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(column) for column in ('kind', 'object_id', 'deleted', 'changed_at'))
+    with transaction.atomic(using=queryset.db):
+        _lock_log(connection)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(SyncChange._meta.db_table)} ({columns}) '
+                f'SELECT %s, changed_id, %s, %s FROM ({sql}) changed',
+                (kind, deleted, connection.ops.adapt_datetimefield_value(timezone.now()), *params),
+            )
+
+
+def backfill():
+    """
+    Log the posts, visible comments and likes that have no change yet: rows inserted
+    with bulk_create (seed_data, import_posts) send no post_save. Returns the count.
+    """
+    sources = (
+        (POST, BlogPost.objects.all()),
+        (COMMENT, Comment.objects.filter(active=True)),
+        (LIKE, Like.objects.all()),
+    )
+    added = 0
+    for kind, queryset in sources:
+        logged = SyncChange.objects.filter(kind=kind, object_id=OuterRef('pk'))
+        ids = list(queryset.filter(~Exists(logged)).order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), 2000):
+            record(kind, ids[start:start + 2000])
+        added += len(ids)
+    return added
+
+
+def prune(now=None):
+    """
+    Delete log rows no client needs: rows superseded by a later change to the same
+    object, and tombstones (or rows for objects since deleted) older than
+    TOMBSTONE_DAYS. Returns the number of rows removed.
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=get_options()['TOMBSTONE_DAYS'])
+    newer = SyncChange.objects.filter(kind=OuterRef('kind'), object_id=OuterRef('object_id'), id__gt=OuterRef('id'))
+    removed = SyncChange.objects.filter(Exists(newer)).delete()[0]
+    removed += SyncChange.objects.filter(deleted=True, changed_at__lt=cutoff).delete()[0]
+    for kind, model in ((POST, BlogPost), (COMMENT, Comment), (LIKE, Like)):
+        removed += (
+            SyncChange.objects.filter(kind=kind, changed_at__lt=cutoff)
+            .exclude(object_id__in=model.objects.values('pk'))
+            .delete()[0]
+        )
+    return removed
+
+
+# ----------------- reading -----------------
+def make_token(change_id, at):
+    return f'{change_id}-{int(at.timestamp())}'
+
+
+def parse_token(value):
+    """(last change id, time) for a ?since value; None for a full sync."""
+    if not value:
+        return None
+    match = TOKEN.match(value)
+    if not match:
+        raise ValidationError({'since': ['Not a sync token; use the `next` value of an earlier response.']})
+    return int(match[1]), datetime.fromtimestamp(int(match[2]), dt_timezone.utc)
+
+
+def parse_limit(value, options):
+    if not value:
+        return options['BATCH_SIZE']
+    if not value.isdigit() or int(value) < 1:
+        raise ValidationError({'limit': ['A positive integer is required.']})
+    return min(int(value), options['MAX_BATCH_SIZE'])
+
+
+def changes(since=None, limit=None, request=None):
+    """
+    The sync response for a ?since token (None: everything, for a first sync):
+    {'next', 'has_more', 'posts', 'comments', 'likes', 'deleted': {kind: ids}}.
+    Clients apply a batch, store `next` and repeat while has_more.
+    """
+    options = get_options()
+    limit = limit or options['BATCH_SIZE']
+    now = timezone.now()
+    token = parse_token(since)
+    if token is not None and token[1] < now - timedelta(days=options['TOMBSTONE_DAYS']):
+        raise TokenExpired()
+
+    qs = SyncChange.objects.order_by('id')
+    if token is None:
+        qs = qs.filter(deleted=False)  # a new client has nothing to delete
+    else:
+        qs = qs.filter(id__gt=token[0])
+    batch = list(qs.values_list('id', 'kind', 'object_id', 'changed_at')[:limit])
+    has_more = len(batch) == limit
+
+    if batch:
+        last_id = batch[-1][0]
+    else:
+        last_id = token[0] if token else 0
+    # Rows after the token are no older than its time, so the expiry check is sound
+    next_token = make_token(last_id, batch[-1][3] if has_more else now)
+
+    ids = {POST: set(), COMMENT: set(), LIKE: set()}
+    for _, kind, object_id, _ in batch:
+        ids[kind].add(object_id)
+    posts = post_list_data(post_list_queryset().filter(pk__in=ids[POST]).order_by('pk'), request) if ids[POST] else []
+    comments = (
+        CommentSerializer(
+            Comment.objects.filter(pk__in=ids[COMMENT], active=True).select_related('user__profile').order_by('pk'),
+            many=True,
+            context={'request': request},
+        ).data
+        if ids[COMMENT] else []
+    )
+    datetime_field = serializers.DateTimeField().to_representation
+    likes = [
+        {'id': pk, 'post': post_id, 'user': user_id, 'created_at': datetime_field(created_at)}
+        for pk, post_id, user_id, created_at in (
+            Like.objects.filter(pk__in=ids[LIKE]).order_by('pk').values_list('id', 'post_id', 'user_id', 'created_at')
+            if ids[LIKE] else ()
+        )
+    ]
+
+    data = {'next': next_token, 'has_more': has_more, 'posts': posts, 'comments': comments, 'likes': likes}
+    if token is None:
+        data['deleted'] = {'posts': [], 'comments': [], 'likes': []}
+    else:
+        # Whatever was logged but can no longer be read is gone (or hidden) for the client
+        data['deleted'] = {
+            'posts': sorted(ids[POST].difference(post['id'] for post in posts)),
+            'comments': sorted(ids[COMMENT].difference(comment['id'] for comment in comments)),
+            'likes': sorted(ids[LIKE].difference(like['id'] for like in likes)),
+        }
+    return data
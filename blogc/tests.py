@@ -166,4 +166,1682 @@ class PostCreationTests(APITestCase):
             except:
                 response = self.client.post('/api/posts/', data)
         
-        self.assertEqual(response.status_code, 401)  # Unauthorized
\ No newline at end of file
+        self.assertEqual(response.status_code, 401)  # Unauthorized
+
+class SeedDataCommandTests(TestCase):
+    def test_seed_data_creates_rows(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.db.models import F
+        from .models import BlogPost, Comment, Like
+
+        call_command(
+            'seed_data', users=20, posts=50, comments=120, likes=200,
+            batch_size=16, words=20, seed=1, stdout=StringIO()
+        )
+
+        self.assertEqual(User.objects.filter(username__startswith='seed-').count(), 20)
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith='seed-').count(), 20)
+        self.assertEqual(BlogPost.objects.count(), 50)
+        self.assertFalse(BlogPost.objects.exclude(updated_at=F('created_at')).exists())
+        self.assertEqual(Comment.objects.count(), 120)
+        self.assertTrue(0 < Like.objects.count() <= 200)
+
+
+class AsyncReadPathTests(APITestCase):
+    def setUp(self):
+        from unittest import mock
+        from .counters import ViewCounter
+        from .models import BlogPost, Comment, Like
+
+        # Keep buffered views from being flushed between the sync and async reads
+        counter = ViewCounter(interval=3600)
+        for target in ('blogc.views.view_counter', 'blogc.async_views.view_counter'):
+            patcher = mock.patch(target, counter)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username='reader', email='reader@test.com', password='testpass123')
+        self.category = BlogCategory.objects.create(name='Async', slug='async')
+        self.post = BlogPost.objects.create(
+            title='Async post', content='Body', author=self.user, category=self.category
+        )
+        Comment.objects.create(post=self.post, user=self.user, body='First')
+        Comment.objects.create(post=self.post, user=self.user, body='Hidden', active=False)
+        Like.objects.create(post=self.post, user=self.user)
+
+    def test_post_list_matches_sync_view(self):
+        sync = self.client.get('/api/posts/').json()
+        self.assertEqual(self.client.get('/api/async/posts/').json(), sync)
+        self.assertEqual(sync[0]['likes_count'], 1)
+        self.assertEqual(sync[0]['comments_count'], 2)
+
+    def test_post_detail_and_latest_match_sync_view(self):
+        self.assertEqual(
+            self.client.get(f'/api/async/posts/{self.post.id}/').json(),
+            self.client.get(f'/api/posts/{self.post.id}/').json(),
+        )
+        self.assertEqual(
+            self.client.get('/api/async/posts/latest/').json(),
+            self.client.get('/api/posts/latest/').json(),
+        )
+        self.assertEqual(self.client.get('/api/async/posts/9999/').status_code, 404)
+
+    def test_category_endpoints_match_sync_views(self):
+        self.assertEqual(
+            self.client.get('/api/async/categories/').json(),
+            self.client.get('/api/categories/').json(),
+        )
+        self.assertEqual(
+            self.client.get(f'/api/async/categories/{self.category.id}/').json(),
+            self.client.get(f'/api/categories/{self.category.id}/').json(),
+        )
+
+    def test_comment_list_requires_auth_and_paginates(self):
+        url = f'/api/posts/{self.post.id}/comments/'
+        async_url = f'/api/async/posts/{self.post.id}/comments/'
+        self.assertEqual(self.client.get(async_url).status_code, 401)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(async_url).json(), self.client.get(url).json())
+
+
+class StartupImportTests(TestCase):
+    def test_app_start_up_does_not_import_s3_stack(self):
+        import os
+        import subprocess
+        import sys
+        from django.conf import settings
+
+        script = (
+            "import sys, django; django.setup();"
+            "from django.core.wsgi import get_wsgi_application; get_wsgi_application();"
+            "from django.urls import get_resolver; get_resolver().url_patterns;"
+            "print(sorted(m for m in ('boto3', 'botocore', 'storages.backends.s3') if m in sys.modules))"
+        )
+        proc = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'api.settings', 'DEBUG': 'True'},
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(proc.stdout.strip(), '[]')
+
+    def test_media_storage_is_built_on_first_use(self):
+        from .models import BlogPost
+        from .storage_backends import MediaStorage
+
+        storage = BlogPost._meta.get_field('image').storage
+        self.assertIsInstance(storage, MediaStorage)
+        self.assertTrue(storage.url('post_images/a.png').endswith('/media/post_images/a.png'))
+
+    def test_parse_importtime(self):
+        from .management.commands.importtime import parse_importtime
+
+        rows = parse_importtime(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   json.decoder\n"
+            "import time:       300 |        420 | json\n"
+        )
+        self.assertEqual([(r.module, r.depth, r.cumulative_us) for r in rows], [('json.decoder', 1, 120), ('json', 0, 420)])
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', email='writer@test.com', password='testpass123')
+
+    def run_middleware(self, request, status=200):
+        from unittest import mock
+        from django.http import HttpResponse
+        from .middleware import ReplicaRoutingMiddleware
+        from .models import BlogPost
+        from .routers import ReplicaRouter
+
+        seen = {}
+
+        def get_response(req):
+            seen['alias'] = ReplicaRouter().db_for_read(BlogPost)
+            return HttpResponse(status=status)
+
+        with mock.patch('blogc.middleware.pick_replica', return_value='replica1'):
+            response = ReplicaRoutingMiddleware(get_response)(request)
+        return seen['alias'], response
+
+    def test_safe_requests_read_from_replica(self):
+        alias, _ = self.run_middleware(APIRequestFactory().get('/api/posts/'))
+        self.assertEqual(alias, 'replica1')
+        alias, _ = self.run_middleware(APIRequestFactory().get('/api/register/'))
+        self.assertIsNone(alias)
+
+    def test_writes_pin_client_to_primary(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        auth = f'Bearer {AccessToken.for_user(self.user)}'
+        factory = APIRequestFactory()
+        alias, response = self.run_middleware(factory.post('/api/posts/1/like-toggle/', HTTP_AUTHORIZATION=auth), status=201)
+        self.assertIsNone(alias)
+        self.assertIn('blogc_primary', response.cookies)
+
+        # Token clients are pinned through the cache, even without the cookie
+        alias, _ = self.run_middleware(factory.get('/api/posts/1/', HTTP_AUTHORIZATION=auth))
+        self.assertIsNone(alias)
+        # Other clients still use the replica
+        alias, _ = self.run_middleware(factory.get('/api/posts/1/'))
+        self.assertEqual(alias, 'replica1')
+
+    def test_router_sends_writes_and_migrations_to_default(self):
+        from .models import BlogPost
+        from .routers import ReplicaRouter, read_from
+
+        router = ReplicaRouter()
+        with read_from('replica1'):
+            self.assertEqual(router.db_for_read(BlogPost), 'replica1')
+            self.assertIsNone(router.db_for_read(User))
+            self.assertEqual(router.db_for_write(BlogPost), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'blogc'))
+
+
+class DatabasePoolStatsTests(APITestCase):
+    def test_pool_stats_requires_blog_admin(self):
+        user = User.objects.create_user(username='plain', email='plain@test.com', password='testpass123')
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get('/api/admin/db-pool/').status_code, 403)
+
+        user.profile.is_blog_admin = True
+        user.profile.save()
+        response = self.client.get('/api/admin/db-pool/')
+        self.assertEqual(response.status_code, 200)
+        # SQLite in tests has no pool
+        self.assertEqual(response.data['default'], {'pooled': False})
+
+
+class TokenRevocationTests(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .revocation import revocation_store
+
+        cache.clear()
+        revocation_store.reset()
+        self.user = User.objects.create_user(username='tok', email='tok@test.com', password='testpass123')
+
+    def login(self):
+        response = self.client.post('/api/login/', {'username': 'tok', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, 200)
+        return response.data['refresh']
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        refresh = self.login()
+        first = self.client.post('/api/token/refresh/', {'refresh': refresh})
+        self.assertEqual(first.status_code, 200)
+        self.assertNotEqual(first.data['refresh'], refresh)
+
+        reuse = self.client.post('/api/token/refresh/', {'refresh': refresh})
+        self.assertEqual(reuse.status_code, 401)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': first.data['refresh']}).status_code, 200)
+
+    def test_unrevoked_check_skips_database(self):
+        from .revocation import revocation_store
+
+        revocation_store.sync()
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation_store.is_revoked('not-a-revoked-jti'))
+
+    def test_other_workers_catch_up_and_compaction(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import RevokedToken
+        from .revocation import RevocationStore, revocation_store
+
+        other_worker = RevocationStore()
+        other_worker.sync()
+        revocation_store.revoke('jti-1', timezone.now() + timedelta(days=1))
+        revocation_store.revoke('jti-old', timezone.now() - timedelta(days=1))
+        self.assertTrue(other_worker.is_revoked('jti-1'))
+
+        self.assertEqual(revocation_store.compact(), 1)
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['jti-1'])
+        self.assertFalse(other_worker.is_revoked('jti-old'))
+
+    def test_reset_from_another_thread_during_check(self):
+        from unittest import mock
+        from .revocation import RevocationStore
+
+        store = RevocationStore()
+        sync = store.sync
+
+        def sync_then_reset():
+            bloom = sync()
+            store.reset()  # e.g. compact() in another request thread
+            return bloom
+
+        with mock.patch.object(store, 'sync', sync_then_reset):
+            self.assertFalse(store.is_revoked('not-a-revoked-jti'))
+
+    def test_bloom_filter(self):
+        from .revocation import BloomFilter
+
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class ViewCounterTests(APITestCase):
+    def setUp(self):
+        from .models import BlogPost
+
+        self.user = User.objects.create_user(username='viewer', email='viewer@test.com', password='testpass123')
+        self.posts = [
+            BlogPost.objects.create(title=f'Viewed {i}', content='Body', author=self.user)
+            for i in range(3)
+        ]
+
+    def test_views_are_buffered_and_flushed_in_one_update(self):
+        from .counters import ViewCounter
+
+        counter = ViewCounter(interval=3600, max_buffer=100)
+        with self.assertNumQueries(0):
+            for post, views in zip(self.posts, (5, 1, 0)):
+                for _ in range(views):
+                    counter.record(post.pk)
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(counter.flush(), 2)
+        # One write to the posts table; the rest is the batched trending update
+        self.assertEqual(sum('blogc_blogpost' in q['sql'] for q in ctx.captured_queries), 1)
+        for post in self.posts:
+            post.refresh_from_db()
+        self.assertEqual([p.views for p in self.posts], [5, 1, 0])
+        self.assertEqual(counter.pending(), {})
+
+    def test_retrieve_counts_views(self):
+        from unittest import mock
+        from .counters import ViewCounter
+
+        counter = ViewCounter(interval=3600)
+        post = self.posts[0]
+        with mock.patch('blogc.views.view_counter', counter):
+            self.client.get(f'/api/posts/{post.pk}/')
+            response = self.client.get(f'/api/posts/{post.pk}/')
+        self.assertEqual(response.data['views'], 0)
+        self.assertEqual(counter.pending(), {post.pk: 2})
+        counter.flush()
+        self.assertEqual(self.client.get('/api/posts/').data[-1]['views'], 2)
+
+    def test_failed_flush_keeps_counts_and_does_not_fail_the_read(self):
+        from unittest import mock
+        from django.db import OperationalError
+        from .counters import ViewCounter
+
+        counter = ViewCounter(interval=0)
+        post = self.posts[0]
+        with mock.patch('blogc.views.view_counter', counter), \
+                mock.patch('blogc.async_views.view_counter', counter), \
+                mock.patch('django.db.models.QuerySet.update', side_effect=OperationalError('database is locked')):
+            for url in (f'/api/posts/{post.pk}/', f'/api/async/posts/{post.pk}/'):
+                with self.assertLogs('blogc.counters', 'ERROR'):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(counter.pending(), {post.pk: 2})
+        self.assertEqual(counter.flush(), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 2)
+
+
+class TrendingTests(APITestCase):
+    def setUp(self):
+        from .models import BlogPost
+
+        self.users = [
+            User.objects.create_user(username=f'fan{i}', email=f'fan{i}@test.com', password='testpass123')
+            for i in range(3)
+        ]
+        self.quiet, self.busy = [
+            BlogPost.objects.create(title=title, content='Body', author=self.users[0])
+            for title in ('Quiet', 'Busy')
+        ]
+
+    def test_likes_and_comments_rank_posts(self):
+        from .models import Comment, Like
+
+        Like.objects.create(post=self.quiet, user=self.users[0])
+        for user in self.users:
+            Like.objects.create(post=self.busy, user=user)
+        Comment.objects.create(post=self.busy, user=self.users[0], body='Hot')
+
+        response = self.client.get('/api/posts/trending/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.data], [self.busy.id, self.quiet.id])
+        self.assertEqual(response.data[0]['likes_count'], 3)
+
+    def test_incremental_scores_match_rebuild_and_decay(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import trending
+        from .models import Like, TrendingScore
+
+        now = timezone.now()
+        Like.objects.create(post=self.busy, user=self.users[0], created_at=now - timedelta(hours=24))
+        Like.objects.create(post=self.busy, user=self.users[1], created_at=now)
+        incremental = TrendingScore.objects.get(pk=self.busy.pk).score
+
+        trending.rebuild(now=now)
+        self.assertAlmostEqual(TrendingScore.objects.get(pk=self.busy.pk).score, incremental, places=6)
+        # One like at full weight plus one a half-life old
+        self.assertAlmostEqual(trending.current_score(incremental, now), 3.0 * 1.5, places=6)
+
+    def test_prune_drops_decayed_rows(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import trending
+        from .models import TrendingScore
+
+        trending.bump({self.quiet.pk: 1.0}, at=timezone.now() - timedelta(days=30))
+        trending.bump({self.busy.pk: 1.0})
+        self.assertEqual(trending.prune(), 1)
+        self.assertEqual(list(TrendingScore.objects.values_list('post_id', flat=True)), [self.busy.pk])
+
+    def test_toggling_a_like_does_not_ratchet_the_score(self):
+        from . import trending
+        from .models import TrendingScore
+
+        self.client.force_authenticate(user=self.users[1])
+        for _ in range(5):
+            self.client.post(f'/api/posts/{self.busy.pk}/like-toggle/')  # like
+            self.client.post(f'/api/posts/{self.busy.pk}/like-toggle/')  # unlike
+        self.client.post(f'/api/posts/{self.busy.pk}/like-toggle/')
+        # Just the one like, at full weight
+        self.assertAlmostEqual(trending.current_score(TrendingScore.objects.get(pk=self.busy.pk).score), 3.0, places=3)
+        self.client.post(f'/api/posts/{self.busy.pk}/like-toggle/')
+        self.assertEqual(TrendingScore.objects.get(pk=self.busy.pk).score, trending.EMPTY)
+
+    def test_hidden_comments_stop_counting(self):
+        from . import moderation, trending
+        from .models import Comment, TrendingScore
+
+        Comment.objects.create(post=self.busy, user=self.users[0], body='Genuine thoughts on this post')
+        spam = Comment.objects.create(post=self.busy, user=self.users[1], body='Nice post')
+        counted = TrendingScore.objects.get(pk=self.busy.pk).score
+
+        moderation.review([spam.pk], 'reject')
+        one_comment = TrendingScore.objects.get(pk=self.busy.pk).score
+        self.assertAlmostEqual(trending.current_score(one_comment), 5.0, places=3)
+        moderation.review([spam.pk], 'reject')  # already hidden: no second subtraction
+        self.assertAlmostEqual(TrendingScore.objects.get(pk=self.busy.pk).score, one_comment, places=6)
+        moderation.review([spam.pk], 'approve')
+        self.assertAlmostEqual(TrendingScore.objects.get(pk=self.busy.pk).score, counted, places=6)
+
+        Comment.objects.create(post=self.quiet, user=self.users[0], body='Hidden from the start', active=False)
+        self.assertFalse(TrendingScore.objects.filter(pk=self.quiet.pk).exists())
+
+
+class RelatedPostsTests(APITestCase):
+    def setUp(self):
+        import tempfile
+        from .models import BlogPost
+
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+        self.user = User.objects.create_user(username='writer2', email='writer2@test.com', password='testpass123')
+        texts = [
+            ('Hiking the Alps', 'mountain trail hiking alps glacier summit'),
+            ('Alps glacier summit', 'glacier summit mountain alps snow trail'),
+            ('Football final', 'football match goal striker league final'),
+            ('League striker', 'striker goal league football transfer'),
+        ]
+        self.posts = [
+            BlogPost.objects.create(title=title, content=content, author=self.user)
+            for title, content in texts
+        ]
+
+    def options(self):
+        import os
+        from . import related
+
+        options = related.get_options()
+        options.update(TOP_K=2, CHUNK_SIZE=2, MIN_DF=1, INDEX_PATH=os.path.join(self.index_dir.name, 'index.npz'))
+        return options
+
+    def test_rebuild_and_endpoint(self):
+        from . import related
+
+        posts, links = related.rebuild(self.options())
+        self.assertEqual(posts, 4)
+        response = self.client.get(f'/api/posts/{self.posts[0].id}/related/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['id'], self.posts[1].id)
+        self.assertNotIn(self.posts[0].id, [p['id'] for p in response.data])
+
+        football = self.client.get(f'/api/posts/{self.posts[2].id}/related/').data
+        self.assertEqual(football[0]['id'], self.posts[3].id)
+        self.assertEqual(self.client.get('/api/posts/999999/related/').status_code, 404)
+
+    def test_incremental_update_scores_new_posts(self):
+        from . import related
+        from .models import BlogPost, RelatedPost
+
+        options = self.options()
+        related.rebuild(options)
+        new = BlogPost.objects.create(title='Alps trail', content='hiking trail mountain glacier alps', author=self.user)
+
+        changed, _ = related.update(options)
+        self.assertEqual(changed, 1)
+        neighbours = list(RelatedPost.objects.filter(post=new).values_list('related_id', flat=True))
+        self.assertEqual(set(neighbours), {self.posts[0].id, self.posts[1].id})
+        # The new post also enters the lists of the posts it is close to
+        self.assertIn(new.id, RelatedPost.objects.filter(post=self.posts[0]).values_list('related_id', flat=True))
+        self.assertEqual(related.update(options)[0], 0)
+
+
+class BulkPostOperationsTests(APITestCase):
+    def setUp(self):
+        from .models import BlogPost
+
+        self.admin = User.objects.create_user(username='bulkadmin', email='bulkadmin@test.com', password='testpass123')
+        self.admin.profile.is_blog_admin = True
+        self.admin.profile.save()
+        self.author = User.objects.create_user(username='spammer', email='spammer@test.com', password='testpass123')
+        self.news = BlogCategory.objects.create(name='News', slug='news')
+        self.misc = BlogCategory.objects.create(name='Misc', slug='misc')
+        self.posts = [
+            BlogPost.objects.create(title=f'Spam {i}', content='Buy now', author=self.author, category=self.misc)
+            for i in range(5)
+        ]
+        self.client.force_authenticate(user=self.admin)
+
+    def post_bulk(self, payload):
+        return self.client.post('/api/posts/bulk/', payload, format='json')
+
+    def test_requires_blog_admin_and_a_selection(self):
+        self.client.force_authenticate(user=self.author)
+        self.assertEqual(self.post_bulk({'action': 'delete', 'ids': [self.posts[0].id]}).status_code, 403)
+
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.post_bulk({'action': 'delete'}).status_code, 400)
+        self.assertEqual(self.post_bulk({'action': 'delete', 'filter': {}}).status_code, 400)
+        self.assertEqual(self.post_bulk({'action': 'recategorize', 'ids': [1]}).status_code, 400)
+
+    def test_unpublish_and_recategorize_are_single_updates(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from . import bulk
+        from .models import BlogPost
+
+        ids = [p.id for p in self.posts[:3]]
+        with CaptureQueriesContext(connection) as ctx:
+            matched, changed = bulk.apply('unpublish', bulk.select_posts(ids=ids))
+        self.assertEqual((matched, changed), (3, 3))
+        # One COUNT, the ids, one UPDATE and the sync log INSERT, besides the transaction's savepoints
+        self.assertEqual([q['sql'].split()[0] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']],
+                         ['SELECT', 'SELECT', 'UPDATE', 'INSERT'])
+
+        response = self.post_bulk({'action': 'unpublish', 'ids': ids})
+        self.assertEqual(response.data, {'action': 'unpublish', 'matched': 3, 'changed': 0})
+
+        response = self.post_bulk({
+            'action': 'recategorize', 'category_id': self.news.id,
+            'filter': {'author_id': self.author.id, 'published': False},
+        })
+        self.assertEqual(response.data['changed'], 3)
+        self.assertEqual(BlogPost.objects.filter(category=self.news).count(), 3)
+        self.assertEqual(BlogPost.objects.filter(published=True).count(), 2)
+
+    def test_delete_cascades_and_drops_buffered_views(self):
+        from unittest import mock
+        from .counters import ViewCounter
+        from .models import BlogPost, Comment, Like
+
+        Comment.objects.create(post=self.posts[0], user=self.admin, body='spam')
+        Like.objects.create(post=self.posts[0], user=self.admin)
+        counter = ViewCounter(interval=3600)
+        counter.add(self.posts[0].pk, 4)
+        counter.add(self.posts[4].pk, 1)
+        with mock.patch('blogc.bulk.view_counter', counter), self.captureOnCommitCallbacks(execute=True):
+            response = self.post_bulk({'action': 'delete', 'filter': {'title_contains': 'spam'}, 'ids': [
+                p.id for p in self.posts[:4]
+            ]})
+        self.assertEqual(response.data['changed'], 4)
+        self.assertEqual(list(BlogPost.objects.values_list('id', flat=True)), [self.posts[4].id])
+        self.assertFalse(Comment.objects.exists() or Like.objects.exists())
+        self.assertEqual(counter.pending(), {self.posts[4].pk: 1})
+        self.assertEqual(counter.flush(), 1)
+
+
+class CommentModerationTests(APITestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import BlogPost, Comment
+
+        self.admin = User.objects.create_user(username='moderator', email='moderator@test.com', password='testpass123')
+        self.admin.profile.is_blog_admin = True
+        self.admin.profile.save()
+        self.spammer = User.objects.create_user(username='flooder', email='flooder@test.com', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', email='reader@test.com', password='testpass123')
+        self.post = BlogPost.objects.create(title='Moderated', content='Body', author=self.admin)
+        now = timezone.now()
+        self.spam = [
+            Comment.objects.create(
+                post=self.post, user=self.spammer, body='Cheap pills at http://spam.example now',
+                created_at=now + timedelta(seconds=i),
+            )
+            for i in range(6)
+        ]
+        self.ham = [
+            Comment.objects.create(post=self.post, user=self.reader, body=body, created_at=now + timedelta(minutes=i))
+            for i, body in enumerate(['Great write-up, thanks!', 'I disagree with the second point though.'])
+        ]
+
+    def test_score_flags_repetition_links_and_bursts(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from . import moderation
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(moderation.score_pending(), (8, 6))
+        # batch, history, one UPDATE, then trending scores and the sync log entries for the hidden comments
+        self.assertEqual([q['sql'].split()[0] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']],
+                         ['SELECT', 'SELECT', 'UPDATE', 'UPDATE', 'INSERT'])
+        statuses = dict(self.post.comments.values_list('id', 'status'))
+        self.assertEqual({statuses[c.id] for c in self.spam}, {'flagged'})
+        self.assertEqual({statuses[c.id] for c in self.ham}, {'approved'})
+        self.assertEqual(self.post.comments.filter(active=True).count(), 2)
+        self.assertEqual(moderation.score_pending(), (0, 0))
+
+    def test_repeats_count_within_the_window_only(self):
+        from datetime import timedelta
+        from . import moderation
+
+        at = self.spam[0].created_at
+        body = 'Has anyone tried the ferry from here to the islands this month?'
+        rows = [(self.reader.id, body, at), (self.reader.id, body, at + timedelta(hours=7))]
+        options = {**moderation.get_options(), 'REPEAT_LIMIT': 1, 'THRESHOLD': 0.4}
+        self.assertTrue((moderation.score(rows, options=options) < options['THRESHOLD']).all())
+        rows[1] = (self.reader.id, body, at + timedelta(hours=5))
+        self.assertTrue((moderation.score(rows, options=options) >= options['THRESHOLD']).all())
+
+    def test_rows_reviewed_while_scoring_are_left_alone(self):
+        from unittest import mock
+        from . import moderation
+        from .models import SyncChange
+
+        score = moderation.score
+
+        def score_then_review(*args, **kwargs):
+            scores = score(*args, **kwargs)
+            moderation.review([self.spam[0].id], 'approve')  # an admin, meanwhile
+            return scores
+
+        with mock.patch('blogc.moderation.score', score_then_review):
+            self.assertEqual(moderation.score_pending(), (8, 5))
+        self.spam[0].refresh_from_db()
+        self.assertEqual((self.spam[0].status, self.spam[0].active), ('approved', True))
+        self.assertFalse(SyncChange.objects.filter(object_id=self.spam[0].id, kind='comment', deleted=True).exists())
+
+    def test_queue_and_bulk_review(self):
+        from . import moderation
+
+        moderation.score_all()
+        self.client.force_authenticate(user=self.reader)
+        self.assertEqual(self.client.get('/api/admin/comments/moderation/').status_code, 403)
+
+        self.client.force_authenticate(user=self.admin)
+        queue = self.client.get('/api/admin/comments/moderation/').data
+        self.assertEqual(queue['count'], 6)
+        response = self.client.post('/api/admin/comments/moderation/', {
+            'action': 'approve', 'ids': [self.spam[0].id],
+        }, format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.client.post('/api/admin/comments/moderation/', {
+            'action': 'reject', 'ids': [c.id for c in self.spam[1:]],
+        }, format='json')
+        self.assertEqual(self.client.get('/api/admin/comments/moderation/').data['count'], 0)
+        self.assertEqual(self.client.get('/api/admin/comments/moderation/?status=rejected').data['count'], 5)
+        self.assertEqual(self.post.comments.filter(active=True).count(), 3)
+
+
+class DataExportTests(APITestCase):
+    def setUp(self):
+        from .models import BlogPost, Comment, Like
+
+        self.admin = User.objects.create_user(username='analyst', email='analyst@test.com', password='testpass123')
+        self.admin.profile.is_blog_admin = True
+        self.admin.profile.save()
+        self.posts = [
+            BlogPost.objects.create(title=f'Export {i}', content='Line one\nline "two"', author=self.admin)
+            for i in range(3)
+        ]
+        Comment.objects.create(post=self.posts[0], user=self.admin, body='Nice')
+        Like.objects.create(post=self.posts[1], user=self.admin)
+
+    def test_streamed_gzip_jsonl_and_csv(self):
+        import csv
+        import gzip
+        import io
+        import json
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/admin/export/posts.jsonl')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([r['id'] for r in rows], [p.id for p in self.posts])
+        self.assertEqual(rows[0]['content'], 'Line one\nline "two"')
+
+        users = self.client.get('/api/admin/export/users.csv')
+        table = list(csv.reader(io.StringIO(gzip.decompress(b''.join(users.streaming_content)).decode())))
+        self.assertEqual(table[0][-2:], ['role', 'is_blog_admin'])
+        self.assertNotIn('password', table[0])
+        self.assertNotIn('email', table[0])
+
+        self.assertEqual(self.client.get('/api/admin/export/secrets.csv').status_code, 404)
+        self.assertEqual(self.client.get('/api/admin/export/likes.csv?since=yesterday').status_code, 400)
+
+    async def test_streamed_chunk_by_chunk_under_asgi(self):
+        import gzip
+        import json
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        response = await self.async_client.get(
+            '/api/admin/export/posts.jsonl', headers={'Authorization': f'Bearer {AccessToken.for_user(self.admin)}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        # An async iterator: Django would buffer a sync one whole before sending it
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual([r['id'] for r in rows], [p.id for p in self.posts])
+
+    def test_incremental_export_and_permissions(self):
+        import gzip
+        import json
+        from django.utils.dateparse import parse_datetime
+        from . import export
+
+        self.client.force_authenticate(user=self.admin)
+        started = parse_datetime(self.client.get('/api/admin/export/posts.jsonl')['X-Export-Started'])
+        self.posts[2].title = 'Edited'
+        self.posts[2].save()
+        chunks = export.stream('posts', 'jsonl', since=started)
+        rows = [json.loads(line) for line in gzip.decompress(b''.join(chunks)).decode().splitlines()]
+        self.assertEqual([r['title'] for r in rows], ['Edited'])
+
+        self.client.force_authenticate(user=User.objects.create_user(username='nosy', password='testpass123'))
+        self.assertEqual(self.client.get('/api/admin/export/posts.jsonl').status_code, 403)
+
+
+class ImportPostsCommandTests(TestCase):
+    def test_import_resolves_slugs_authors_categories_and_images(self):
+        import io
+        import json
+        import os
+        import tempfile
+        from unittest import mock
+        from PIL import Image
+        from django.core.files.storage import FileSystemStorage
+        from django.core.management import call_command
+        from .models import BlogPost
+
+        author = User.objects.create_user(username='archivist', email='Archive@test.com', password='testpass123')
+        BlogPost.objects.create(title='Hello world', content='Existing', author=author)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        Image.new('RGB', (3000, 1000), 'red').save(os.path.join(tmp.name, 'big.png'))
+        rows = [
+            {'title': 'Hello world', 'content': 'One', 'author': 'archivist', 'category': 'Travel', 'image': 'big.png'},
+            {'title': 'Hello world', 'content': 'Two', 'author': 'archive@test.com', 'category': 'travel'},
+            {'title': 'Orphan', 'content': 'Three', 'author': 'nobody'},
+            {'title': 'Broken image', 'content': 'Four', 'author': 'archivist', 'image': 'missing.jpg'},
+        ]
+        path = os.path.join(tmp.name, 'posts.jsonl')
+        with open(path, 'w') as fh:
+            fh.write('\n'.join(json.dumps(row) for row in rows))
+
+        storage = FileSystemStorage(location=os.path.join(tmp.name, 'media'))
+        with mock.patch('blogc.management.commands.import_posts.media_storage', storage):
+            call_command(
+                'import_posts', path, images=tmp.name, executor='thread', workers=2, max_size=800,
+                create_categories=True, stdout=io.StringIO(), stderr=io.StringIO(),
+            )
+
+        imported = BlogPost.objects.exclude(content='Existing').order_by('id')
+        self.assertEqual([p.slug for p in imported], ['hello-world-1', 'hello-world-2', 'broken-image'])
+        self.assertEqual({p.category.name for p in imported[:2]}, {'Travel'})
+        self.assertEqual(imported[0].image.name, 'post_images/big.png')
+        with Image.open(storage.path(imported[0].image.name)) as image:
+            self.assertEqual(image.size, (800, 267))
+        self.assertFalse(imported[2].image)
+
+    def test_image_worker_runs_without_django_setup(self):
+        import multiprocessing
+        import os
+        import tempfile
+        from concurrent.futures import ProcessPoolExecutor
+        from PIL import Image
+        from .images import process_image
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'wide.png')
+        Image.new('RGB', (400, 100), 'blue').save(path)
+        # What a worker gets on macOS and Windows: a fresh interpreter that never ran django.setup()
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            name, data = pool.submit(process_image, path, 200, 85).result(timeout=60)
+        self.assertEqual(name, 'wide.png')
+        self.assertTrue(data.startswith(b'\x89PNG'))
+
+
+class StaticSnapshotTests(APITestCase):
+    def setUp(self):
+        import tempfile
+        from unittest import mock
+        from . import snapshots
+        from .models import BlogPost
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        options = snapshots.get_options()
+        options.update(ENABLED=True, ROOT=tmp.name, CATEGORY_PAGES=2)
+        self.publisher = snapshots.Publisher(options)
+        patcher = mock.patch('blogc.snapshots.publisher', self.publisher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username='columnist', email='columnist@test.com', password='testpass123')
+        self.category = BlogCategory.objects.create(name='Roadtrips', slug='roadtrips')
+        self.posts = [
+            BlogPost.objects.create(title=f'Trip {i}', content='Body', author=self.user, category=self.category)
+            for i in range(25)
+        ]
+
+    def manifest(self):
+        import json
+
+        return json.loads(b''.join(self.client.get('/snapshots/manifest.json').streaming_content))
+
+    def test_publish_and_serve_precompressed_immutable_files(self):
+        import gzip
+        import json
+
+        self.publisher.publish()
+        manifest = self.manifest()
+        pages = [f'category-{self.category.id}-page-1', f'category-{self.category.id}-page-2']
+        self.assertTrue({'categories', 'latest', *pages} <= set(manifest))
+        self.assertNotIn(f'category-{self.category.id}-page-3', manifest)
+        response = self.client.get(manifest['latest'], HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        latest = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(latest, json.loads(self.client.get('/api/posts/latest/').content))
+
+        page = json.loads(b''.join(self.client.get(manifest[f'category-{self.category.id}-page-1']).streaming_content))
+        self.assertEqual((page['count'], len(page['results'])), (25, 20))
+        self.assertEqual(page['next'], manifest[f'category-{self.category.id}-page-2'])
+        self.assertEqual(self.client.get('/snapshots/.state.json').status_code, 404)
+
+        self.assertEqual(
+            self.client.get('/api/posts/latest/')['Link'], f'<{manifest["latest"]}>; rel="alternate"; type="application/json"'
+        )
+        # The category detail has totals and every post, so no snapshot stands in for it
+        for url in (f'/api/categories/{self.category.id}/', f'/api/async/categories/{self.category.id}/'):
+            self.assertNotIn('Link', self.client.get(url))
+
+    async def test_served_under_asgi(self):
+        from asgiref.sync import sync_to_async
+
+        manifest = await sync_to_async(self.publisher.publish)()
+        response = await self.async_client.get(manifest['categories'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_changes_rerender_only_affected_snapshots(self):
+        import time
+        from . import bulk
+
+        self.publisher.publish()
+        before = self.manifest()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[-1].title = 'Renamed'
+            self.posts[-1].save()
+        after = self.manifest()
+        self.assertNotEqual(before['latest'], after['latest'])
+        self.assertEqual(before['categories'], after['categories'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.apply('delete', bulk.select_posts(ids=[p.id for p in self.posts[:10]]))
+        self.assertNotIn(f'category-{self.category.id}-page-2', self.manifest())
+        # Superseded files go; everything the manifest points at stays
+        self.assertGreater(self.publisher.prune(now=time.time() + 10 ** 6), 0)
+        for url in self.manifest().values():
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_publishes_are_serialized_across_publishers(self):
+        import threading
+        from . import snapshots
+
+        # A second Publisher stands in for another worker process: it has its own thread lock
+        other = snapshots.Publisher(self.publisher.options)
+        entered = threading.Event()
+
+        def publish_elsewhere():
+            with other._locked():
+                entered.set()
+
+        with self.publisher._locked():
+            thread = threading.Thread(target=publish_elsewhere)
+            thread.start()
+            self.assertFalse(entered.wait(0.2))
+        self.assertTrue(entered.wait(5))
+        thread.join()
+
+    def test_follows_settings_and_stays_off_in_tests(self):
+        from django.conf import settings
+        from . import snapshots
+
+        tmp = self.publisher.root
+        snapshots.publisher.configure()  # back to the project settings
+        self.assertFalse(snapshots.publisher.options['ENABLED'])
+        options = {**settings.BLOGC_SETTINGS['SNAPSHOTS'], 'ENABLED': True, 'ROOT': tmp}
+        with self.settings(BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'SNAPSHOTS': options}):
+            self.assertTrue(snapshots.publisher.options['ENABLED'])
+            self.assertEqual(snapshots.publisher.root, tmp)
+        self.assertFalse(snapshots.publisher.options['ENABLED'])
+
+
+class RendererTests(APITestCase):
+    def setUp(self):
+        from .models import BlogPost
+
+        self.user = User.objects.create_user(username='renderer', email='renderer@test.com', password='testpass123')
+        BlogPost.objects.create(title='Ünïcode line', content='Body', author=self.user)
+
+    def test_orjson_matches_stdlib_renderer(self):
+        from decimal import Decimal
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+
+        data = self.client.get('/api/posts/').data
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        extras = {'price': Decimal('1.50'), 'label': gettext_lazy('Invalid page.'), 1: 'non-str key'}
+        self.assertEqual(ORJSONRenderer().render(extras), b'{"price":1.5,"label":"Invalid page.","1":"non-str key"}')
+
+    def test_msgpack_negotiation_and_json_parsing(self):
+        import msgpack
+
+        response = self.client.get('/api/posts/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content)[0]['title'], 'Ünïcode line')
+        self.assertEqual(self.client.get('/api/posts/')['Content-Type'], 'application/json')
+
+        response = self.client.post('/api/login/', '{"username": "renderer", "password": "testpass123"}',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/login/', '{"username": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.data['detail'])
+
+
+class PostProjectionTests(APITestCase):
+    def setUp(self):
+        from .models import BlogPost, Comment, Like
+
+        self.author = User.objects.create_user(username='projector', email='projector@test.com', password='testpass123',
+                                               first_name='Pro', last_name='Jector')
+        UserProfile.objects.get_or_create(user=self.author)
+        UserProfile.objects.filter(user=self.author).update(role='admin', is_blog_admin=True)
+        self.bare = User.objects.create_user(username='noprofile', email='noprofile@test.com', password='testpass123')
+        UserProfile.objects.filter(user=self.bare).delete()
+        category = BlogCategory.objects.create(name='Projections', slug='projections')
+        post = BlogPost.objects.create(title='With image', content='Body', author=self.author, category=category,
+                                       published=True, image='post_images/cover.png')
+        BlogPost.objects.create(title='Uncategorized', content='Body', author=self.bare, published=True)
+        BlogPost.objects.create(title='Draft', content='Body', author=self.author, category=category, published=False)
+        Like.objects.create(post=post, user=self.bare)
+        Comment.objects.create(post=post, user=self.bare, body='Nice')
+
+    def test_matches_list_serializer(self):
+        from .projections import post_list_data
+        from .queries import post_list_queryset
+        from .serializers import AnnotatedBlogPostListSerializer, BlogPostListSerializer
+
+        request = APIRequestFactory().get('/api/posts/')
+        qs = post_list_queryset().order_by('-created_at')
+        expected = BlogPostListSerializer(qs, many=True, context={'request': request}).data
+        self.assertEqual(post_list_data(qs, request), expected)
+        self.assertEqual(post_list_data(qs), AnnotatedBlogPostListSerializer(qs, many=True).data)
+        self.assertEqual([post['image'] is None for post in expected], [True, True, False])
+
+    def test_endpoints_use_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/posts/')
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(self.client.get('/api/posts/latest/').data[0]['title'], 'Uncategorized')
+        self.assertIsNone(self.client.get('/api/posts/latest/').data[0]['category'])
+        self.assertEqual(self.client.get('/api/async/posts/').json(), self.client.get('/api/posts/').json())
+
+
+class MediaURLResolverTests(TestCase):
+    def test_joins_keys_onto_prefix_resolved_once(self):
+        from unittest import mock
+        from .media import MediaURLResolver, media_storage, resolver
+
+        storage = mock.Mock(querystring_auth=False)
+        storage.url.side_effect = lambda name: f'https://bucket.s3.amazonaws.com/media/{name}'
+        options = {'CDN_DOMAIN': '', 'SIGNED_URL_CACHE_SIZE': 10}
+        plain = MediaURLResolver(storage, options=options)
+        self.assertEqual(plain.url('post_images/a b.png'), 'https://bucket.s3.amazonaws.com/media/post_images/a%20b.png')
+        self.assertEqual(plain.url('post_images/c.png'), 'https://bucket.s3.amazonaws.com/media/post_images/c.png')
+        self.assertEqual(storage.url.call_count, 1)
+
+        cdn = MediaURLResolver(storage, options={**options, 'CDN_DOMAIN': 'cdn.example.com'})
+        self.assertEqual(cdn.url('post_images/c.png'), 'https://cdn.example.com/media/post_images/c.png')
+        # The real S3 storage agrees with the joined URL
+        self.assertEqual(resolver.url('post_images/c.png'), media_storage.url('post_images/c.png'))
+
+    def test_signed_urls_are_cached_until_half_expiry(self):
+        from unittest import mock
+        from .media import MediaURLResolver
+
+        storage = mock.Mock(querystring_auth=True, querystring_expire=600)
+        storage.url.side_effect = lambda name: f'https://bucket/{name}?sig={storage.url.call_count}'
+        signed = MediaURLResolver(storage, options={'CDN_DOMAIN': 'cdn.example.com', 'SIGNED_URL_CACHE_SIZE': 10})
+        with mock.patch('blogc.media.time.monotonic', return_value=1000):
+            self.assertEqual(signed.url('a.png'), 'https://bucket/a.png?sig=1')
+            self.assertEqual(signed.url('a.png'), 'https://bucket/a.png?sig=1')
+        with mock.patch('blogc.media.time.monotonic', return_value=1301):
+            self.assertEqual(signed.url('a.png'), 'https://bucket/a.png?sig=2')
+
+    def test_serializers_share_the_resolver(self):
+        from .media import media_url
+        from .models import BlogPost
+        from .serializers import BlogPostDetailSerializer, BlogPostListSerializer
+
+        user = User.objects.create_user(username='media', email='media@test.com', password='testpass123')
+        post = BlogPost.objects.create(title='Pic', content='Body', author=user, image='post_images/pic.png')
+        request = APIRequestFactory().get('/')
+        self.assertEqual(BlogPostListSerializer(post).data['image'], post.image.url)
+        self.assertEqual(BlogPostDetailSerializer(post, context={'request': request}).data['image'], post.image.url)
+        self.assertIsNone(media_url(''))
+
+    def test_local_storage_and_failures(self):
+        from unittest import mock
+        from .media import MediaURLResolver, media_url
+
+        storage = mock.Mock(querystring_auth=False)
+        storage.url.side_effect = lambda name: f'/media/{name}'
+        local = MediaURLResolver(storage, options={'CDN_DOMAIN': '', 'SIGNED_URL_CACHE_SIZE': 10})
+        with mock.patch('blogc.media.resolver', local):
+            self.assertEqual(media_url('post_images/a.png'), '/media/post_images/a.png')
+            request = APIRequestFactory().get('/', HTTP_HOST='localhost')
+            self.assertEqual(media_url('post_images/a.png', request), 'http://localhost/media/post_images/a.png')
+
+        broken = mock.Mock(querystring_auth=True)
+        broken.url.side_effect = RuntimeError('no credentials')
+        with mock.patch('blogc.media.resolver', MediaURLResolver(broken, options={'SIGNED_URL_CACHE_SIZE': 10})), \
+                self.assertLogs('blogc.media', 'ERROR'):
+            self.assertIsNone(media_url('post_images/a.png'))
+
+
+class SharedMemoryCacheTests(TestCase):
+    def make_cache(self, **options):
+        import os
+        import tempfile
+        from .cache import SharedMemoryCache
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return SharedMemoryCache(os.path.join(tmp.name, 'cache.mmap'), {'OPTIONS': options})
+
+    def test_cache_api_expiry_and_size_limit(self):
+        import time
+        from unittest import mock
+
+        cache = self.make_cache(SIZE=64 * 1024, SLOT_SIZE=512)
+        cache.set('a', {'x': 1})
+        self.assertEqual(cache.get('a'), {'x': 1})
+        self.assertFalse(cache.add('a', 2))
+        self.assertTrue(cache.add('b', 2, timeout=10))
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'a': {'x': 1}, 'b': 2})
+        with mock.patch('blogc.cache.time.time', return_value=time.time() + 11):
+            self.assertIsNone(cache.get('b'))
+            self.assertTrue(cache.add('b', 3))
+        self.assertTrue(cache.touch('a', 0))
+        self.assertIsNone(cache.get('a'))
+        cache.set('big', 'x' * 1000)
+        self.assertIsNone(cache.get('big'))
+        self.assertTrue(cache.delete('b'))
+        self.assertFalse(cache.has_key('b'))
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.set('n', 1)
+        self.assertEqual(cache.incr('n', 5), 6)
+        self.assertEqual(cache.decr('n'), 5)
+        cache.clear()
+        self.assertIsNone(cache.get('n'))
+
+    def test_full_bucket_evicts_least_recently_used(self):
+        cache = self.make_cache(SIZE=2 * 256, SLOT_SIZE=256, WAYS=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual([cache.get(key) for key in 'abc'], [1, None, 3])
+        self.assertEqual(cache.stats(), {'used': 2, 'slots': 2, 'slot_size': 256})
+
+    def test_incr_is_atomic_across_processes(self):
+        import multiprocessing
+
+        cache = self.make_cache(SIZE=64 * 1024, SLOT_SIZE=512)
+        cache.set('hits', 0, None)
+
+        def work():
+            for _ in range(300):
+                cache.incr('hits')
+
+        ctx = multiprocessing.get_context('fork')
+        workers = [ctx.Process(target=work) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(cache.get('hits'), 1200)
+
+    def test_default_cache_is_shared_memory(self):
+        from django.conf import settings
+        from django.core.cache import caches
+        from .cache import SharedMemoryCache
+
+        self.assertIsInstance(caches['default'], SharedMemoryCache)
+        # ... but not the one a dev server on this host uses
+        self.assertNotIn(str(settings.BASE_DIR), caches['default']._segment.path)
+
+    def test_new_layout_gets_its_own_file(self):
+        import os
+        import tempfile
+        from django.core.exceptions import ImproperlyConfigured
+        from .cache import SharedMemoryCache
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        location = os.path.join(tmp.name, 'cache.mmap')
+        old = SharedMemoryCache(location, {'OPTIONS': {'SIZE': 64 * 1024, 'SLOT_SIZE': 512}})
+        old.set('a', 1)
+        # A rolling deploy with a bigger cache: the old workers' file is left alone
+        new = SharedMemoryCache(location, {'OPTIONS': {'SIZE': 128 * 1024, 'SLOT_SIZE': 512}})
+        self.assertNotEqual(new._segment.path, old._segment.path)
+        self.assertIsNone(new.get('a'))
+        self.assertEqual(old.get('a'), 1)
+        self.assertEqual(os.path.getsize(old._segment.path), old._segment.size)
+
+        with open(os.path.join(tmp.name, 'other-16x8x512.mmap'), 'wb') as fh:
+            fh.write(b'not a cache')
+        with self.assertRaises(ImproperlyConfigured):
+            SharedMemoryCache(os.path.join(tmp.name, 'other.mmap'), {'OPTIONS': {'SIZE': 64 * 1024, 'SLOT_SIZE': 512}})
+
+    def test_needs_fcntl(self):
+        from unittest import mock
+        from django.core.exceptions import ImproperlyConfigured
+
+        with mock.patch('blogc.cache.fcntl', None), self.assertRaises(ImproperlyConfigured):
+            self.make_cache()
+
+
+class SideloadTests(APITestCase):
+    def setUp(self):
+        from .models import BlogPost
+
+        self.authors = [
+            User.objects.create_user(username=f'writer{i}', email=f'writer{i}@test.com', password='testpass123')
+            for i in range(2)
+        ]
+        self.category = BlogCategory.objects.create(name='Sideloads', slug='sideloads')
+        for i in range(6):
+            BlogPost.objects.create(title=f'Post {i}', content='Body', author=self.authors[i % 2],
+                                    category=self.category if i else None, published=True)
+
+    def test_include_sideloads_deduplicated_relations(self):
+        embedded = {post['id']: post for post in self.client.get('/api/posts/').data}
+        # posts, then one IN query per sideloaded relation
+        with self.assertNumQueries(3):
+            data = self.client.get('/api/posts/', {'include': 'author,category'}).json()
+        self.assertEqual(set(data['authors']), {str(user.id) for user in self.authors})
+        self.assertEqual(list(data['categories']), [str(self.category.id)])
+        for post in data['results']:
+            full = embedded[post['id']]
+            self.assertEqual(data['authors'][str(post['author'])], full['author'])
+            if post['category'] is None:
+                self.assertIsNone(full['category'])
+            else:
+                self.assertEqual(data['categories'][str(post['category'])], full['category'])
+
+    def test_partial_and_invalid_include(self):
+        data = self.client.get('/api/posts/latest/', {'include': 'author'}).json()
+        self.assertNotIn('categories', data)
+        self.assertIsInstance(data['results'][0]['author'], int)
+        self.assertIsInstance(data['results'][1]['category'], dict)
+        response = self.client.get('/api/posts/', {'include': 'author,comments'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('comments', response.json()['include'][0])
+
+
+class CommentThreadTests(APITestCase):
+    def setUp(self):
+        from .models import BlogPost
+
+        self.user = User.objects.create_user(username='threader', email='threader@test.com', password='testpass123')
+        self.post = BlogPost.objects.create(title='Threads', content='Body', author=self.user)
+        self.url = f'/api/posts/{self.post.id}/comments/'
+        self.client.force_authenticate(self.user)
+
+    def reply(self, body, parent=None):
+        response = self.client.post(self.url, {'body': body, 'parent': parent}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def test_threads_list_depth_first_in_one_range_scan(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        first = self.reply('first')
+        second = self.reply('second')
+        a = self.reply('a', first)
+        a1 = self.reply('a1', a)
+        b = self.reply('b', first)
+        # A reply written later still lists under its parent
+        a2 = self.reply('a2', a)
+
+        data = self.client.get(self.url).data
+        self.assertEqual([c['id'] for c in data['results']], [first, a, a1, a2, b, second])
+        self.assertEqual([c['depth'] for c in data['results']], [0, 1, 2, 2, 1, 0])
+
+        with CaptureQueriesContext(connection) as ctx:
+            subtree = self.client.get(self.url, {'thread': a}).data['results']
+        self.assertEqual([c['id'] for c in subtree], [a, a1, a2])
+        listing = [q['sql'] for q in ctx.captured_queries if 'blogc_comment' in q['sql'] and 'LIMIT 51' in q['sql']]
+        self.assertEqual(len(listing), 1)
+        self.assertNotIn('WITH RECURSIVE', listing[0])
+        shallow = self.client.get(self.url, {'thread': first, 'max_depth': 1}).data['results']
+        self.assertEqual([c['id'] for c in shallow], [first, a, b])
+        self.assertEqual(self.client.get(self.url, {'thread': 999999}).status_code, 404)
+
+    def test_cursor_pages_and_depth_limit(self):
+        from django.conf import settings
+
+        parent = None
+        for depth in range(5):
+            parent = self.reply(f'level {depth}', parent)
+        response = self.client.post(self.url, {'body': 'too deep', 'parent': parent}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent', response.data)
+
+        threads_options = {**settings.BLOGC_SETTINGS['COMMENT_THREADS'], 'PAGE_SIZE': 2}
+        with self.settings(BLOGC_SETTINGS={**settings.BLOGC_SETTINGS, 'COMMENT_THREADS': threads_options}):
+            seen, url = [], self.url
+            while url:
+                page = self.client.get(url).data
+                seen += [c['body'] for c in page['results']]
+                url = page['next']
+        self.assertEqual(seen, [f'level {depth}' for depth in range(5)])
+        self.client.force_login(self.user)
+        self.assertEqual(
+            self.client.get(f'/api/async/posts/{self.post.id}/comments/?max_depth=2').json(),
+            self.client.get(self.url, {'max_depth': 2}).json(),
+        )
+
+    def test_bulk_created_comments_become_roots(self):
+        from .models import Comment
+        from .threads import fill_root_paths
+
+        Comment.objects.bulk_create([Comment(post=self.post, user=self.user, body=str(i)) for i in range(3)])
+        self.assertEqual(fill_root_paths(), 3)
+        self.assertEqual([c['body'] for c in self.client.get(self.url).data['results']], ['0', '1', '2'])
+
+    def test_path_is_written_with_the_insert(self):
+        from unittest import mock
+        from django.db.models.signals import post_save
+        from .models import Comment
+        from .threads import subtree
+
+        seen = []
+
+        def receiver(instance, **kwargs):
+            seen.append(Comment.objects.filter(pk=instance.pk).values_list('path', flat=True).get())
+
+        post_save.connect(receiver, sender=Comment)
+        self.addCleanup(post_save.disconnect, receiver, sender=Comment)
+        root = Comment.objects.create(post=self.post, user=self.user, body='root')
+        self.assertEqual(seen, [root.path])
+        self.assertTrue(root.path)
+
+        # A failed path write takes the INSERT with it
+        with mock.patch('django.db.models.QuerySet.update', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                Comment.objects.create(post=self.post, user=self.user, body='orphan')
+        self.assertFalse(Comment.objects.filter(body='orphan').exists())
+        with self.assertRaises(ValueError):
+            subtree('')
+
+    def test_parent_cannot_be_changed_by_an_edit(self):
+        self.user.profile.is_blog_admin = True
+        self.user.profile.save()
+        first = self.reply('first')
+        second = self.reply('second', first)
+        response = self.client.patch(f'/api/comments/{first}/', {'parent': second}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent', response.data)
+        response = self.client.patch(f'/api/comments/{second}/', {'parent': None}, format='json')
+        self.assertEqual(response.status_code, 400)
+        # Resending the current parent is fine
+        response = self.client.put(f'/api/comments/{second}/', {'body': 'edited', 'parent': first}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['depth'], 1)
+
+
+class PostEventsTests(APITestCase):
+    def setUp(self):
+        from .models import BlogPost
+
+        self.user = User.objects.create_user(username='listener', email='listener@test.com', password='testpass123')
+        self.post = BlogPost.objects.create(title='Live', content='Body', author=self.user)
+
+    def test_writes_publish_after_commit(self):
+        from unittest import mock
+        from . import events
+
+        class RecordingBroker:
+            def __init__(self):
+                self.published = []
+
+            def publish(self, post_id, type, data):
+                self.published.append((post_id, type, data))
+
+        broker = RecordingBroker()
+        self.client.force_authenticate(self.user)
+        with mock.patch.object(events, 'broker', broker), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{self.post.id}/comments/', {'body': 'Hello'}, format='json')
+            self.assertEqual(broker.published, [])  # nothing before the commit
+        with mock.patch.object(events, 'broker', broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/api/posts/{self.post.id}/like-toggle/')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/api/posts/{self.post.id}/like-toggle/')
+        self.assertEqual([(post_id, type) for post_id, type, _ in broker.published], [
+            (self.post.id, 'comment.created'), (self.post.id, 'likes.changed'), (self.post.id, 'likes.changed'),
+        ])
+        self.assertEqual(broker.published[0][2]['body'], 'Hello')
+        self.assertEqual([data['likes_count'] for _, _, data in broker.published[1:]], [1, 0])
+
+    async def test_stream_resumes_after_last_event_id(self):
+        from unittest import mock
+        from asgiref.sync import sync_to_async
+        from . import events
+
+        broker = events.LocalBroker(replay_size=2)
+        url = f'/api/async/posts/{self.post.id}/events/'
+        with mock.patch.object(events, 'broker', broker):
+            for likes in range(3):
+                broker.publish(self.post.id, 'likes.changed', {'post': self.post.id, 'likes_count': likes})
+            epoch = broker.epoch.encode()
+            response = await self.async_client.get(url, headers={'Last-Event-ID': f'{broker.epoch}-1'})
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            chunks = aiter(response.streaming_content)
+            self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+            for likes in (1, 2):
+                self.assertEqual(
+                    await anext(chunks),
+                    b'id: %s-%d\nevent: likes.changed\ndata: {"post":%d,"likes_count":%d}\n\n'
+                    % (epoch, likes + 1, self.post.id, likes),
+                )
+            # Live events published from another thread
+            await sync_to_async(broker.publish, thread_sensitive=False)(self.post.id, 'comment.created', {'id': 9})
+            self.assertIn(b'event: comment.created', await anext(chunks))
+            self.assertEqual(broker.subscriber_count(self.post.id), 1)
+            await chunks.aclose()
+
+            # Id 1 has left the replay buffer, 99 was never issued, and the last two come
+            # from another worker or from before a restart: their numbers mean nothing here
+            for last in (f'{broker.epoch}-1', f'{broker.epoch}-99', f'{events.LocalBroker().epoch}-2', '2'):
+                broker.publish(self.post.id, 'likes.changed', {})
+                response = await self.async_client.get(url, {'last_event_id': last})
+                chunks = aiter(response.streaming_content)
+                await anext(chunks)
+                self.assertTrue((await anext(chunks)).startswith(b'event: resync\n'))
+                await chunks.aclose()
+        self.assertEqual((await self.async_client.get('/api/async/posts/999999/events/')).status_code, 404)
+
+    async def test_replay_history_is_kept_for_recent_posts_only(self):
+        from . import events
+
+        broker = events.LocalBroker(replay_posts=2)
+        seen, missed = [broker.publish(1, 'likes.changed', {}).id for _ in range(2)]
+        for post_id in (2, 3):
+            broker.publish(post_id, 'likes.changed', {})
+        self.assertEqual(list(broker._history), [2, 3])
+        self.assertTrue(broker.subscribe(1, seen).resync)
+        self.assertEqual(broker.subscribe(1, missed).backlog, [])
+        self.assertEqual([event.post_id for event in broker.subscribe(2, seen).backlog], [2])
+        # Post 1 is back, but the dropped event is still missing from its history
+        latest = broker.publish(1, 'likes.changed', {})
+        self.assertTrue(broker.subscribe(1, seen).resync)
+        self.assertEqual(broker.subscribe(1, missed).backlog, [latest])
+        self.assertEqual(list(broker._history), [3, 1])
+
+    async def test_stream_heartbeat_and_disconnect(self):
+        from . import events
+
+        broker = events.LocalBroker()
+        body = events.stream(broker.subscribe(self.post.id), heartbeat=0.01)
+        self.assertEqual(await anext(body), 'retry: 3000\n\n')
+        self.assertEqual(await anext(body), ': keepalive\n\n')
+        self.assertEqual(broker.subscriber_count(), 1)
+        await body.aclose()  # what a client disconnect does to the response
+        self.assertEqual(broker.subscriber_count(), 0)
+
+
+class SyncFeedTests(APITestCase):
+    def setUp(self):
+        from .models import BlogPost
+
+        self.user = User.objects.create_user(username='syncer', email='syncer@test.com', password='testpass123')
+        self.user.profile.is_blog_admin = True  # may delete comments
+        self.user.profile.save()
+        self.posts = [BlogPost.objects.create(title=f'Sync {i}', content='Body', author=self.user) for i in range(3)]
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_first_sync_then_deltas_with_tombstones(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from . import moderation, sync
+        from .models import Comment
+
+        seen, token = [], None
+        while True:
+            page = self.sync(token, limit=2)
+            seen += [post['id'] for post in page['posts']]
+            token = page['next']
+            if not page['has_more']:
+                break
+        self.assertEqual(seen, [post.id for post in self.posts])
+        self.assertEqual(self.sync(token)['posts'], [])
+
+        first = self.client.post(f'/api/posts/{self.posts[0].id}/comments/', {'body': 'one'}, format='json').data['id']
+        reply = self.client.post(
+            f'/api/posts/{self.posts[0].id}/comments/', {'body': 'two', 'parent': first}, format='json'
+        ).data['id']
+        kept = self.client.post(f'/api/posts/{self.posts[1].id}/comments/', {'body': 'kept'}, format='json').data['id']
+        self.client.post(f'/api/posts/{self.posts[0].id}/like-toggle/')
+        self.posts[2].title = 'Renamed'
+        self.posts[2].save()
+        self.client.delete(f'/api/comments/{first}/')  # takes its reply with it
+
+        with CaptureQueriesContext(connection) as ctx:
+            delta = sync.changes(token)
+        # The log range scan, then one query per kind
+        self.assertEqual(len(ctx.captured_queries), 4)
+        self.assertEqual([post['title'] for post in delta['posts']], ['Renamed'])
+        self.assertEqual([comment['id'] for comment in delta['comments']], [kept])
+        self.assertEqual([like['post'] for like in delta['likes']], [self.posts[0].id])
+        self.assertEqual(delta['deleted'], {'posts': [], 'comments': [first, reply], 'likes': []})
+
+        like = delta['likes'][0]['id']
+        self.client.post(f'/api/posts/{self.posts[0].id}/like-toggle/')
+        self.client.delete(f'/api/posts/{self.posts[1].id}/')
+        self.client.post(f'/api/posts/{self.posts[2].id}/comments/', {'body': 'hidden'}, format='json')
+        hidden = Comment.objects.get(body='hidden')
+        moderation.review([hidden.id], 'reject')
+        delta = self.sync(delta['next'])
+        self.assertEqual(delta['deleted'], {'posts': [self.posts[1].id], 'comments': [hidden.id], 'likes': [like]})
+        self.assertEqual(delta['posts'] + delta['comments'] + delta['likes'], [])
+
+    def test_deletes_outside_the_api_leave_tombstones(self):
+        from .models import Comment, Like
+
+        other = User.objects.create_user(username='leaver', email='leaver@test.com', password='testpass123')
+        comments = [Comment.objects.create(post=post, user=other, body='Hi') for post in self.posts[:2]]
+        likes = [Like.objects.create(post=post, user=other) for post in self.posts[:2]]
+        comment_ids, like_ids = [comment.id for comment in comments], [like.id for like in likes]
+        token = self.sync()['next']
+
+        # Shell/admin deletes, then a user delete cascading to the rest
+        comments[0].delete()
+        likes[0].delete()
+        other.delete()
+        delta = self.sync(token)
+        self.assertEqual(delta['deleted'], {
+            'posts': [],
+            'comments': comment_ids,
+            'likes': like_ids,
+        })
+
+        # A post's tombstone covers its comments and likes
+        comment = Comment.objects.create(post=self.posts[2], user=self.user, body='Gone')
+        Like.objects.create(post=self.posts[2], user=self.user)
+        token, post_id = self.sync(delta['next'])['next'], self.posts[2].id
+        self.posts[2].delete()
+        self.assertEqual(self.sync(token)['deleted'], {'posts': [post_id], 'comments': [], 'likes': []})
+        self.assertFalse(Comment.objects.filter(pk=comment.pk).exists())
+
+    def test_log_is_written_last_under_the_lock(self):
+        from unittest import mock
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from . import bulk, moderation, sync
+        from .models import BlogPost, Comment
+
+        comment = Comment.objects.create(post=self.posts[0], user=self.user, body='Hi')
+        token = self.sync()['next']
+        writes = [
+            lambda: bulk.apply('unpublish', BlogPost.objects.filter(pk__in=[post.pk for post in self.posts])),
+            lambda: moderation.review([comment.pk], 'reject'),
+        ]
+        with mock.patch('blogc.sync._lock_log', wraps=sync._lock_log) as lock:
+            for write in writes:
+                with CaptureQueriesContext(connection) as ctx:
+                    write()
+                # Other writers wait on the log lock until the commit, so nothing comes after it
+                statements = [query['sql'] for query in ctx.captured_queries if 'SAVEPOINT' not in query['sql']]
+                self.assertTrue(statements[-1].startswith('INSERT INTO "blogc_syncchange"'), statements)
+        self.assertEqual(lock.call_count, 2)
+        delta = self.sync(token)
+        self.assertEqual(sorted(post['id'] for post in delta['posts']), [post.id for post in self.posts])
+        self.assertEqual(delta['deleted']['comments'], [comment.pk])
+
+    def test_bad_tokens(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import sync
+
+        expired = sync.make_token(0, timezone.now() - timedelta(days=31))
+        self.assertEqual(self.client.get('/api/sync/', {'since': expired}).status_code, 410)
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'latest'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/sync/', {'limit': '0'}).status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/sync/').status_code, 401)
+
+    def test_prune_and_backfill(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import sync
+        from .models import BlogPost, SyncChange
+
+        for _ in range(3):
+            self.posts[0].save()
+        self.posts[1].delete()
+        # The creates and all but the last save are superseded; the tombstone is still recent
+        self.assertEqual(sync.prune(), 4)
+        self.assertEqual(sync.prune(now=timezone.now() + timedelta(days=31)), 1)
+        self.assertFalse(SyncChange.objects.filter(object_id=self.posts[1].id, kind='post').exists())
+
+        imported = BlogPost.objects.bulk_create([BlogPost(title='Bulk', slug='bulk', content='Body', author=self.user)])
+        self.assertEqual(sync.backfill(), 1)
+        self.assertIn(imported[0].id, [post['id'] for post in self.sync()['posts']])
+
+
+class SQLiteProfileTests(TestCase):
+    def test_connections_apply_profile(self):
+        import os
+        import tempfile
+        from django.conf import settings
+        from django.db import connection
+        from .management.commands.bench_sqlite_writes import connect
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], int(settings.SQLITE_OPTIONS['timeout'] * 1000))
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+        # The test database lives in memory; WAL needs a file
+        with tempfile.TemporaryDirectory() as tmp:
+            scratch = connect(os.path.join(tmp, 'wal.sqlite3'), settings.SQLITE_OPTIONS)
+            self.assertEqual(scratch.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            scratch.close()
+
+    def test_concurrent_writers_do_not_hit_locked_errors(self):
+        import io
+        from django.core.management import call_command
+
+        out = io.StringIO()
+        call_command('bench_sqlite_writes', threads=6, readers=1, seconds=0.5, stdout=out)
+        profiled = [line for line in out.getvalue().splitlines() if 'SQLITE_OPTIONS' in line]
+        self.assertRegex(profiled[0], r' 0 locked')
+
+
+class ScalableAdminTests(TestCase):
+    def setUp(self):
+        from .models import BlogPost, Comment, Like
+
+        self.admin = User.objects.create_superuser(username='root', email='root@test.com', password='testpass123')
+        self.client.force_login(self.admin)
+        self.readers = [
+            User.objects.create_user(username=f'reader{i}', email=f'reader{i}@test.com', password='testpass123')
+            for i in range(5)
+        ]
+        self.post = BlogPost.objects.create(title='Admin', content='Body', author=self.admin)
+        self.comments = [Comment.objects.create(post=self.post, user=user, body='Hi') for user in self.readers]
+        self.likes = [Like.objects.create(post=self.post, user=user) for user in self.readers]
+
+    def test_changelists_page_by_key_without_counting(self):
+        from unittest import mock
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.urls import reverse
+        from .admin import LikeAdmin
+
+        url = reverse('admin:blogc_like_changelist')
+        seen = []
+        with mock.patch.object(LikeAdmin, 'list_per_page', 2), mock.patch('blogc.admin.COUNT_LIMIT', 3):
+            while url:
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                cl = response.context['cl']
+                seen += [like.pk for like in cl.result_list]
+                self.assertEqual(cl.result_count, self.likes[-1].pk)  # estimated, no COUNT(*)
+                self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+                self.assertFalse([q for q in ctx.captured_queries if 'OFFSET' in q['sql']])
+                url = cl.older_url and reverse('admin:blogc_like_changelist') + cl.older_url
+        self.assertEqual(seen, [like.pk for like in reversed(self.likes)])
+
+    def test_rows_render_without_per_row_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.urls import reverse
+        from .models import Comment
+
+        url = reverse('admin:blogc_comment_changelist')
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        Comment.objects.bulk_create([Comment(post=self.post, user=user, body='More') for user in self.readers * 4])
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['cl'].result_list), 25)
+        self.assertEqual(len(many.captured_queries), len(few.captured_queries))
+
+    def test_search_is_exact_and_counts_are_capped(self):
+        from unittest import mock
+        from django.urls import reverse
+
+        url = reverse('admin:blogc_comment_changelist')
+        cl = self.client.get(url, {'q': 'reader3'}).context['cl']
+        self.assertEqual([c.pk for c in cl.result_list], [self.comments[3].pk])
+        self.assertEqual(self.client.get(url, {'q': 'reader'}).context['cl'].result_count, 0)
+        cl = self.client.get(url, {'q': str(self.post.pk)}).context['cl']
+        self.assertEqual(cl.result_count, len(self.comments))  # matches post_id too
+        with mock.patch('blogc.admin.COUNT_LIMIT', 3):
+            self.assertEqual(self.client.get(url, {'status__exact': 'new'}).context['cl'].result_count, 3)
+        # Sorting by a column falls back to numbered pages
+        self.assertFalse(self.client.get(url, {'o': '2'}).context['cl'].keyset)
+        self.assertEqual(self.client.get(url, {'before': 'x'}).status_code, 302)
+
+
+class HealthTests(TestCase):
+    def monitor(self, **checks):
+        from . import health
+
+        monitor = health.HealthMonitor(
+            checks={**health.CHECKS, **checks}, options={**health.get_options(), 'TIMEOUT_SECONDS': 0.5}
+        )
+        self.addCleanup(monitor._executor.shutdown, wait=False)
+        return monitor
+
+    def test_liveness_touches_nothing(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/health/live/')
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_readiness_is_cached_and_bounded(self):
+        import time
+        from unittest import mock
+        from . import health
+
+        calls = []
+        monitor = self.monitor(storage=lambda: calls.append(1))
+        with mock.patch.object(health, 'monitor', monitor):
+            for _ in range(3):
+                response = self.client.get('/health/')
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(calls), 1)  # one round of checks per TTL
+            self.assertEqual(set(response.json()['checks']), {'database', 'cache', 'storage'})
+            self.assertTrue(all(check['ok'] for check in response.json()['checks'].values()))
+
+            def broken():
+                raise RuntimeError('x' * 10000)
+
+            monitor.checks = {**monitor.checks, 'storage': broken, 'cache': lambda: time.sleep(2)}
+            monitor.reset()
+            response = self.client.get('/health/ready/')
+        self.assertEqual(response.status_code, 503)
+        checks = response.json()['checks']
+        self.assertTrue(checks['database']['ok'])
+        self.assertEqual(len(checks['storage']['error']), 200)
+        self.assertIn('timed out', checks['cache']['error'])
+        self.assertLess(response.json()['duration_ms'], 1500)
+
+    def test_storage_check_is_one_head_request_on_the_shared_client(self):
+        from unittest import mock
+        from . import health
+
+        storage = mock.Mock(bucket_name='media-bucket')
+        with mock.patch.object(health, 'media_storage', storage):
+            health.check_storage()
+            health.check_storage()
+        client = storage.connection.meta.client
+        self.assertEqual(client.head_bucket.call_args_list, [mock.call(Bucket='media-bucket')] * 2)
+        client.list_buckets.assert_not_called()
+        self.assertEqual(self.client.get('/api/s3-test/').status_code, 404)
@@ -0,0 +1,82 @@
+# threads.py
+# Reply threads on materialized paths. Comment.path is the chain of zero-padded ids
+# from the thread root down to the comment, so
+#   ORDER BY path                            -> threads depth-first, replies under their parent in posting order
+#   path >= P AND path < P || ':'            -> the comment with path P and its whole subtree
+# both served by the (post, path) index, with no recursive queries. Pages are keyset
+# cursors over path, so deep pages cost the same as the first.
+from django.conf import settings
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, LPad
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination
+
+from .models import PATH_SEGMENT, Comment
+from .queries import comment_list_queryset
+
+
+def get_options():
+    options = {
+        'MAX_DEPTH': 4,  # replies nest at most this many levels below the root comment
+        'PAGE_SIZE': 50,
+    }
+    options.update(settings.BLOGC_SETTINGS.get('COMMENT_THREADS', {}))
+    return options
+
+
+def subtree(path):
+    # ':' sorts right after '9', so the range holds exactly the paths that start with `path`
+    if not path:
+        # '' starts every path: the "subtree" would be all of the post's comments
+        raise ValueError('subtree() needs a non-empty comment path')
+    return {'path__gte': path, 'path__lt': path + ':'}
+
+
+def thread_queryset(post_id, params):
+    """
+    A post's active comments in display order, narrowed by the query parameters
+    ?thread=<comment id> (that comment and its replies) and ?max_depth=<n>.
+    """
+    qs = comment_list_queryset(post_id)
+    thread = params.get('thread')
+    if thread:
+        path = None
+        if thread.isdigit():
+            path = Comment.objects.filter(pk=thread, post_id=post_id).values_list('path', flat=True).first()
+        if not path:
+            raise NotFound('No such comment thread on this post.')
+        qs = qs.filter(**subtree(path))
+    max_depth = params.get('max_depth')
+    if max_depth:
+        if not max_depth.isdigit():
+            raise ValidationError({'max_depth': ['A non-negative integer is required.']})
+        qs = qs.filter(depth__lte=int(max_depth))
+    return qs
+
+
+def check_reply(parent, post):
+    """Raise ValidationError unless `parent` (or None) can take a reply on `post`."""
+    if parent is None:
+        return
+    if parent.post_id != post.pk or not parent.active:
+        raise ValidationError({'parent': ['Replies must be to a visible comment on the same post.']})
+    max_depth = get_options()['MAX_DEPTH']
+    if parent.depth >= max_depth:
+        raise ValidationError({'parent': [f'Replies can nest at most {max_depth} levels deep.']})
+
+
+def fill_root_paths(queryset=None):
+    """
+    Give comments inserted with bulk_create (which skips Comment.save) their path,
+    treating them as thread roots; one UPDATE.
+    """
+    queryset = Comment.objects.all() if queryset is None else queryset
+    return queryset.filter(path='').update(path=LPad(Cast('id', CharField()), PATH_SEGMENT, Value('0')))
+
+
+class ThreadCursorPagination(CursorPagination):
+    ordering = 'path'
+
+    def get_page_size(self, request):
+        # Looked up per request, so COMMENT_THREADS overrides apply
+        return get_options()['PAGE_SIZE']
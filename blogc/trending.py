@@ -0,0 +1,166 @@
+# trending.py
+# Exponentially decayed trending scores, stored in log space.
+#
+# A post's decayed score at time `now` is  sum(w_i * exp(-(now - t_i) / tau)).
+# Multiplying every score by exp((now - EPOCH) / tau) doesn't change the order, so
+# we store  ln(sum(w_i * exp((t_i - EPOCH) / tau)))  which never needs rescaling:
+# a new event only adds to its own post's row, and ORDER BY score DESC on the index
+# is always the current ranking. Logs keep the numbers small forever; two log scores
+# are combined with  max(a, b) + ln(1 + exp(-|a - b|)).
+#
+# Events that are undone (an unlike, a comment moderation hides) are taken back out
+# with  a + ln(1 - exp(b - a)),  so toggling a like or spamming comments that get
+# flagged doesn't ratchet a post's score up. A comment counts while it is active.
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from .models import Comment, Like, TrendingScore
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+# Log score of a row with no events yet (exp(EMPTY) is 0 for all practical purposes)
+EMPTY = -1e6
+
+
+def get_options():
+    options = {
+        'HALF_LIFE_HOURS': 24,
+        'LIKE_WEIGHT': 3.0,
+        'COMMENT_WEIGHT': 5.0,
+        'VIEW_WEIGHT': 0.1,
+        'WINDOW_DAYS': 7,
+    }
+    options.update(settings.BLOGC_SETTINGS.get('TRENDING', {}))
+    return options
+
+
+def _tau_hours():
+    return get_options()['HALF_LIFE_HOURS'] / math.log(2)
+
+
+def log_weight(weight, at=None):
+    """Log-space contribution of an event of `weight` happening at `at`."""
+    at = at or timezone.now()
+    return math.log(weight) + (at - EPOCH).total_seconds() / 3600 / _tau_hours()
+
+
+def current_score(log_score, now=None):
+    """Convert a stored log score back to the decayed score as of `now`."""
+    return math.exp(log_score - log_weight(1, now))
+
+
+def _combine(a, b):
+    """ln(exp(a) + exp(b)) for two log scores."""
+    return max(a, b) + math.log1p(math.exp(-abs(a - b)))
+
+
+def _event_increments(events):
+    """Log-space total per post for (post_id, weight, at) events."""
+    increments = {}
+    for post_id, weight, at in events:
+        if weight > 0:
+            inc = log_weight(weight, at)
+            increments[post_id] = inc if post_id not in increments else _combine(increments[post_id], inc)
+    return increments
+
+
+def bump(weights, at=None):
+    """
+    Add events to posts' scores: `weights` maps post_id -> total event weight.
+    Two statements whatever the number of posts: an insert for posts without a
+    row yet, then one UPDATE ... CASE that merges the new events into the score.
+    """
+    at = at or timezone.now()
+    _merge({post_id: log_weight(weight, at) for post_id, weight in weights.items() if weight > 0}, at)
+
+
+def bump_events(events):
+    """bump() for (post_id, weight, at) events that happened at different times."""
+    _merge(_event_increments(events), timezone.now())
+
+
+def _merge(increments, at):
+    if not increments:
+        return
+    with transaction.atomic():
+        # New rows start "empty" so the merge below leaves them at exactly their increment
+        TrendingScore.objects.bulk_create(
+            [TrendingScore(post_id=post_id, score=EMPTY, updated_at=at) for post_id in increments],
+            ignore_conflicts=True,
+        )
+        new = Case(
+            *[When(pk=post_id, then=Value(inc)) for post_id, inc in increments.items()],
+            output_field=FloatField(),
+        )
+        # Least(.., 700) keeps exp() away from the underflow PostgreSQL reports as an error
+        TrendingScore.objects.filter(pk__in=increments.keys()).update(
+            score=Greatest(F('score'), new) + Ln(1 + Exp(-Least(Abs(F('score') - new), Value(700.0)))),
+            updated_at=at,
+        )
+
+
+def unbump(events, now=None):
+    """
+    Take events back out of posts' scores: `events` is an iterable of
+    (post_id, weight, at) for events earlier passed to bump(). Events older than
+    WINDOW_DAYS are skipped, since a rebuild() may have dropped them already.
+    """
+    since = (now or timezone.now()) - timedelta(days=get_options()['WINDOW_DAYS'])
+    removed = _event_increments(event for event in events if event[2] >= since)
+    if not removed:
+        return
+    old = Case(
+        *[When(pk=post_id, then=Value(inc)) for post_id, inc in removed.items()],
+        output_field=FloatField(),
+    )
+    # Removing (about) everything a row holds leaves it empty rather than ln(0)
+    remaining = Greatest(1 - Exp(Greatest(old - F('score'), Value(-700.0))), Value(1e-300))
+    TrendingScore.objects.filter(pk__in=removed.keys()).update(
+        score=Case(
+            When(score__lte=old + Value(1e-9), then=Value(EMPTY)),
+            default=F('score') + Ln(remaining),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def prune(now=None):
+    """Drop rows whose decayed score has fallen below a single view's weight."""
+    floor = log_weight(get_options()['VIEW_WEIGHT'], now)
+    return TrendingScore.objects.filter(score__lt=floor).delete()[0]
+
+
+def rebuild(now=None):
+    """
+    Recompute all scores from likes and active comments in the last WINDOW_DAYS.
+    Views have no timestamps, so their contribution is dropped by a rebuild.
+    """
+    options = get_options()
+    now = now or timezone.now()
+    since = now - timedelta(days=options['WINDOW_DAYS'])
+    tau = _tau_hours()
+    # Sum in linear space relative to `now` (every term <= weight), then move to log space
+    totals = defaultdict(float)
+    sources = ((Like.objects.all(), options['LIKE_WEIGHT']), (Comment.objects.filter(active=True), options['COMMENT_WEIGHT']))
+    for queryset, weight in sources:
+        rows = queryset.filter(created_at__gte=since).values_list('post_id', 'created_at')
+        for post_id, created_at in rows.iterator(chunk_size=5000):
+            age_hours = (now - created_at).total_seconds() / 3600
+            totals[post_id] += weight * math.exp(-max(age_hours, 0) / tau)
+    offset = log_weight(1, now)
+    with transaction.atomic():
+        TrendingScore.objects.all().delete()
+        TrendingScore.objects.bulk_create(
+            [
+                TrendingScore(post_id=post_id, score=math.log(total) + offset, updated_at=now)
+                for post_id, total in totals.items() if total > 0
+            ],
+            batch_size=5000,
+        )
+    return len(totals)
@@ -11,11 +11,21 @@ from .views import (
     AdminCategoryDetailView,
     CommentListCreateView,
     CommentDetailView,
+    CommentModerationView,
     ToggleLikeView,
-    S3TestView,
-    DebugImageView
+    SyncView,
+    DatabasePoolStatsView,
+    DataExportView,
+)
+from .async_views import (
+    AsyncPostListView,
+    AsyncLatestPostsView,
+    AsyncPostDetailView,
+    AsyncPostEventsView,
+    AsyncCategoryListView,
+    AsyncCategoryDetailView,
+    AsyncCommentListView,
 )
-from . import views
 
 # Router setup (only for posts, not categories to avoid duplication)
 router = DefaultRouter()
@@ -31,17 +41,28 @@ urlpatterns = [
     path('categories/', CategoryListView.as_view(), name='category-list'),  # Public list, POST allowed for admins
     path('categories/<int:pk>/', PublicCategoryDetailView.as_view(), name='category-detail-public'),
     path('admin/categories/<int:pk>/', AdminCategoryDetailView.as_view(), name='category-detail-admin'),
+    path('admin/db-pool/', DatabasePoolStatsView.as_view(), name='db-pool-stats'),
+    path('admin/export/<str:name>.<str:fmt>', DataExportView.as_view(), name='data-export'),
 
     path('', include(router.urls)),  # Posts CRUD via router
 
     # Comments
     path('posts/<int:post_id>/comments/', CommentListCreateView.as_view(), name='post-comments'),
     path("comments/<int:pk>/", CommentDetailView.as_view(), name="comment-detail"),
+    path('admin/comments/moderation/', CommentModerationView.as_view(), name='comment-moderation'),
+
+    # Async read path (serve with an ASGI server, e.g. uvicorn api.asgi:application)
+    path('async/posts/', AsyncPostListView.as_view(), name='async-post-list'),
+    path('async/posts/latest/', AsyncLatestPostsView.as_view(), name='async-post-latest'),
+    path('async/posts/<int:pk>/', AsyncPostDetailView.as_view(), name='async-post-detail'),
+    path('async/posts/<int:post_id>/comments/', AsyncCommentListView.as_view(), name='async-post-comments'),
+    path('async/posts/<int:pk>/events/', AsyncPostEventsView.as_view(), name='async-post-events'),
+    path('async/categories/', AsyncCategoryListView.as_view(), name='async-category-list'),
+    path('async/categories/<int:pk>/', AsyncCategoryDetailView.as_view(), name='async-category-detail'),
+
+    # Incremental sync for offline clients
+    path('sync/', SyncView.as_view(), name='sync'),
 
     # Likes
     path('posts/<int:post_id>/like-toggle/', ToggleLikeView.as_view(), name='post-like'),
-    # for testing display of images
-    path('s3-test/', S3TestView.as_view(), name='s3-test'),
-    path('debug/storage', views.debug_storage, name='debug-storage'),
-    path('debug-images/', DebugImageView.as_view(), name='debug-images'),
 ]
@@ -12,96 +12,84 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.utils.text import slugify
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
 
 from .models import BlogCategory, BlogPost, Comment, Like, UserProfile
 from .serializers import (
     RegisterSerializer, UserSerializer,
     BlogCategorySerializer, BlogPostListSerializer,
     BlogPostDetailSerializer, BlogPostCreateSerializer,
-    CommentSerializer, BlogCategoryDetailSerializer, LikeSerializer
+    CommentSerializer, BlogCategoryDetailSerializer, LikeSerializer,
+    RevocableTokenRefreshSerializer,
+    BulkPostActionSerializer, ModerationCommentSerializer, ModerationDecisionSerializer
 )
 from .permissions import IsBlogAdmin, IsAuthorOrReadOnly
+from .db import pool_stats
+from .counters import view_counter
+from .queries import post_list_queryset, with_counts
+from .projections import normalized_post_list_data, parse_include, post_list_data
+from . import bulk, events, export, health, moderation, snapshots, sync, threads
 from rest_framework_simplejwt.views import TokenRefreshView, TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-# for testing for the image display
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views import View
-import boto3
-from botocore.exceptions import ClientError
-from django.conf import settings
-from django.core.files.storage import default_storage
-from .storage_backends import MediaStorage
-
-def debug_storage(request):
-    # Test default storage
-    default_storage_class = str(default_storage.__class__)
-    
-    # Test custom storage
-    try:
-        custom_storage = MediaStorage()
-        custom_storage_class = str(custom_storage.__class__)
-        custom_bucket = getattr(custom_storage, 'bucket_name', 'N/A')
-    except Exception as e:
-        custom_storage_class = f"Error: {e}"
-        custom_bucket = "N/A"
-    
-    return JsonResponse({
-        'settings_default_storage': getattr(settings, 'DEFAULT_FILE_STORAGE', 'NOT SET'),
-        'actual_default_storage': default_storage_class,
-        'custom_storage_class': custom_storage_class,
-        'custom_bucket': custom_bucket,
-    })
-
-class S3TestView(View):
+
+
+# ----------------- Health -----------------
+class LivenessView(View):
+    """GET /health/live/: the process is serving requests. No I/O, so it can be polled freely."""
+
     def get(self, request):
-        try:
-            s3 = boto3.client(
-                's3',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_S3_REGION_NAME
-            )
-            
-            # Test listing buckets
-            response = s3.list_buckets()
-            buckets = [bucket['Name'] for bucket in response['Buckets']]
-            
-            # Test if our bucket exists
-            bucket_exists = settings.AWS_STORAGE_BUCKET_NAME in buckets
-            
-            return JsonResponse({
-                'status': 'success',
-                'buckets': buckets,
-                'target_bucket': settings.AWS_STORAGE_BUCKET_NAME,
-                'bucket_exists': bucket_exists,
-                'region': settings.AWS_S3_REGION_NAME
-            })
-            
-        except ClientError as e:
-            return JsonResponse({
-                'status': 'error',
-                'message': str(e),
-                'error_code': e.response['Error']['Code']
-            }, status=500)
-
-# Add to views.py
-class DebugImageView(APIView):
-    permission_classes = [AllowAny]
-    
+        return JsonResponse({'status': 'ok'})
+
+
+class ReadinessView(View):
+    """
+    GET /health/ready/ (and /health/): database, cache and media storage checks,
+    cached for HEALTH['TTL_SECONDS'] (see blogc.health); 503 if any check fails.
+    """
+
     def get(self, request):
-        posts = BlogPost.objects.all()
-        data = []
-        for post in posts:
-            data.append({
-                'id': post.id,
-                'title': post.title,
-                'image_url': post.image.url if post.image else None,
-                'image_starts_with_http': post.image.url.startswith('http') if post.image else False,
-                'absolute_url': request.build_absolute_uri(post.image.url) if post.image else None
-            })
-        return Response(data)
+        report = health.monitor.report()
+        return JsonResponse(report, status=200 if report['status'] == 'ok' else 503)
+
+
+class DatabasePoolStatsView(APIView):
+    # Per-worker numbers: each process owns its own pool
+    permission_classes = [IsAuthenticated, IsBlogAdmin]
+
+    def get(self, request):
+        return Response(pool_stats())
+
+class DataExportView(APIView):
+    """
+    GET admin/export/<table>.<jsonl|csv>[?since=<ISO 8601>] streams a gzip file built
+    off a server-side cursor. X-Export-Started is the `since` for the next incremental export.
+    """
+    permission_classes = [IsAuthenticated, IsBlogAdmin]
+
+    def get(self, request, name, fmt):
+        if name not in export.EXPORTS or fmt not in export.FORMATS:
+            return Response({'detail': 'Unknown export.'}, status=status.HTTP_404_NOT_FOUND)
+        since = request.query_params.get('since')
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                return Response({'since': 'Expected an ISO 8601 timestamp.'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        started_at = timezone.now()
+        # Under ASGI a sync iterator would be buffered whole; give it an async one
+        chunks = export.astream if isinstance(request._request, ASGIRequest) else export.stream
+        response = StreamingHttpResponse(chunks(name, fmt, since or None), content_type='application/gzip')
+        response['Content-Disposition'] = f'attachment; filename="{export.filename(name, fmt)}"'
+        response['X-Export-Started'] = started_at.isoformat()
+        return response
+
 # ----------------- Registration -----------------
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterView(generics.CreateAPIView):
@@ -144,6 +132,7 @@ class PublicTokenObtainPairView(TokenObtainPairView):
 
 class PublicTokenRefreshView(TokenRefreshView):
     permission_classes = [AllowAny]
+    serializer_class = RevocableTokenRefreshSerializer
     authentication_classes = []
 
 
@@ -177,7 +166,7 @@ class CategoryListView(generics.ListCreateAPIView):
         try:
             queryset = self.get_queryset()
             serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data)
+            return snapshots.add_link(Response(serializer.data), 'categories')
         except Exception as e:
             print(f"Error in category list: {str(e)}")
             return Response(
@@ -225,9 +214,9 @@ class PostViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'updated_at']
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'latest']:
+        if self.action in ['list', 'retrieve', 'latest', 'trending', 'related']:
             permission_classes = [AllowAny]
-        elif self.action == 'create':
+        elif self.action in ['create', 'bulk_action']:
             permission_classes = [IsAuthenticated, IsBlogAdmin]
         elif self.action in ['update', 'partial_update', 'destroy']:
             permission_classes = [IsAuthenticated, IsAuthorOrReadOnly]
@@ -274,27 +263,65 @@ class PostViewSet(viewsets.ModelViewSet):
             print("Error creating post:", str(e))
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    # Read-only listings skip model instances and the serializer: one values_list()
+    # query (counts included), assembled into the BlogPostListSerializer shape.
+    # ?include=author,category sideloads those relations once per response instead.
+    def list_response(self, qs):
+        include = parse_include(self.request.query_params.get('include'))
+        if include:
+            return Response(normalized_post_list_data(qs, include, self.request))
+        return Response(post_list_data(qs, self.request))
+
     def list(self, request, *args, **kwargs):
-        qs = self.get_queryset()
-        serializer = BlogPostListSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        return self.list_response(with_counts(self.get_queryset()))
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
+        view_counter.record(instance.pk)
         serializer = BlogPostDetailSerializer(instance, context={'request': request})
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='latest')
     def latest(self, request):
-        qs = BlogPost.objects.filter(published=True).order_by('-created_at')[:5]
-        serializer = BlogPostListSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        qs = post_list_queryset().filter(published=True).order_by('-created_at')[:5]
+        response = self.list_response(qs)
+        if 'include' in request.query_params:
+            return response  # the snapshot has the embedded shape
+        return snapshots.add_link(response, 'latest')
+
+    @action(detail=False, methods=['get'], url_path='trending')
+    def trending(self, request):
+        # Top-K straight off the TrendingScore.score index
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        qs = post_list_queryset().filter(published=True, trending__isnull=False).order_by('-trending__score')[:limit]
+        return self.list_response(qs)
+
+    @action(detail=True, methods=['get'], url_path='related')
+    def related(self, request, pk=None):
+        # Precomputed by `manage.py build_related_posts`; one indexed read (after a 404 check)
+        post = self.get_object()
+        qs = post_list_queryset().filter(
+            linked_from__post_id=post.pk, published=True
+        ).order_by('linked_from__rank')
+        return self.list_response(qs)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_action(self, request):
+        # One set-based UPDATE/DELETE for the whole selection, in one transaction
+        serializer = BulkPostActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        qs = bulk.select_posts(ids=data.get('ids'), filters=data.get('filter'))
+        matched, changed = bulk.apply(data['action'], qs, category=data.get('category'))
+        return Response({'action': data['action'], 'matched': matched, 'changed': changed})
 
     @action(detail=False, methods=['get'], url_path='my-posts')
     def my_posts(self, request):
-        qs = BlogPost.objects.filter(author=request.user).order_by('-created_at')
-        serializer = BlogPostListSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        qs = post_list_queryset().filter(author=request.user).order_by('-created_at')
+        return self.list_response(qs)
 
 class CheckUserPermissionsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -323,17 +350,24 @@ class CheckUserPermissionsView(APIView):
 # ADD THIS COMBINED VIEW:
 @method_decorator(csrf_exempt, name='dispatch')
 class CommentListCreateView(generics.ListCreateAPIView):
+    """
+    GET: the post's comments with replies under their parents, one cursor page at a
+    time; ?thread=<comment id> for one thread or subtree, ?max_depth=<n> to cut it.
+    POST: a comment, or a reply with "parent": <comment id>.
+    """
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = threads.ThreadCursorPagination
 
     def get_queryset(self):
-        post_id = self.kwargs['post_id']
-        return Comment.objects.filter(post__id=post_id, active=True).order_by('created_at')
+        return threads.thread_queryset(self.kwargs['post_id'], self.request.query_params)
 
     def perform_create(self, serializer):
         post_id = self.kwargs['post_id']
         post = get_object_or_404(BlogPost, pk=post_id)
-        serializer.save(user=self.request.user, post=post)
+        threads.check_reply(serializer.validated_data.get('parent'), post)
+        comment = serializer.save(user=self.request.user, post=post)
+        events.comment_created(comment, serializer.data)
 
 @method_decorator(csrf_exempt, name='dispatch')
 class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -354,6 +388,45 @@ class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.delete()
 
 
+class CommentModerationView(generics.ListAPIView):
+    """
+    GET: the moderation queue (flagged comments, or ?status=new|approved|rejected), most spammy first.
+    POST {"action": "approve" | "reject", "ids": [...]}: review the whole set in one UPDATE.
+    """
+    serializer_class = ModerationCommentSerializer
+    permission_classes = [IsAuthenticated, IsBlogAdmin]
+
+    def get_queryset(self):
+        status_filter = self.request.query_params.get('status', 'flagged')
+        if status_filter not in dict(Comment.STATUS_CHOICES):
+            status_filter = 'flagged'
+        return (
+            Comment.objects.filter(status=status_filter)
+            .select_related('user__profile')
+            .order_by('-spam_score', '-created_at')
+        )
+
+    def post(self, request):
+        serializer = ModerationDecisionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = moderation.review(serializer.validated_data['ids'], serializer.validated_data['action'])
+        return Response({'action': serializer.validated_data['action'], 'updated': updated})
+
+
+# ----------------- Sync -----------------
+class SyncView(APIView):
+    """
+    GET ?since=<token>&limit=<n>: posts, comments and likes changed after the token
+    and the ids of deleted ones, in bounded batches (see blogc.sync). Without ?since
+    it pages through everything; keep calling with `next` while has_more is true.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        limit = sync.parse_limit(request.query_params.get('limit'), sync.get_options())
+        return Response(sync.changes(request.query_params.get('since'), limit, request))
+
+
 # ----------------- Likes -----------------
 @method_decorator(csrf_exempt, name='dispatch')
 class ToggleLikeView(APIView):
@@ -363,6 +436,8 @@ class ToggleLikeView(APIView):
         post = get_object_or_404(BlogPost, pk=post_id)
         like, created = Like.objects.get_or_create(post=post, user=request.user)
         if created:
+            events.likes_changed(post.pk)
             return Response({'message': 'liked'}, status=status.HTTP_201_CREATED)
         like.delete()
+        events.likes_changed(post.pk)
         return Response({'message': 'unliked'}, status=status.HTTP_200_OK)